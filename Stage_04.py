@@ -3,130 +3,3611 @@
 
 # Stage 04 : Tkinter GUI for Viewing, Searching, and Sorting Tasks
 
+import time
+START_TIME = time.perf_counter()  # Startup timings (--startup-timing) count from here
+
+import base64
+import functools
+import hashlib
+import heapq
+import itertools
 import json
+import marshal
+import math
+import mmap
+import os
+import queue
+import re
+import struct
+import sys
+import threading
+import uuid
 import tkinter as tk
 from tkinter import ttk, messagebox
-from datetime import datetime
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from collections import Counter, deque, namedtuple
+from collections.abc import MutableMapping, Sequence, ValuesView
+from datetime import date, datetime, timedelta
+
+# -------------------- Sorting Helpers --------------------
+
+PRIORITY_ORDER = {"High": 0, "Medium": 1, "Low": 2}
+PRIORITY_NAMES = {name.lower(): name for name in PRIORITY_ORDER}  # "high" -> "High"
+UNKNOWN_DATE = date.max.toordinal() + 1  # Sorts tasks with an unreadable due date last
+
+# Day ordinal of a YYYY-MM-DD string, parsed once when the due date is set. Dates
+# without zero padding (2025-6-1), which the edit dialog has always accepted, are
+# read the same way strptime reads them.
+def date_ordinal(value):
+    try:
+        return date.fromisoformat(value).toordinal()
+    except (TypeError, ValueError):
+        pass
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").toordinal()
+    except (TypeError, ValueError):
+        return UNKNOWN_DATE
+
+# Inclusive day ordinals for a (first, last) due-date range. Each end is a date, a
+# YYYY-MM-DD string or None for open; an unreadable end gives an empty range.
+def due_range_ordinals(due_range):
+    first, last = due_range
+    bounds = []
+    for value, open_end in ((first, 1), (last, date.max.toordinal())):
+        if value is None or value == "":
+            bounds.append(open_end)
+        elif isinstance(value, date):
+            bounds.append(value.toordinal())
+        else:
+            ordinal = date_ordinal(value)
+            if ordinal == UNKNOWN_DATE:
+                return 1, 0
+            bounds.append(ordinal)
+    return tuple(bounds)
+
+# YYYY-MM-DD text of a day ordinal
+def date_text(ordinal):
+    return date.fromordinal(ordinal).isoformat()
+
+# Return the sort key function for a task column, using the keys precomputed on Task.
+# A tuple of columns sorts by the first, then the next on ties, and so on.
+def sort_key(key):
+    if isinstance(key, tuple):
+        funcs = [sort_key(column) for column in key]
+        return lambda t: tuple(func(t) for func in funcs)
+    if key == "priority":
+        return lambda t: t.priority_rank
+    if key == "due_date":
+        return lambda t: t.due_ordinal
+    return lambda t: getattr(t, key).lower()
 
 # -------------------- Task Class --------------------
 
-# Represents a single task with name, description, priority, and due date
-class Task:
-    def __init__(self, name, description, priority, due_date,):
-        self.name = name
-        self.description = description
-        self.priority = priority
-        self.due_date = due_date
-        
-    # Convert Task object to dictionary for saving in JSON
-    def to_dict(self):
+# Represents a single task with name, description, priority, and due date.
+# Tasks are slotted: the name and priority are interned, the due date is kept as a day
+# ordinal, and the string attributes are rebuilt when read. Measured
+# with tracemalloc over 200k tasks (ids and descriptions shared with the parsed JSON),
+# a task costs about 120 bytes, down from about 240 with a per-instance __dict__.
+class Task:
+    __slots__ = ("id", "_name", "description", "_priority", "due_ordinal", "_due_text")
+
+    def __init__(self, name, description, priority, due_date, task_id=None):
+        self.id = task_id or uuid.uuid4().hex  # Stable identifier, also used as the Treeview iid
+        self.name = name
+        self.description = description
+        self.priority = priority
+        self.due_date = due_date
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = sys.intern(value)  # Repeated names share one string
+
+    @property
+    def priority(self):
+        return self._priority
+
+    @priority.setter
+    def priority(self, value):
+        self._priority = sys.intern(value)  # One string per priority name
+
+    # Sort rank: High, Medium, Low, then anything else
+    @property
+    def priority_rank(self):
+        return PRIORITY_ORDER.get(self._priority, 3)
+
+    @property
+    def due_date(self):
+        if self._due_text is not None:
+            return self._due_text
+        return date.fromordinal(self.due_ordinal).isoformat()
+
+    # Dates that do not round-trip through the ordinal keep their original text
+    @due_date.setter
+    def due_date(self, value):
+        self.due_ordinal = date_ordinal(value)
+        if self.due_ordinal != UNKNOWN_DATE and date.fromordinal(self.due_ordinal).isoformat() == value:
+            self._due_text = None
+        else:
+            self._due_text = value
+
+    # Convert Task object to dictionary for saving in JSON
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "priority": self.priority,
+            "due_date": self.due_date
+        }
+
+    # Create a Task object from dictionary 
+    @classmethod
+    def from_dict(cls, task_dict):
+        return cls(
+            task_dict["name"],
+            task_dict["description"],
+            task_dict["priority"],
+            task_dict["due_date"],
+            task_dict.get("id"),
+        )
+
+# Ids for many new tasks at once: random 128-bit hex like uuid4().hex, but from a
+# single os.urandom call instead of one per task
+def new_task_ids(count):
+    data = os.urandom(16 * count).hex()
+    return [data[i:i + 32] for i in range(0, 32 * count, 32)]
+
+# Task fields checked and tidied the way the edit dialog and the import command both
+# save them: (fields, None), or (None, reason) when they cannot be saved. A name is
+# required; the priority is free text (High, Medium and Low in any case are written
+# the usual way, blank is Medium); the due date is any date strptime reads as
+# YYYY-MM-DD, stored zero padded.
+def check_task_fields(name, description, priority, due_date):
+    name = name.strip()
+    if not name:
+        return None, "Task name is required"
+    priority = priority.strip() or "Medium"
+    priority = PRIORITY_NAMES.get(priority.lower(), priority)
+    due_text = due_date.strip()
+    if len(due_text) == 10 and due_text[4] == "-" and due_text[7] == "-":
+        # Already padded: fromisoformat checks it at a fraction of strptime's cost
+        ordinal = date_ordinal(due_text)
+    else:
+        try:
+            ordinal = datetime.strptime(due_text, "%Y-%m-%d").toordinal()
+        except ValueError:
+            ordinal = UNKNOWN_DATE
+    if ordinal == UNKNOWN_DATE:
+        return None, f"Invalid due date {due_text!r} (use YYYY-MM-DD)"
+    return {"name": name, "description": description, "priority": priority, "due_date": date_text(ordinal)}, None
+
+# -------------------- Streaming JSON --------------------
+
+LOAD_BATCH_SIZE = 5000  # Tasks handed to the manager (and GUI) per loading step
+
+# Yield the elements of a top-level JSON array one at a time, reading the file in chunks
+def iter_json_array(file, chunk_size=1 << 16):
+    decoder = json.JSONDecoder()
+    buffer, pos, eof, started = "", 0, False, False
+    while True:
+        # Skip whitespace and commas, reading more of the file when the buffer runs out
+        while True:
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+            if pos < len(buffer) or eof:
+                break
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+        if pos >= len(buffer):
+            if not started:
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            raise json.JSONDecodeError("Expecting ']'", buffer, pos)
+
+        if not started:
+            if buffer[pos] != "[":
+                raise json.JSONDecodeError("Expecting '['", buffer, pos)
+            started = True
+            pos += 1
+            continue
+        if buffer[pos] == "]":
+            return
+
+        # An element cut off by the end of the buffer fails to decode (or, for a number,
+        # ends exactly at the end); read another chunk and try again
+        try:
+            value, end = decoder.raw_decode(buffer, pos)
+            complete = end < len(buffer) or eof
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            complete = False
+        if not complete:
+            chunk = file.read(chunk_size)
+            eof = not chunk
+            buffer, pos = buffer[pos:] + chunk, 0
+            continue
+        pos = end
+        yield value
+
+# -------------------- Instrumentation --------------------
+
+METRIC_SAMPLES = 1000  # Recent durations kept per operation for the p95
+
+# Call counts, durations and bytes written per operation. Off by default; while off,
+# a timed call costs one attribute check. Set TASKS_METRICS=1 to start with it on.
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.profile_file = None  # Set by profile_next(); the next timed action is profiled
+        self.active = enabled  # enabled or a profile is waiting, checked on every timed call
+        self.lock = threading.Lock()
+        self.stats = {}  # operation -> [calls, total seconds, recent durations, bytes written]
+        self.last_action = None  # (operation, seconds) of the latest outermost timed call
+        self.last_profile = None  # File the latest profile was written to
+        self._depth = threading.local()  # Nesting of timed calls, per thread
+
+    def enable(self, enabled=True):
+        self.enabled = enabled
+        self.active = enabled or self.profile_file is not None
+
+    def reset(self):
+        with self.lock:
+            self.stats = {}
+            self.last_action = None
+
+    # Run the next outermost timed call under cProfile and write its stats to a file
+    def profile_next(self, profile_file):
+        self.profile_file = profile_file
+        self.active = True
+
+    def call(self, name, func, args, kwargs):
+        depth = getattr(self._depth, "value", 0)
+        profiler = None
+        if depth == 0 and self.profile_file is not None:
+            profile_file, self.profile_file = self.profile_file, None
+            self.active = self.enabled
+            import cProfile  # Only needed once a profile is asked for
+            profiler = cProfile.Profile()
+        self._depth.value = depth + 1
+        start = time.perf_counter()
+        try:
+            if profiler is None:
+                return func(*args, **kwargs)
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            self._depth.value = depth
+            if profiler is not None:
+                profiler.dump_stats(profile_file)
+                self.last_profile = profile_file
+            if self.enabled:
+                self.record(name, elapsed)
+                if depth == 0:
+                    self.last_action = (name, elapsed)
+
+    def record(self, name, seconds=0.0, bytes_written=0):
+        with self.lock:
+            stat = self.stats.get(name)
+            if stat is None:
+                stat = self.stats[name] = [0, 0.0, deque(maxlen=METRIC_SAMPLES), 0]
+            if seconds:
+                stat[0] += 1
+                stat[1] += seconds
+                stat[2].append(seconds)
+            stat[3] += bytes_written
+
+    def add_bytes(self, name, bytes_written):
+        if self.enabled:
+            self.record(name, bytes_written=bytes_written)
+
+    # {operation: {calls, total_ms, mean_ms, p95_ms, bytes_written}}
+    def snapshot(self):
+        with self.lock:
+            stats = {name: (calls, total, sorted(samples), written)
+                     for name, (calls, total, samples, written) in self.stats.items()}
+        summary = {}
+        for name, (calls, total, samples, written) in sorted(stats.items()):
+            summary[name] = {
+                "calls": calls,
+                "total_ms": round(total * 1000, 3),
+                "mean_ms": round(total * 1000 / calls, 3) if calls else None,
+                "p95_ms": round(samples[math.ceil(0.95 * len(samples)) - 1] * 1000, 3) if samples else None,
+                "bytes_written": written,
+            }
+        return summary
+
+    def dump(self, path):
+        with open(path, "w") as file:
+            json.dump({"taken": datetime.now().isoformat(timespec="seconds"), "operations": self.snapshot()},
+                      file, indent=4)
+
+METRICS = Metrics(os.environ.get("TASKS_METRICS") == "1")
+
+# Decorator recording a method's calls under its qualified name ("TaskManager.filter_tasks")
+def timed(func):
+    name = func.__qualname__
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        if not METRICS.active:
+            return func(*args, **kwargs)
+        return METRICS.call(name, func, args, kwargs)
+    return wrapper
+
+# Startup milestones ("imports", "first_paint", "interactive", ...) -> seconds since
+# START_TIME. Each is kept the first time it is reached, and recorded as a timing too.
+STARTUP_MARKS = {}
+
+def mark_startup(name):
+    if name not in STARTUP_MARKS:
+        STARTUP_MARKS[name] = time.perf_counter() - START_TIME
+        if METRICS.enabled:
+            METRICS.record(f"startup.{name}", STARTUP_MARKS[name])
+
+def startup_report():
+    return "Startup: " + ", ".join(f"{name.replace('_', ' ')} {seconds * 1000:.0f} ms"
+                                   for name, seconds in STARTUP_MARKS.items())
+
+# -------------------- Storage Backends --------------------
+
+# Every backend fills the manager's id -> Task mapping (from its new_task_map(): a dict,
+# or a TaskFileMap for the binary file) in iter_load(), yielding each batch of new tasks
+# with the fraction loaded so far. Changes are staged through
+# add/add_many/update/delete (cheap, called under the manager's lock) and written by
+# flush(lock), which the background writer calls at most once per interval; failures
+# are raised, never shown. Backends that can answer filters and sorts themselves set
+# supports_queries and provide filter_ids/count_ids/sorted_ids.
+
+# Make a file's contents durable before it is renamed over the old one
+def sync_file(path):
+    with open(path, "rb+") as file:
+        os.fsync(file.fileno())
+
+# Make a rename durable (directories cannot be opened for fsync on Windows)
+def sync_directory(path):
+    if os.name == "nt":
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+# A snapshot file with an append-only journal of changes beside it. Subclasses
+# read the snapshot in iter_snapshot() and write it in write_snapshot().
+class JournaledStorage:
+    supports_queries = False
+
+    def __init__(self, snapshot_file, journal=True, journal_limit=1024 * 1024):
+        self.snapshot_file = snapshot_file
+        self.journal = journal  # Append mutations to a log instead of rewriting the file
+        self.journal_file = snapshot_file + ".journal"
+        self.journal_limit = journal_limit  # Journal size (bytes) that triggers compaction
+        self._journal_handle = None
+        self.journal_bytes = 0  # Size of the journal file as written so far
+        self.pending = []  # Journal lines staged since the last flush
+        self.save_needed = False  # The next flush writes a full snapshot instead
+        self.task_map = {}
+        # False while a load is in progress, and after one that failed: the tasks in
+        # memory are then only part of the file, and must not be written over it
+        self.load_complete = True
+
+    # Stream tasks from the snapshot in batches, then replay any journaled changes on top.
+    # Returns True when the journal changed tasks that were already yielded.
+    def iter_load(self, task_map, batch_size=LOAD_BATCH_SIZE):
+        self.task_map = task_map
+        self.load_complete = False
+        needs_save = yield from self.iter_snapshot(task_map, batch_size)
+
+        replayed = self.journal and self.replay_journal()
+        self.journal_bytes = self.journal_size()
+        self.load_complete = True
+        if needs_save or (replayed and self.journal_bytes >= self.journal_limit):
+            self.save()
+        return bool(replayed)
+
+    # Write a snapshot of the given tasks (default: all) and drop the journal it covers.
+    # The snapshot goes to a temp file that is fsynced, then renamed over the old one,
+    # so a crash leaves either the old file or the new one. Raises on failure.
+    @timed
+    def save(self, tasks=None, lock=None):
+        if not self.load_complete:
+            raise RuntimeError("Tasks were not fully loaded; the snapshot was left as it is")
+        tasks = self.snapshot_tasks() if tasks is None else tasks
+        temp_file = self.snapshot_file + ".tmp"
+        try:
+            self.write_snapshot(temp_file, tasks)
+            sync_file(temp_file)
+        except Exception:
+            if os.path.exists(temp_file):
+                os.remove(temp_file)
+            raise
+        METRICS.add_bytes("JournaledStorage.save", os.path.getsize(temp_file))
+        os.replace(temp_file, self.snapshot_file)
+        sync_directory(self.snapshot_file)
+        if lock is None:
+            self.snapshot_replaced(tasks)
+        else:
+            with lock:
+                self.snapshot_replaced(tasks)
+        self._drop_journal()
+
+    # Called after a new snapshot of tasks has replaced the old one
+    def snapshot_replaced(self, tasks):
+        pass
+
+    def new_task_map(self):
+        return {}
+
+    # Every task, for a snapshot about to be written (under the lock, if there is one)
+    def snapshot_tasks(self):
+        return list(self.task_map.values())
+
+    def add(self, task):
+        self._record({"op": "add", "task": task.to_dict()})
+
+    def add_many(self, tasks):
+        # A bulk insert of at least half the tasks is cheaper as one snapshot; smaller
+        # batches (a streamed import) are journaled as a single record, so a torn write
+        # loses the whole batch or none of it
+        if not self.journal or len(tasks) * 2 >= len(self.task_map):
+            self.save_needed = True
+        else:
+            self._record({"op": "add_many", "tasks": [task.to_dict() for task in tasks]})
+
+    def update(self, task, task_data):
+        self._record({"op": "update", "id": task.id, "data": task_data})
+
+    def delete(self, task_id):
+        self._record({"op": "delete", "id": task_id})
+
+    # Ask the next flush for a full snapshot
+    def request_save(self):
+        self.save_needed = True
+
+    # Write the staged changes: appended to the journal, or as a new snapshot when one
+    # was asked for or the journal would outgrow its limit. Only staging happens under
+    # the lock; the disk writes do not hold it, and changes staged meanwhile wait for
+    # the next flush. On failure the changes stay staged and the error is raised. After
+    # an incomplete load no snapshot is written, only the journal.
+    def flush(self, lock):
+        with lock:
+            lines, self.pending = self.pending, []
+            tasks = None
+            wants_snapshot = self.save_needed or self.journal_bytes + sum(map(len, lines)) >= self.journal_limit
+            if wants_snapshot and (self.load_complete or not self.journal):
+                self.save_needed = False
+                tasks = self.snapshot_tasks()
+        try:
+            if tasks is not None:
+                self.save(tasks, lock)
+            elif lines:
+                self._append(lines)
+        except Exception:
+            with lock:
+                if tasks is not None:
+                    self.save_needed = True
+                else:
+                    self.pending[:0] = lines
+            raise
+
+    # Apply every record in the journal to the loaded snapshot, returns the record count.
+    # A torn write at the end of the log is cut off the file, so that later appends
+    # are not stranded behind it on the next replay. A damaged record with more after
+    # it is no torn write: that raises, and the journal is left as it is.
+    def replay_journal(self):
+        count = good_bytes = 0
+        torn = False
+        try:
+            with open(self.journal_file, "rb") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        if file.read().strip():
+                            raise ValueError(f"{self.journal_file} is damaged at record {count + 1} "
+                                             f"and was left as it is")
+                        torn = True
+                        break
+                    self._apply_record(record)
+                    count += 1
+                    good_bytes += len(line)
+                    torn = not line.endswith(b"\n")  # Whole record, but its newline was lost
+        except FileNotFoundError:
+            return 0
+        if torn:
+            self._repair_journal(good_bytes)
+        return count
+
+    # Truncate the journal after its last whole record, ending it with a newline
+    def _repair_journal(self, good_bytes):
+        with open(self.journal_file, "r+b") as file:
+            file.truncate(good_bytes)
+            if good_bytes:
+                file.seek(good_bytes - 1)
+                if file.read(1) != b"\n":
+                    file.write(b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+    # Apply a single journal record to the in-memory tasks
+    # Records are keyed by task id, so replaying one twice leaves the same result
+    def _apply_record(self, record):
+        op = record["op"]
+        if op == "add":
+            task = Task.from_dict(record["task"])
+            self.task_map[task.id] = task
+        elif op == "add_many":
+            for task_dict in record["tasks"]:
+                task = Task.from_dict(task_dict)
+                self.task_map[task.id] = task
+        elif op == "update":
+            task = self.task_map.get(record["id"])
+            if task is not None:
+                for key, value in record["data"].items():
+                    setattr(task, key, value)
+                self.task_map[task.id] = task  # Tells a TaskFileMap the row is out of date
+        elif op == "delete":
+            self.task_map.pop(record["id"], None)
+
+    # Stage one mutation; without a journal every change means a new snapshot
+    def _record(self, record):
+        if self.journal:
+            self.pending.append(json.dumps(record, separators=(",", ":")) + "\n")
+        else:
+            self.save_needed = True
+
+    # Append lines to the journal and fsync it
+    def _append(self, lines):
+        if self._journal_handle is None:
+            self._journal_handle = open(self.journal_file, "a")
+        data = "".join(lines)
+        self._journal_handle.write(data)
+        self._journal_handle.flush()
+        os.fsync(self._journal_handle.fileno())
+        self.journal_bytes = self._journal_handle.tell()
+        METRICS.add_bytes("JournaledStorage.journal", len(data))
+
+    # Remove the journal once a snapshot holds everything in it
+    def _drop_journal(self):
+        if self._journal_handle is not None:
+            self._journal_handle.close()
+            self._journal_handle = None
+        if os.path.exists(self.journal_file):
+            os.remove(self.journal_file)
+        self.journal_bytes = 0
+
+    # Current size of the journal file in bytes
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+
+    # Fold the journal into a fresh snapshot and release it, called when the application
+    # exits (after the last flush). After a failed load the journal is left for the next start.
+    def close(self):
+        if self.journal and self.load_complete and self.journal_size():
+            self.save()
+        elif self._journal_handle is not None:
+            self._journal_handle.close()
+            self._journal_handle = None
+
+# Stores tasks in a JSON file, with an append-only journal of changes beside it and
+# a binary cache of the file's tasks (tasks.json.cache) that makes startup skip parsing
+class JsonStorage(JournaledStorage):
+    def __init__(self, json_file='tasks.json', journal=True, journal_limit=1024 * 1024, cache=True):
+        super().__init__(json_file, journal, journal_limit)
+        self.json_file = json_file
+        self.cache_file = json_file + ".cache" if cache else None
+        self._cache_lock = threading.Lock()  # One cache write at a time
+        self._cache_generation = 0  # Bumped for every write, so a stale one is skipped
+        self._cache_thread = None
+
+    # Load from the cache when it matches the JSON file, else stream the JSON array and
+    # rebuild the cache in the background. Returns True if the file needs rewriting.
+    def iter_snapshot(self, task_map, batch_size):
+        columns = read_snapshot_cache(self.cache_file, self.json_file) if self.cache_file else None
+        if columns is not None:
+            count = len(columns[0])
+            for start in range(0, count, batch_size):
+                batch = tasks_from_columns(columns, start, min(count, start + batch_size))
+                for task in batch:
+                    task_map[task.id] = task
+                yield batch, (start + len(batch)) / count
+            return False
+
+        missing_ids = False
+        loaded = []
+        try:
+            stat = os.stat(self.json_file)
+            if stat.st_size == 0:
+                return False  # An empty file holds no tasks yet
+            with open(self.json_file, "r") as file:
+                batch = []
+                for task_dict in iter_json_array(file):
+                    missing_ids = missing_ids or "id" not in task_dict
+                    task = Task.from_dict(task_dict)
+                    task_map[task.id] = task
+                    batch.append(task)
+                    if len(batch) >= batch_size:
+                        loaded.extend(batch)
+                        yield batch, min(1.0, file.buffer.tell() / (stat.st_size or 1))
+                        batch = []
+                if batch:
+                    loaded.extend(batch)
+                    yield batch, 1.0
+        except FileNotFoundError:
+            return False  # No file yet: no tasks
+        except json.JSONDecodeError as e:
+            # Damaged or cut short: raised rather than saved back with only the tasks read
+            raise ValueError(f"{self.json_file} is damaged and was left as it is ({e})") from e
+        if self.cache_file and not missing_ids:
+            self.refresh_cache(loaded, stat)
+        # Files written before tasks had ids get their new ids saved once
+        return missing_ids
+
+    def write_snapshot(self, path, tasks):
+        with open(path, "w") as file:
+            json.dump([task.to_dict() for task in tasks], file, indent=4)
+
+    def snapshot_replaced(self, tasks):
+        if self.cache_file:
+            self.refresh_cache(tasks, os.stat(self.json_file))
+
+    # Cache the tasks of the JSON file with the given stat, on a background thread.
+    # Tasks edited after the file was written may be cached with the edit, which is
+    # harmless: the edit is in the journal and is replayed over the cache anyway.
+    def refresh_cache(self, tasks, stat):
+        self._cache_generation += 1
+        self._cache_thread = threading.Thread(
+            target=self._write_cache, args=(tasks, stat, self._cache_generation), daemon=True)
+        self._cache_thread.start()
+
+    def _write_cache(self, tasks, stat, generation):
+        with self._cache_lock:
+            if generation != self._cache_generation:
+                return  # A newer snapshot has been written since
+            signature = file_signature(self.json_file)
+            if signature is None or signature[:2] != (stat.st_size, stat.st_mtime_ns):
+                return  # The file changed while it was hashed
+            try:
+                write_snapshot_cache(self.cache_file, signature, task_columns(tasks))
+            except OSError:
+                pass  # Only a cache; the next start reads the JSON instead
+
+    # Let a cache write in progress finish, so the next start can use it
+    def close(self):
+        super().close()
+        if self._cache_thread is not None:
+            self._cache_thread.join()
+            self._cache_thread = None
+
+# -------------------- Snapshot Cache --------------------
+
+CACHE_VERSION = 1
+CACHE_HASH_CHUNK = 1 << 20  # Bytes hashed per read
+
+# Cache layout, two marshal records: the JSON file's (version, size, mtime_ns, digest),
+# then the columns from task_columns(). The header is checked against the file's stat
+# before the columns are read, and the digest catches an edit that kept both.
+
+# (size, mtime_ns, BLAKE2 digest) of a file, or None if it is missing or was replaced
+# while it was read
+def file_signature(path):
+    try:
+        before = os.stat(path)
+        digest = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as file:
+            for chunk in iter(lambda: file.read(CACHE_HASH_CHUNK), b""):
+                digest.update(chunk)
+        after = os.stat(path)
+    except OSError:
+        return None
+    if (before.st_size, before.st_mtime_ns) != (after.st_size, after.st_mtime_ns):
+        return None
+    return after.st_size, after.st_mtime_ns, digest.hexdigest()
+
+# Compact columns of the tasks: ids, names and descriptions as lists, the priority names
+# with a packed code per task, packed due ordinals and {row: text} for dates kept as text
+def task_columns(tasks):
+    priorities = {}  # Priority -> code, in order of first use
+    codes = array("I", [priorities.setdefault(task.priority, len(priorities)) for task in tasks])
+    return (
+        [task.id for task in tasks],
+        [task.name for task in tasks],
+        [task.description for task in tasks],
+        list(priorities),
+        codes.tobytes(),
+        array("i", [task.due_ordinal for task in tasks]).tobytes(),
+        {row: task._due_text for row, task in enumerate(tasks) if task._due_text is not None},
+    )
+
+# Tasks for rows start:end of cached columns, filled in directly instead of parsing
+# their priorities and dates again
+def tasks_from_columns(columns, start, end):
+    ids, names, descriptions, priorities, codes, ordinals, due_texts = columns
+    priorities = [sys.intern(name) for name in priorities]
+    codes = array("I", codes[start * 4:end * 4])
+    ordinals = array("i", ordinals[start * 4:end * 4])
+    intern, new = sys.intern, Task.__new__
+    tasks = []
+    for task_id, name, description, code, ordinal in zip(
+            ids[start:end], names[start:end], descriptions[start:end], codes, ordinals):
+        task = new(Task)
+        task.id = task_id
+        task._name = intern(name)
+        task.description = description
+        task._priority = priorities[code]
+        task.due_ordinal = ordinal
+        task._due_text = None
+        tasks.append(task)
+    if due_texts:
+        for row in range(start, end):
+            if row in due_texts:
+                tasks[row - start]._due_text = due_texts[row]
+    return tasks
+
+# Write the cache through a temp file, so a reader never sees half of one. It is not
+# fsynced: a cache lost in a crash only means one slower start.
+def write_snapshot_cache(cache_file, signature, columns):
+    temp_file = cache_file + ".tmp"
+    with open(temp_file, "wb") as file:
+        marshal.dump((CACHE_VERSION,) + tuple(signature), file)
+        marshal.dump(columns, file)
+    os.replace(temp_file, cache_file)
+
+# Columns of a cache that matches the JSON file, or None if it is missing or stale
+def read_snapshot_cache(cache_file, json_file):
+    try:
+        stat = os.stat(json_file)
+        with open(cache_file, "rb") as file:
+            version, size, mtime_ns, digest = marshal.load(file)
+            if version != CACHE_VERSION or (size, mtime_ns) != (stat.st_size, stat.st_mtime_ns):
+                return None
+            if file_signature(json_file) != (size, mtime_ns, digest):
+                return None
+            columns = marshal.loads(file.read())  # Far faster than load() on a file
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    return columns
+
+# -------------------- Binary Task File --------------------
+
+BINARY_MAGIC = b"TASKBIN1"
+BINARY_HEADER = struct.Struct("<8sQQ")  # magic, task count, metadata length
+
+# Binary snapshot layout, each column holding one fixed-width entry per task:
+#   header | metadata JSON | id_end, name_end, description_end (uint64 each)
+#   | due ordinal (int32) | priority code (uint8) | id, name and description heaps
+# The *_end columns hold the running end offset of each string in its heap, so string i
+# spans end[i - 1]:end[i]. The metadata names the priorities the codes refer to, the byte
+# order of the numeric columns and the text of any due date that is not a plain date.
+
+# Read-only view of a binary task file through mmap; strings are decoded only when asked
+# for. The mapping keeps its own handle to the file, so none is kept open beside it.
+class TaskFile:
+    def __init__(self, path):
+        self._views = []
+        with open(path, "rb") as file:
+            try:
+                self.map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise ValueError("Empty binary task file")
+        magic, count, meta_length = BINARY_HEADER.unpack_from(self.map, 0)
+        if magic != BINARY_MAGIC:
+            self.close()
+            raise ValueError("Not a binary task file")
+        meta = json.loads(self.map[BINARY_HEADER.size:BINARY_HEADER.size + meta_length])
+        self.count = count
+        self.byteorder = meta["byteorder"]
+        self.priorities = [sys.intern(name) for name in meta["priorities"]]  # File code -> priority
+        self.due_text = {int(row): text for row, text in meta["due_text"].items()}
+
+        offset = binary_columns_offset(meta_length)
+        self.id_end = self._column(offset, "Q")
+        self.name_end = self._column(offset + 8 * count, "Q")
+        self.description_end = self._column(offset + 16 * count, "Q")
+        self.due = self._column(offset + 24 * count, "i")
+        self.priority = self._column(offset + 28 * count, "B")
+        self.id_heap = offset + 29 * count
+        self.name_heap = self.id_heap + (self.id_end[-1] if count else 0)
+        self.description_heap = self.name_heap + (self.name_end[-1] if count else 0)
+
+    # A numeric column read in place, or copied and byte-swapped if written on another platform
+    def _column(self, offset, typecode):
+        size = array(typecode).itemsize
+        view = memoryview(self.map)[offset:offset + size * self.count]
+        self._views.append(view)
+        if self.byteorder == sys.byteorder or size == 1:
+            column = view.cast(typecode)
+            self._views.append(column)
+            return column
+        column = array(typecode, view.tobytes())
+        column.byteswap()
+        return column
+
+    def _raw(self, heap, ends, row):
+        start = ends[row - 1] if row else 0
+        return self.map[heap + start:heap + ends[row]]
+
+    def id(self, row):
+        return self._raw(self.id_heap, self.id_end, row).decode("utf-8")
+
+    # Ids of rows start..stop-1, sliced out of one read of the heap
+    def ids(self, start, stop):
+        ends = self.id_end[start:stop].tolist()
+        first = self.id_end[start - 1] if start else 0
+        heap = self.map[self.id_heap + first:self.id_heap + ends[-1]] if ends else b""
+        ids, begin = [], 0
+        for end in ends:
+            ids.append(heap[begin:end - first].decode("utf-8"))
+            begin = end - first
+        return ids
+
+    def raw_name(self, row):
+        return self._raw(self.name_heap, self.name_end, row)
+
+    # Rows whose lowercased name contains text, found by searching all names in one
+    # piece. Lowering the bytes only lowers ASCII, which finds no match that lowering the
+    # decoded name would not, so only names with other characters are decoded to check.
+    def rows_named(self, text):
+        if not self.count:
+            return []
+        names = self.map[self.name_heap:self.description_heap]
+        ends = self.name_end.tolist()  # Searched far faster as a list
+        if not text.isascii():
+            return [row for row in range(self.count) if text in self.raw_name(row).decode("utf-8").lower()]
+        needle = text.encode("ascii")
+        lowered = names.lower()
+        found = []
+        position = lowered.find(needle)
+        while position != -1:
+            row = bisect_right(ends, position)
+            if position + len(needle) <= ends[row]:
+                found.append(row)
+                position = lowered.find(needle, ends[row])  # On to the next name
+            else:
+                position = lowered.find(needle, position + 1)
+        if not names.isascii():
+            matched = set(found)
+            others = {bisect_right(ends, match.start()) for match in re.finditer(rb"[\x80-\xff]", names)}
+            found = sorted(matched | {row for row in others - matched
+                                      if text in self.raw_name(row).decode("utf-8").lower()})
+        return found
+
+    def raw_description(self, row):
+        return self._raw(self.description_heap, self.description_end, row)
+
+    def close(self):
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self.map.close()
+
+# Column data starts on an 8-byte boundary after the header and metadata
+def binary_columns_offset(meta_length):
+    offset = BINARY_HEADER.size + meta_length
+    return offset + (-offset % 8)
+
+# Write tasks in the binary layout above
+def write_task_file(path, tasks):
+    tasks = list(tasks)
+    priorities = {}  # Priority -> code, in order of first use
+    codes = [priorities.setdefault(task.priority, len(priorities)) for task in tasks]
+    if len(priorities) > 256:
+        raise ValueError("Too many distinct priorities for the binary format")
+    heaps = ([], [], [])
+    ends = (array("Q"), array("Q"), array("Q"))
+    totals = [0, 0, 0]
+    due_text = {}
+    for row, task in enumerate(tasks):
+        name, description = task.text_bytes() if isinstance(task, MappedTask) else (
+            task.name.encode("utf-8"), task.description.encode("utf-8"))
+        for i, data in enumerate((task.id.encode("utf-8"), name, description)):
+            heaps[i].append(data)
+            totals[i] += len(data)
+            ends[i].append(totals[i])
+        if task._due_text is not None:
+            due_text[str(row)] = task._due_text
+
+    meta = json.dumps({"priorities": list(priorities), "byteorder": sys.byteorder,
+                       "due_text": due_text}).encode("utf-8")
+    with open(path, "wb") as file:
+        file.write(BINARY_HEADER.pack(BINARY_MAGIC, len(tasks), len(meta)))
+        file.write(meta)
+        file.write(b"\0" * (binary_columns_offset(len(meta)) - BINARY_HEADER.size - len(meta)))
+        for column in ends:
+            file.write(column.tobytes())
+        file.write(array("i", (task.due_ordinal for task in tasks)).tobytes())
+        file.write(bytes(codes))
+        for heap in heaps:
+            file.writelines(heap)
+
+# A task read from a binary task file; name and description are decoded on first use.
+# _source is the (TaskFile, row) it reads them from, one attribute so that moving the
+# task to a new file changes both at once.
+class MappedTask(Task):
+    __slots__ = ("_source",)
+
+    # Tasks for rows start..stop-1, reading each column once for the whole range
+    @classmethod
+    def from_rows(cls, task_file, start, stop):
+        priorities = task_file.priorities
+        due_text = task_file.due_text
+        set_description = Task.description.__set__
+        tasks = []
+        for row, task_id, code, ordinal in zip(range(start, stop), task_file.ids(start, stop),
+                                               task_file.priority[start:stop].tolist(),
+                                               task_file.due[start:stop].tolist()):
+            task = cls.__new__(cls)
+            task.id = task_id
+            task._name = None
+            set_description(task, None)
+            task._priority = priorities[code]
+            task.due_ordinal = ordinal
+            task._due_text = due_text.get(row) if due_text else None
+            task._source = (task_file, row)
+            tasks.append(task)
+        return tasks
+
+    @property
+    def name(self):
+        if self._name is None:
+            task_file, row = self._source
+            self._name = sys.intern(task_file.raw_name(row).decode("utf-8"))
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        self._name = sys.intern(value)
+
+    @property
+    def description(self):
+        value = Task.description.__get__(self)
+        if value is None:
+            task_file, row = self._source
+            value = task_file.raw_description(row).decode("utf-8")
+            Task.description.__set__(self, value)
+        return value
+
+    @description.setter
+    def description(self, value):
+        Task.description.__set__(self, value)
+
+    # UTF-8 name and description, copied straight from the file if not decoded yet
+    def text_bytes(self):
+        task_file, row = self._source
+        name = task_file.raw_name(row) if self._name is None else self._name.encode("utf-8")
+        description = Task.description.__get__(self)
+        if description is None:
+            return name, task_file.raw_description(row)
+        return name, description.encode("utf-8")
+
+# The tasks of a binary task file as an id -> Task mapping, for BinaryStorage. A row
+# becomes a MappedTask only when it is looked up; tasks added or edited since the file
+# was written are held in memory on top of it. Iterating goes in file order (deleted
+# rows skipped, edited ones in their place), then the added tasks.
+class TaskFileMap(MutableMapping):
+    def __init__(self):
+        self.version = 0  # Bumped by every change
+        self.attach(None)
+
+    # Start over from the rows of a task file (or none)
+    def attach(self, task_file):
+        self.task_file = task_file
+        self.count = task_file.count if task_file is not None else 0
+        self.row_ids = task_file.ids(0, self.count) if self.count else []
+        self.rows = {task_id: row for row, task_id in enumerate(self.row_ids)}  # Of rows not deleted
+        self.gone = set()  # Rows of deleted tasks
+        self.changed = {}  # id -> Task edited since the file was written
+        self.added = {}  # id -> Task added since the file was written, in order
+        self.looked_up = {}  # id -> MappedTask of an unchanged row, so lookups return one object
+        self.version += 1
+        self.dirty = None  # Ids changed since snapshot_tasks(), while a snapshot is written
+
+    def __getitem__(self, task_id):
+        task = self.changed.get(task_id) or self.added.get(task_id) or self.looked_up.get(task_id)
+        if task is None:
+            row = self.rows[task_id]
+            task = self.looked_up[task_id] = MappedTask.from_rows(self.task_file, row, row + 1)[0]
+        return task
+
+    # Storing a task (even the one already there) marks its row as out of date
+    def __setitem__(self, task_id, task):
+        self.version += 1
+        if task_id in self.rows:
+            self.changed[task_id] = task
+            self.looked_up.pop(task_id, None)
+        else:
+            self.added[task_id] = task
+        if self.dirty is not None:
+            self.dirty[task_id] = None
+
+    def __delitem__(self, task_id):
+        self.version += 1
+        if task_id in self.rows:
+            self.gone.add(self.rows.pop(task_id))
+            self.changed.pop(task_id, None)
+            self.looked_up.pop(task_id, None)
+        else:
+            del self.added[task_id]
+        if self.dirty is not None:
+            self.dirty[task_id] = None
+
+    def __contains__(self, task_id):
+        return task_id in self.rows or task_id in self.added
+
+    def __iter__(self):
+        if self.gone:
+            gone = self.gone
+            yield from (task_id for row, task_id in enumerate(self.row_ids) if row not in gone)
+        else:
+            yield from self.row_ids
+        yield from self.added
+
+    def __len__(self):
+        return len(self.rows) + len(self.added)
+
+    def clear(self):
+        self.attach(None)
+
+    # Every task; rows nobody looked up are read a batch at a time and not kept
+    def values(self):
+        return TaskFileValues(self)
+
+    # Every task as a slot, numbered in mapping order: the row of a file task, or count + i
+    # for the i-th added one. Returns the rows still described by the file, in order, and
+    # {slot: Task} for the tasks held in memory.
+    def slots(self):
+        count = self.count
+        held = {self.rows[task_id]: task for task_id, task in self.changed.items()}
+        skip = self.gone.union(held) if held else self.gone
+        rows = [row for row in range(count) if row not in skip] if skip else list(range(count))
+        held.update(zip(range(count, count + len(self.added)), self.added.values()))
+        return rows, held
+
+    # Move onto a newly written file of these tasks. Tasks changed while it was being
+    # written are held on top of it again, and looked-up rows are moved to the new file.
+    def replace_file(self, task_file):
+        held = {task_id: self.changed.get(task_id) or self.added.get(task_id) for task_id in self.dirty or ()}
+        looked_up = self.looked_up
+        self.attach(task_file)
+        for task_id, task in looked_up.items():
+            row = self.rows.get(task_id)
+            if row is not None and task_id not in held:
+                task._source = (task_file, row)
+                self.looked_up[task_id] = task
+        for task_id, task in held.items():
+            if task is not None:
+                self[task_id] = task
+            elif task_id in self:
+                del self[task_id]
+
+class TaskFileValues(ValuesView):
+    def __iter__(self):
+        task_map = self._mapping
+        task_file, gone, changed, looked_up = task_map.task_file, task_map.gone, task_map.changed, task_map.looked_up
+        for start in range(0, task_map.count, LOAD_BATCH_SIZE):
+            stop = min(task_map.count, start + LOAD_BATCH_SIZE)
+            for row, task in enumerate(MappedTask.from_rows(task_file, start, stop), start):
+                if row not in gone:
+                    yield changed.get(task.id) or looked_up.get(task.id) or task
+        yield from task_map.added.values()
+
+# Stores tasks in a memory-mapped binary file plus a journal. Opening it only reads the
+# ids; filters and sorts on priority and due date read the fixed-width columns, so names
+# and descriptions are decoded just for the rows that get shown (or matched by a name
+# filter), and a row becomes a task object only when it is looked up.
+class BinaryStorage(JournaledStorage):
+    supports_queries = True
+
+    def __init__(self, bin_file='tasks.bin', journal=True, journal_limit=1024 * 1024):
+        super().__init__(bin_file, journal, journal_limit)
+        self.task_file = None
+        self.task_map = self.new_task_map()
+        self._filtered = None  # ((filters, version), (rows, held)) of the last filter
+        self._ordered = None  # ((filters, order, version), (slots, held)) of the last sorted filter
+
+    def new_task_map(self):
+        return TaskFileMap()
+
+    # The whole file is there as soon as it is mapped, so it comes as a single batch
+    def iter_snapshot(self, task_map, batch_size):
+        if self.task_file is not None:
+            self.task_file.close()
+            self.task_file = None
+        try:
+            self.task_file = TaskFile(self.snapshot_file)
+        except (FileNotFoundError, ValueError, struct.error):
+            return False
+        task_map.attach(self.task_file)
+        if self.task_file.count:
+            yield task_map.values(), 1.0
+        return False
+
+    def write_snapshot(self, path, tasks):
+        write_task_file(path, tasks)
+
+    # Edits made from here on are held on top of the file being written
+    def snapshot_tasks(self):
+        self.task_map.dirty = {}
+        return list(self.task_map.values())
+
+    # Move the tasks onto the new file. The old one is not closed: tasks handed out
+    # before may still read their names from it, and it is unmapped once they are gone.
+    def snapshot_replaced(self, tasks):
+        self.task_file = TaskFile(self.snapshot_file)
+        self.task_map.replace_file(self.task_file)
+
+    # An edited row is held in memory from now on
+    def update(self, task, task_data):
+        self.task_map[task.id] = task
+        super().update(task, task_data)
+
+    # Ids of tasks matching the filters. window=(offset, count) returns just those rows of
+    # the result. The last filtered and the last ordered slots are kept until the tasks
+    # change, so counting a page and reading it, or turning pages, filter only once.
+    def filter_ids(self, name="", priority="All", date="", order=None, due_range=None, window=None):
+        filters = (name, priority, date, due_range)
+        key = (filters, order, self.task_map.version)
+        if self._ordered is not None and self._ordered[0] == key:
+            slots, held = self._ordered[1]
+        else:
+            rows, held = self._filter(*filters)
+            slots = sorted(rows + list(held)) if held else rows
+            if order:
+                slots = sorted(slots, key=self._slot_key(order[0], held))
+                if order[1]:
+                    slots.reverse()  # Ties too, the way the manager's sorted views reverse
+                self._ordered = (key, (slots, held))
+        if window is not None:
+            slots = slots[window[0]:window[0] + window[1]]
+        row_ids = self.task_map.row_ids
+        return [held[slot].id if slot in held else row_ids[slot] for slot in slots]
+
+    def count_ids(self, name="", priority="All", date="", due_range=None):
+        rows, held = self._filter(name, priority, date, due_range)
+        return len(rows) + len(held)
+
+    def sorted_ids(self, key, reverse=False):
+        return self.filter_ids(order=(key, reverse))
+
+    # Rows of the file and tasks held in memory ({slot: Task}) that match the filters.
+    # Rows not edited since the file was written are checked on its columns, priority and
+    # date as codes and ordinals; the tasks held in memory on their fields.
+    def _filter(self, name, priority, date, due_range):
+        task_map = self.task_map
+        key = ((name, priority, date, due_range), task_map.version)
+        if self._filtered is not None and self._filtered[0] == key:
+            return self._filtered[1]
+        task_file = task_map.task_file
+        rows, held = task_map.slots()
+        dues, due_text = [], {}
+        if task_file is not None and (due_range is not None or date):
+            dues, due_text = task_file.due.tolist(), task_file.due_text
+        if due_range is not None:
+            first, last = due_range_ordinals(due_range)
+            rows = [row for row in rows if first <= dues[row] <= last]
+            held = {slot: t for slot, t in held.items() if first <= t.due_ordinal <= last}
+        if priority != "All":
+            if rows:
+                codes = task_file.priority.tolist()
+                file_codes = {code for code, name in enumerate(task_file.priorities) if name == priority}
+                rows = [row for row in rows if codes[row] in file_codes]
+            held = {slot: t for slot, t in held.items() if t.priority == priority}
+        if date:
+            ordinal = date_ordinal(date)
+            if ordinal == UNKNOWN_DATE:
+                rows = [row for row in rows if due_text.get(row) == date]
+                held = {slot: t for slot, t in held.items() if t._due_text == date}
+            else:
+                rows = [row for row in rows if dues[row] == ordinal and row not in due_text]
+                held = {slot: t for slot, t in held.items() if t.due_ordinal == ordinal and t._due_text is None}
+        if name:
+            name = name.lower()
+            if rows:
+                named = set(task_file.rows_named(name))
+                rows = [row for row in rows if row in named]
+            held = {slot: t for slot, t in held.items() if name in t.name.lower()}
+        self._filtered = (key, (rows, held))
+        return rows, held
+
+    # Sort key of a slot, matching sort_key() on its task
+    def _slot_key(self, key, held):
+        if isinstance(key, tuple):
+            funcs = [self._slot_key(column, held) for column in key]
+            return lambda slot: tuple(func(slot) for func in funcs)
+        task_file = self.task_map.task_file
+        if task_file is None:
+            row_key = None  # Every task is held in memory
+        elif key == "priority":
+            ranks = [PRIORITY_ORDER.get(name, 3) for name in task_file.priorities]
+            row_key = [ranks[code] for code in task_file.priority.tolist()].__getitem__
+        elif key == "due_date":
+            row_key = task_file.due.tolist().__getitem__
+        elif key in ("name", "description"):
+            raw = task_file.raw_name if key == "name" else task_file.raw_description
+            row_key = lambda row: raw(row).decode("utf-8").lower()
+        else:
+            row_ids = self.task_map.row_ids
+            row_key = lambda row: sort_key(key)(self.task_map[row_ids[row]])
+        if not held:
+            return row_key
+        task_key = sort_key(key)
+        return lambda slot: task_key(held[slot]) if slot in held else row_key(slot)
+
+    def close(self):
+        super().close()
+        if self.task_file is not None:
+            self.task_file.close()
+            self.task_file = None
+
+# Columns each sort key orders by in SQLite (name and priority use the indexed helper columns)
+SQLITE_SORT_COLUMNS = {
+    "name": "name_lower",
+    "description": "lower(description)",
+    "priority": "priority_rank",
+    "due_date": "due_date",
+}
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_lower TEXT NOT NULL,
+    description TEXT NOT NULL,
+    priority TEXT NOT NULL,
+    priority_rank INTEGER NOT NULL,
+    due_date TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_name_lower ON tasks (name_lower);
+CREATE INDEX IF NOT EXISTS tasks_priority ON tasks (priority_rank);
+CREATE INDEX IF NOT EXISTS tasks_priority_name ON tasks (priority);
+CREATE INDEX IF NOT EXISTS tasks_due_date ON tasks (due_date);
+"""
+
+# Stores tasks in a SQLite database, one row per task, and answers filters and sorts with
+# SQL. Only the querying is left to SQLite: loading still reads every row into the
+# manager's task map (the GUI, reminders and summaries read tasks from it), so memory
+# grows with the table as it does for tasks.json.
+class SqliteStorage:
+    supports_queries = True
+
+    def __init__(self, db_file='tasks.db'):
+        self.db_file = db_file
+        # Filters may run on the GUI's worker thread; TaskManager.lock serialises access
+        import sqlite3  # Imported here to keep it off the startup path of the other backends
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        self.connection.executescript(SQLITE_SCHEMA)
+
+    def new_task_map(self):
+        return {}
+
+    # Load all rows in insertion order, a batch at a time (see above: every row is kept)
+    def iter_load(self, task_map, batch_size=LOAD_BATCH_SIZE):
+        total = self.connection.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] or 1
+        cursor = self.connection.execute(
+            "SELECT id, name, description, priority, due_date FROM tasks ORDER BY rowid")
+        loaded = 0
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return False
+            batch = [Task(name, description, priority, due_date, task_id)
+                     for task_id, name, description, priority, due_date in rows]
+            for task in batch:
+                task_map[task.id] = task
+            loaded += len(batch)
+            yield batch, loaded / total
+
+    # Changes are written to the connection as they happen; flush commits them, so a burst
+    # of edits is one transaction (and one fsync)
+    def flush(self, lock):
+        with lock:
+            self.connection.commit()
+
+    # Every row is already in the database, so a full save is just a flush
+    def request_save(self):
+        pass
+
+    def add(self, task):
+        self._execute(self._insert_sql(), [self._row(task)])
+
+    def add_many(self, tasks):
+        self._execute(self._insert_sql(), [self._row(task) for task in tasks])
+
+    def update(self, task, task_data):
+        self._execute(
+            "UPDATE tasks SET name = ?, name_lower = ?, description = ?, priority = ?, "
+            "priority_rank = ?, due_date = ? WHERE id = ?",
+            [self._row(task)[1:] + (task.id,)])
+
+    def delete(self, task_id):
+        self._execute("DELETE FROM tasks WHERE id = ?", [(task_id,)])
+
+    # Ids of tasks matching the filters, ordered by the given sort or insertion order.
+    # window=(offset, count) returns just those rows, with LIMIT/OFFSET.
+    def filter_ids(self, name="", priority="All", date="", order=None, due_range=None, window=None):
+        where, params = self._where(name, priority, date, due_range)
+        sql = "SELECT id FROM tasks" + where
+        sql += self._order_by(*order) if order else " ORDER BY rowid"
+        if window is not None:
+            sql += " LIMIT ? OFFSET ?"
+            params += [window[1], window[0]]
+        return [row[0] for row in self.connection.execute(sql, params)]
+
+    def count_ids(self, name="", priority="All", date="", due_range=None):
+        where, params = self._where(name, priority, date, due_range)
+        return self.connection.execute("SELECT COUNT(*) FROM tasks" + where, params).fetchone()[0]
+
+    # WHERE clause and parameters for the filters ("" when there are none)
+    def _where(self, name, priority, date, due_range):
+        clauses, params = [], []
+        if name:
+            clauses.append("instr(name_lower, ?) > 0")
+            params.append(name.lower())
+        if priority != "All":  # By name: every priority other than High/Medium/Low ranks 3
+            clauses.append("priority = ?")
+            params.append(priority)
+        if date:
+            clauses.append("due_date = ?")
+            params.append(date)
+        if due_range is not None:
+            # Dates are stored as YYYY-MM-DD text, so the range is a string range on the index
+            first, last = due_range_ordinals(due_range)
+            if first > last:
+                clauses.append("0")
+            else:
+                clauses.append("due_date BETWEEN ? AND ?")
+                params += [date_text(first), date_text(last)]
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    # Ids of all tasks ordered by a column
+    def sorted_ids(self, key, reverse=False):
+        sql = "SELECT id FROM tasks" + self._order_by(key, reverse)
+        return [row[0] for row in self.connection.execute(sql)]
+
+    def close(self):
+        self.connection.commit()
+        self.connection.close()
+
+    # Ties are broken by insertion order, also reversed, as the manager's sorted views do
+    def _order_by(self, key, reverse):
+        direction = "DESC" if reverse else "ASC"
+        columns = ", ".join(f"{SQLITE_SORT_COLUMNS.get(column, 'name_lower')} {direction}"
+                            for column in (key if isinstance(key, tuple) else (key,)))
+        return f" ORDER BY {columns}, rowid {direction}"
+
+    def _insert_sql(self):
+        return ("INSERT OR REPLACE INTO tasks "
+                "(id, name, name_lower, description, priority, priority_rank, due_date) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)")
+
+    def _row(self, task):
+        return (task.id, task.name, task.name.lower(), task.description,
+                task.priority, PRIORITY_ORDER.get(task.priority, 3), task.due_date)
+
+    # Run a statement for each parameter set inside the open transaction
+    @timed
+    def _execute(self, sql, param_sets):
+        self.connection.executemany(sql, param_sets)
+
+# -------------------- Sharded Storage --------------------
+
+SHARD_MANIFEST = "manifest.json"
+UNDATED_SHARD = "undated"  # Shard for tasks whose due date is not a plain date
+
+# Shard (due month, "YYYY-MM") a task is stored in
+def shard_key(task):
+    if task.due_ordinal == UNKNOWN_DATE:
+        return UNDATED_SHARD
+    day = date.fromordinal(task.due_ordinal)
+    return f"{day.year:04d}-{day.month:02d}"
+
+# Task fields of every task in a shard file, as plain tuples (runs in pool workers too)
+def read_shard_rows(path):
+    with open(path, "r") as file:
+        return [(t["name"], t["description"], t["priority"], t["due_date"], t["id"]) for t in json.load(file)]
+
+# Stores tasks in a directory of JSON files, one per due month, listed in a manifest.
+# A flush rewrites only the months that changed. Passing due_range loads just the
+# months it overlaps; changes that land in other months are merged into their files
+# on disk. With workers > 1 the shards are parsed in parallel by a process pool.
+class ShardedStorage:
+    supports_queries = False
+
+    def __init__(self, directory='tasks.shards', due_range=None, workers=0):
+        self.directory = directory
+        self.due_range = due_range
+        self.workers = workers
+        self.task_map = {}
+        self.manifest = {"generation": 0, "shards": {}}  # shard -> {"file", "count"}
+        self.shard_ids = {}  # shard -> {id: None} of tasks in memory, in insertion order
+        self.task_shard = {}  # id -> shard
+        self.loaded = set()  # Shards read in full; the others are only known from the manifest
+        self.removed = {}  # shard not loaded -> ids to drop from its file on the next flush
+        self.dirty = set()  # Shards to rewrite on the next flush
+
+    def new_task_map(self):
+        return {}
+
+    # Load every shard in the window (all of them by default), one batch at a time
+    def iter_load(self, task_map, batch_size=LOAD_BATCH_SIZE):
+        self.task_map = task_map
+        self.shard_ids, self.task_shard, self.loaded, self.removed, self.dirty = {}, {}, set(), {}, set()
+        try:
+            with open(os.path.join(self.directory, SHARD_MANIFEST), "r") as file:
+                self.manifest = json.load(file)
+        except FileNotFoundError:
+            os.makedirs(self.directory, exist_ok=True)
+        shards = [key for key in sorted(self.manifest["shards"]) if self._in_window(key)]
+        paths = [os.path.join(self.directory, self.manifest["shards"][key]["file"]) for key in shards]
+        total = sum(self.manifest["shards"][key]["count"] for key in shards) or 1
+
+        pool = None
+        if self.workers > 1 and len(paths) > 1:
+            # spawn, not fork: the GUI loads from a background thread. Imported here, as
+            # multiprocessing adds noticeably to the import time of every start.
+            import multiprocessing
+            from concurrent.futures import ProcessPoolExecutor
+            pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+            results = pool.map(read_shard_rows, paths)
+        else:
+            results = map(read_shard_rows, paths)
+        try:
+            loaded = 0
+            for key, rows in zip(shards, results):
+                ids = self.shard_ids.setdefault(key, {})
+                for start in range(0, len(rows), batch_size):
+                    batch = [Task(*row) for row in rows[start:start + batch_size]]
+                    for task in batch:
+                        task_map[task.id] = task
+                        ids[task.id] = None
+                        self.task_shard[task.id] = key
+                    loaded += len(batch)
+                    yield batch, min(1.0, loaded / total)
+                self.loaded.add(key)
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+        return False
+
+    def add(self, task):
+        self._place(task)
+
+    def add_many(self, tasks):
+        for task in tasks:
+            self._place(task)
+
+    def update(self, task, task_data):
+        self._place(task)
+
+    def delete(self, task_id):
+        key = self.task_shard.pop(task_id, None)
+        if key is not None:
+            del self.shard_ids[key][task_id]
+            self._removed_from(key, task_id)
+
+    # Rewrite every loaded shard on the next flush
+    def request_save(self):
+        self.dirty.update(self.loaded)
+
+    # Write the changed shards as new files, then switch to them with a new manifest;
+    # the manifest rename is the commit point, so a crash leaves the old set whole
+    @timed
+    def flush(self, lock):
+        with lock:
+            if not self.dirty:
+                return
+            dirty, self.dirty = self.dirty, set()
+            shards = {key: [self.task_map[task_id] for task_id in self.shard_ids.get(key, ())] for key in dirty}
+            removed = {key: self.removed.pop(key) for key in dirty if key in self.removed}
+        try:
+            manifest = {"generation": self.manifest["generation"] + 1, "shards": dict(self.manifest["shards"])}
+            for key, tasks in shards.items():
+                records = [task.to_dict() for task in tasks]
+                if key not in self.loaded and key in manifest["shards"]:
+                    # Merge into the file of a shard that was never loaded
+                    in_memory = {record["id"] for record in records}
+                    dropped = removed.get(key, set())
+                    old_path = os.path.join(self.directory, manifest["shards"][key]["file"])
+                    records = [{"id": task_id, "name": name, "description": description,
+                                "priority": priority, "due_date": due_date}
+                               for name, description, priority, due_date, task_id in read_shard_rows(old_path)
+                               if task_id not in in_memory and task_id not in dropped] + records
+                if records:
+                    name = f"{key}.{manifest['generation']}.json"
+                    path = os.path.join(self.directory, name)
+                    with open(path, "w") as file:
+                        json.dump(records, file, indent=4)
+                        file.flush()
+                        os.fsync(file.fileno())
+                    METRICS.add_bytes("ShardedStorage.flush", os.path.getsize(path))
+                    manifest["shards"][key] = {"file": name, "count": len(records)}
+                else:
+                    manifest["shards"].pop(key, None)
+
+            manifest_path = os.path.join(self.directory, SHARD_MANIFEST)
+            with open(manifest_path + ".tmp", "w") as file:
+                json.dump(manifest, file, indent=4)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(manifest_path + ".tmp", manifest_path)
+            sync_directory(manifest_path)
+        except Exception:
+            with lock:
+                self.dirty |= dirty
+                for key, ids in removed.items():
+                    self.removed.setdefault(key, set()).update(ids)
+            raise
+
+        # Old files of rewritten shards are no longer referenced
+        for key in dirty:
+            old = self.manifest["shards"].get(key)
+            if old is not None and old != manifest["shards"].get(key):
+                try:
+                    os.remove(os.path.join(self.directory, old["file"]))
+                except OSError:
+                    pass
+        self.manifest = manifest
+
+    def close(self):
+        pass
+
+    # Move a new or changed task to the shard of its due month
+    def _place(self, task):
+        key = shard_key(task)
+        old_key = self.task_shard.get(task.id)
+        if old_key is not None and old_key != key:
+            del self.shard_ids[old_key][task.id]
+            self._removed_from(old_key, task.id)
+        self.task_shard[task.id] = key
+        self.shard_ids.setdefault(key, {})[task.id] = None
+        self.dirty.add(key)
+        if key not in self.loaded and key not in self.manifest["shards"]:
+            self.loaded.add(key)  # A new shard: everything in it is in memory
+
+    def _removed_from(self, key, task_id):
+        self.dirty.add(key)
+        if key not in self.loaded:
+            self.removed.setdefault(key, set()).add(task_id)
+
+    # Whether a shard overlaps the due-date window being loaded
+    def _in_window(self, key):
+        if self.due_range is None:
+            return True
+        if key == UNDATED_SHARD:
+            return False
+        first, last = due_range_ordinals(self.due_range)
+        year, month = map(int, key.split("-"))
+        month_start = date(year, month, 1)
+        next_month = date(year + month // 12, month % 12 + 1, 1)
+        return first < next_month.toordinal() and last >= month_start.toordinal()
+
+# -------------------- Background Writer --------------------
+
+WRITE_INTERVAL = 0.5  # Seconds of edits gathered into a single write
+WRITE_RETRY = 5.0  # Seconds before a failed write is tried again
+
+# Flushes a storage backend on a background thread, at most once per interval, so a
+# burst of edits costs one write and a slow disk never holds up the GUI. Failed writes
+# keep their changes staged, are retried, and are reported once through errors.
+class BackgroundWriter:
+    def __init__(self, storage, lock, interval=WRITE_INTERVAL):
+        self.storage = storage
+        self.lock = lock  # The manager's lock, held by the storage only while staging
+        self.interval = interval
+        self.condition = threading.Condition()
+        self.dirty = False
+        self.stopping = False
+        self.flush_lock = threading.Lock()  # One flush at a time, from the thread or flush()
+        self.errors = queue.Queue()  # Exceptions from failed background writes, read by the GUI
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    # Note that there are staged changes to write
+    def mark_dirty(self):
+        with self.condition:
+            self.dirty = True
+            self.condition.notify()
+
+    # Write everything staged now, on the calling thread; raises on failure
+    def flush(self):
+        with self.flush_lock:
+            self.storage.flush(self.lock)
+
+    # Stop the thread and write whatever is still staged
+    def close(self):
+        with self.condition:
+            self.stopping = True
+            self.condition.notify()
+        self.thread.join()
+        self.flush()
+
+    def _run(self):
+        failing = False
+        while True:
+            with self.condition:
+                self.condition.wait_for(lambda: self.dirty or self.stopping)
+                # Let more edits arrive before writing (close() flushes straight away)
+                self.condition.wait_for(lambda: self.stopping, self.interval)
+                if self.stopping:
+                    return
+                self.dirty = False
+            try:
+                self.flush()
+                failing = False
+            except Exception as e:
+                if not failing:
+                    self.errors.put(e)
+                failing = True
+                with self.condition:
+                    self.dirty = True
+                    self.condition.wait_for(lambda: self.stopping, WRITE_RETRY)
+
+# -------------------- Importing Old Task Files --------------------
+
+TXT_LABELS = {"Name": "name", "Description": "description", "Priority": "priority", "Due Date": "due_date"}
+
+# Stream task dicts from the Stage 02 text format ("Name: ...", ..., "-----" between tasks)
+def iter_tasks_txt(file):
+    fields = {}
+    for line in file:
+        line = line.strip()
+        if line == "-----":
+            if fields:
+                yield {"name": fields.get("name", ""), "description": fields.get("description", ""),
+                       "priority": fields.get("priority", "Medium"), "due_date": fields.get("due_date", "")}
+                fields = {}
+            continue
+        label, _, value = line.partition(": ")
+        if label in TXT_LABELS:
+            fields[TXT_LABELS[label]] = value
+
+# Read tasks from a Stage 02 tasks.txt file
+def read_tasks_txt(txt_file='tasks.txt'):
+    with open(txt_file, "r") as file:
+        return [Task.from_dict(fields) for fields in iter_tasks_txt(file)]
+
+# One-shot import of tasks.json and tasks.txt into a TaskManager (any backend)
+def import_legacy_tasks(manager, json_file='tasks.json', txt_file='tasks.txt'):
+    tasks = []
+    if json_file and os.path.exists(json_file):
+        with open(json_file, "r") as file:
+            tasks.extend(Task.from_dict(task_dict) for task_dict in json.load(file))
+    if txt_file and os.path.exists(txt_file):
+        tasks.extend(read_tasks_txt(txt_file))
+    manager.add_tasks(tasks)
+    return len(tasks)
+
+# -------------------- Filter Indexes --------------------
+
+NGRAM_SIZE = 3  # Names are indexed by every 3-character substring
+
+# Keeps priority, due date and name n-gram indexes in step with the task list
+class TaskIndex:
+    def __init__(self):
+        self.by_priority = {}  # priority -> set of ids
+        self.by_date = {}  # due_date -> set of ids
+        self.by_ngram = {}  # n-gram of the lowercased name -> set of ids
+        self.names = {}  # id -> lowercased name
+        self.entries = {}  # id -> (priority, due_date) as indexed, used on removal
+        self.positions = {}  # id -> insertion position, iterates in insertion order
+        # The same positions as parallel lists, ascending, for paging to a position by
+        # bisection; a deleted task's id becomes None until the lists are compacted
+        self.position_list = []
+        self.position_ids = []
+        self._deleted = 0
+        self._next_position = 0
+
+    # Index every task from scratch, in display order
+    def rebuild(self, tasks):
+        self.__init__()
+        for task in tasks:
+            self.add(task)
+
+    def add(self, task):
+        self.names[task.id] = name = task.name.lower()
+        self.entries[task.id] = (task.priority, task.due_date)
+        self.by_priority.setdefault(task.priority, set()).add(task.id)
+        self.by_date.setdefault(task.due_date, set()).add(task.id)
+        for gram in self._ngrams(name):
+            self.by_ngram.setdefault(gram, set()).add(task.id)
+        if task.id not in self.positions:
+            self.positions[task.id] = self._next_position
+            self.position_list.append(self._next_position)
+            self.position_ids.append(task.id)
+            self._next_position += 1
+
+    def remove(self, task_id, keep_position=False):
+        name = self.names.pop(task_id, None)
+        if name is None:
+            return
+        priority, due_date = self.entries.pop(task_id)
+        self._discard(self.by_priority, priority, task_id)
+        self._discard(self.by_date, due_date, task_id)
+        for gram in self._ngrams(name):
+            self._discard(self.by_ngram, gram, task_id)
+        if not keep_position:
+            self._remove_position(task_id)
+
+    # Re-index a task after its fields changed, keeping its place in the order
+    def update(self, task):
+        self.remove(task.id, keep_position=True)
+        self.add(task)
+
+    # Ids matching all given filters (unordered), or None when there are no filters
+    def query(self, name="", priority="All", date=""):
+        candidates = []
+        if priority != "All":
+            candidates.append(self.by_priority.get(priority, set()))
+        if date:
+            candidates.append(self.by_date.get(date, set()))
+        name = name.lower()
+        grams = self._ngrams(name)
+        for gram in grams:
+            candidates.append(self.by_ngram.get(gram, set()))
+        if not candidates and not name:
+            return None
+
+        # Intersect from the smallest candidate set up, stopping as soon as nothing is left
+        if candidates:
+            candidates.sort(key=len)
+            ids = set(candidates[0])
+            for candidate in candidates[1:]:
+                if not ids:
+                    break
+                ids &= candidate
+        else:
+            ids = self.names.keys()  # Name shorter than an n-gram with no other filters
+
+        # n-grams only narrow the search, the substring itself is checked on the survivors
+        if name:
+            names = self.names
+            ids = [task_id for task_id in ids if name in names[task_id]]
+        return ids
+
+    # Put ids in insertion order
+    def order(self, ids):
+        # positions iterates in insertion order, so large results are filtered rather than sorted
+        if len(ids) > len(self.positions) // 8:
+            ids = set(ids)
+            return [task_id for task_id in self.positions if task_id in ids]
+        return sorted(ids, key=self.positions.__getitem__)
+
+    def _ngrams(self, name):
+        return {name[i:i + NGRAM_SIZE] for i in range(len(name) - NGRAM_SIZE + 1)}
+
+    # Drop a position, squeezing the deleted ones out of the lists once they are half
+    def _remove_position(self, task_id):
+        position = self.positions.pop(task_id, None)
+        if position is None:
+            return
+        self.position_ids[bisect_left(self.position_list, position)] = None
+        self._deleted += 1
+        if self._deleted > 1024 and self._deleted * 2 > len(self.position_list):
+            kept = [(at, kept_id) for at, kept_id in zip(self.position_list, self.position_ids) if kept_id is not None]
+            self.position_list = [at for at, _ in kept]
+            self.position_ids = [kept_id for _, kept_id in kept]
+            self._deleted = 0
+
+    def _discard(self, index, key, task_id):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(task_id)
+            if not ids:
+                del index[key]
+
+# -------------------- Full-Text Search --------------------
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+# Inverted index over the words of task names and descriptions
+class TextIndex:
+    def __init__(self):
+        self.postings = {}  # term -> {id: times the term appears in the task}
+        self.repeats = {}  # term -> {count: {id: None}} for tasks with the term more than once
+        self.doc_terms = {}  # id -> terms indexed for the task, used on removal
+        self.vocabulary = []  # Sorted terms, for prefix lookups
+
+    # Words of each task, counted: (id, Counter) pairs. Only reads the tasks, so the
+    # manager runs it outside its lock and hands the result to add_counts.
+    @staticmethod
+    def count_terms(tasks):
+        return list(TextIndex.iter_counts(tasks))
+
+    @staticmethod
+    def iter_counts(tasks):
+        findall = TOKEN_PATTERN.findall
+        for task in tasks:
+            yield task.id, Counter(findall(f"{task.name} {task.description}".lower()))
+
+    def rebuild(self, tasks):
+        self.__init__()
+        for task_id, counts in self.iter_counts(tasks):  # One task's counts held at a time
+            self._index(task_id, counts)
+        self.vocabulary = sorted(self.postings)
+
+    def add(self, task):
+        self.add_counts(self.count_terms([task]))
+
+    # Index (or index again) tasks from count_terms
+    def add_counts(self, counted):
+        new_terms = []
+        for task_id, counts in counted:
+            if task_id in self.doc_terms:
+                self.remove(task_id)
+            new_terms += self._index(task_id, counts)
+        if len(new_terms) > 8:
+            self.vocabulary += new_terms
+            self.vocabulary.sort()  # Two sorted runs, merged in linear time
+        else:
+            for term in new_terms:
+                insort(self.vocabulary, term)
+
+    def remove(self, task_id):
+        for term in self.doc_terms.pop(task_id, ()):
+            ids = self.postings[term]
+            count = ids.pop(task_id)
+            if count > 1:
+                buckets = self.repeats[term]
+                del buckets[count][task_id]
+                if not buckets[count]:
+                    del buckets[count]
+                    if not buckets:
+                        del self.repeats[term]
+            if not ids:
+                del self.postings[term]
+                del self.vocabulary[bisect_left(self.vocabulary, term)]
+
+    def update(self, task):
+        self.remove(task.id)
+        self.add(task)
+
+    # Index one task's counted words, returns the terms that are new to the index
+    def _index(self, task_id, counts):
+        self.doc_terms[task_id] = tuple(counts)
+        postings, repeats = self.postings, self.repeats
+        new_terms = []
+        for term, count in counts.items():
+            ids = postings.get(term)
+            if ids is None:
+                ids = postings[term] = {}
+                new_terms.append(term)
+            ids[task_id] = count
+            if count > 1:
+                buckets = repeats.get(term)
+                if buckets is None:
+                    buckets = repeats[term] = {}
+                bucket = buckets.get(count)
+                if bucket is None:
+                    bucket = buckets[count] = {}
+                bucket[task_id] = None
+        return new_terms
+
+    # Ids matching a query, best match first. Words are ANDed, "OR" separates
+    # alternatives and a trailing "*" matches any word starting with the prefix.
+    # Score is the sum over the query words of count * log(1 + tasks / tasks with the
+    # word). allowed (a set) restricts the ids before the limit is taken.
+    def search(self, query, limit=None, allowed=None):
+        groups = [[]]
+        for word in query.lower().split():
+            if word == "or":
+                groups.append([])
+            elif word != "and":
+                terms = TOKEN_PATTERN.findall(word)
+                groups[-1].extend((term, False) for term in terms[:-1])
+                if terms:
+                    groups[-1].append((terms[-1], word.endswith("*")))
+        if limit is not None and limit <= 0:
+            return []
+
+        total = len(self.doc_terms) or 1
+        scores = {}
+        for group in groups:
+            if not group:
+                continue
+            for task_id, score in self._group_scores(group, total, limit, allowed):
+                if score > scores.get(task_id, 0):
+                    scores[task_id] = score
+
+        if limit is not None:
+            return heapq.nlargest(limit, scores, key=scores.__getitem__)
+        return sorted(scores, key=scores.__getitem__, reverse=True)
+
+    # (id, score) of the tasks having every term of a group; with a limit, the best that
+    # many. Limited groups walk all their postings together, each highest count first,
+    # scoring every task on first sight, and stop once the tasks kept score at least
+    # the counts just reached could add up to (the threshold algorithm).
+    def _group_scores(self, group, total, limit, allowed):
+        lists = sorted((self._postings(term, prefix) for term, prefix in group), key=lambda item: len(item[0]))
+        if not lists[0][0]:
+            return []
+        weighted = [(ids, repeats, math.log(1 + total / len(ids))) for ids, repeats in lists]
+        first, first_weight = weighted[0][0], weighted[0][2]
+        rest = [(ids, weight) for ids, _, weight in weighted[1:]]
+
+        def score(task_id, count):
+            score = count * first_weight
+            for ids, weight in rest:
+                other = ids.get(task_id)
+                if other is None:
+                    return None
+                score += other * weight
+            return score
+
+        if limit is None:
+            scored = ((task_id, score(task_id, count)) for task_id, count in first.items()
+                      if allowed is None or task_id in allowed)
+            return [(task_id, value) for task_id, value in scored if value is not None]
+
+        walks = [impact_order(ids, repeats) for ids, repeats, _ in weighted]
+        weights = [weight for _, _, weight in weighted]
+        seen, kept, found = set(), [], 0  # kept: min-heap of (score, -found, id)
+        while True:
+            threshold = 0
+            for walk, weight in zip(walks, weights):
+                item = next(walk, None)
+                if item is None:  # Every task with all the terms is in this list: all seen
+                    return [(task_id, value) for value, _, task_id in kept]
+                task_id, count = item
+                threshold += count * weight
+                if task_id in seen:
+                    continue
+                seen.add(task_id)
+                if allowed is not None and task_id not in allowed:
+                    continue
+                value = score(task_id, first[task_id]) if task_id in first else None
+                if value is None:
+                    continue
+                found += 1
+                if len(kept) < limit:
+                    heapq.heappush(kept, (value, -found, task_id))
+                elif value > kept[0][0]:
+                    heapq.heapreplace(kept, (value, -found, task_id))
+            if len(kept) == limit and kept[0][0] >= threshold:
+                return [(task_id, value) for value, _, task_id in kept]
+
+    # Postings of a term, or of every term starting with it merged together, with their
+    # repeats (see __init__)
+    def _postings(self, term, prefix):
+        if not prefix:
+            return self.postings.get(term, {}), self.repeats.get(term, {})
+        merged = {}
+        i = bisect_left(self.vocabulary, term)
+        while i < len(self.vocabulary) and self.vocabulary[i].startswith(term):
+            for task_id, count in self.postings[self.vocabulary[i]].items():
+                merged[task_id] = merged.get(task_id, 0) + count
+            i += 1
+        repeats = {}
+        for task_id, count in merged.items():
+            if count > 1:
+                repeats.setdefault(count, {})[task_id] = None
+        return merged, repeats
+
+# (id, count) pairs of a term's postings, highest count first: the repeated ones by
+# count, then those with the term once in the order they were indexed
+def impact_order(ids, repeats):
+    for count in sorted(repeats, reverse=True):
+        for task_id in repeats[count]:
+            yield task_id, count
+    for task_id, count in ids.items():
+        if count == 1:
+            yield task_id, count
+
+# -------------------- Sorted Views --------------------
+
+# One column's sort order, built once and kept sorted with bisect as tasks change
+class SortedView:
+    def __init__(self, key_func, tasks, positions):
+        self.key_func = key_func
+        self.positions = positions  # Insertion positions from TaskIndex, used to break ties
+        self.keys = {task.id: (key_func(task), positions[task.id]) for task in tasks}
+        self.ids = sorted(self.keys, key=self.keys.__getitem__)
+        self.sort_keys = [self.keys[task_id] for task_id in self.ids]  # Parallel to ids
+
+    def add(self, task):
+        entry = self.keys[task.id] = (self.key_func(task), self.positions[task.id])
+        i = bisect_left(self.sort_keys, entry)
+        self.sort_keys.insert(i, entry)
+        self.ids.insert(i, task.id)
+
+    def remove(self, task_id):
+        entry = self.keys.pop(task_id, None)
+        if entry is not None:
+            i = bisect_left(self.sort_keys, entry)
+            del self.sort_keys[i]
+            del self.ids[i]
+
+    def update(self, task):
+        self.remove(task.id)
+        self.add(task)
+
+    # Put a subset of ids in this view's order
+    def order(self, ids, reverse=False):
+        if len(ids) > len(self.ids) // 8:
+            ids = set(ids)
+            ordered = [task_id for task_id in self.ids if task_id in ids]
+        else:
+            ordered = sorted(ids, key=self.keys.__getitem__)
+        if reverse:
+            ordered.reverse()
+        return ordered
+
+# Read-only, live list of tasks over a list of ids, optionally read back to front
+class TaskList(Sequence):
+    def __init__(self, task_map, ids, reverse=False):
+        self.task_map = task_map
+        self.ids = ids
+        self.reverse = reverse
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self.ids)))]
+        if i < 0:
+            i += len(self.ids)
+        if not 0 <= i < len(self.ids):
+            raise IndexError("task index out of range")
+        return self.task_map[self.ids[-1 - i] if self.reverse else self.ids[i]]
+
+# -------------------- Column Engine --------------------
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()  # Day 0 of datetime64[D]
+COLUMN_SORT_KEYS = ("name", "priority", "due_date")  # Columns the engine can sort by
+
+# NumPy is optional, and only imported when the column engine is asked for
+def load_numpy():
+    try:
+        import numpy
+    except ImportError:
+        return None
+    return numpy
+
+# Task columns held in NumPy arrays, one row per task in insertion order: priority codes
+# (High, Medium and Low are 0-2, other names get codes as this store meets them), due
+# dates as datetime64[D] and lowercased names. Filters on priority and due date are
+# boolean masks over whole columns and sorts are a single lexsort of the matching rows
+# (whole-table orders are kept until the next change). Deleted rows are only marked
+# dead, and squeezed out once they are half the arrays.
+class ColumnEngine:
+    def __init__(self, numpy, tasks):
+        self.np = numpy
+        tasks = list(tasks)
+        count = len(tasks)
+        self.count = count  # Rows in use, dead ones included
+        self.dead = 0
+        self.rows = {task.id: row for row, task in enumerate(tasks)}  # id -> row
+        self.names = [task.name.lower() for task in tasks]  # Row -> lowercased name
+        # Row -> rank of the name in sorted order, built by the first name sort. Names that
+        # appear later get a rank halfway between their neighbours in rank_names.
+        self.name_ranks = None
+        self.rank_names = []  # Every name ranked so far, sorted
+        self.name_rank = {}  # name -> rank
+        self.version = 0  # Bumped by every change
+        self.orders = {}  # sort key -> (version, ids of every task in that order)
+        size = max(count, 1024)
+        self.ids = numpy.empty(size, dtype=object)
+        self.ids[:count] = [task.id for task in tasks]
+        self.priority_codes = dict(PRIORITY_ORDER)  # priority -> code
+        self.codes = numpy.zeros(size, dtype=numpy.int16)
+        self.codes[:count] = numpy.fromiter((self._code(task.priority) for task in tasks), numpy.int16, count)
+        self.due = numpy.zeros(size, dtype="datetime64[D]")
+        self.due[:count] = numpy.fromiter((task.due_ordinal - EPOCH_ORDINAL for task in tasks), numpy.int64, count)
+        self.live = numpy.zeros(size, dtype=bool)
+        self.live[:count] = True
+
+    def add(self, task):
+        if self.count == len(self.ids):
+            self._grow()
+        row = self.rows[task.id] = self.count
+        self.count += 1
+        self.ids[row] = task.id
+        self.names.append(None)
+        self.live[row] = True
+        self._set(row, task)
+
+    def remove(self, task_id):
+        row = self.rows.pop(task_id, None)
+        if row is None:
+            return
+        self.live[row] = False
+        self.ids[row] = None
+        self.names[row] = None
+        self.dead += 1
+        self.version += 1
+        if self.dead > 1024 and self.dead * 2 > self.count:
+            self._compact()
+
+    # Refresh a task's row after its fields changed, or add it
+    def update(self, task):
+        row = self.rows.get(task.id)
+        if row is None:
+            self.add(task)
+        else:
+            self._set(row, task)
+
+    # Boolean mask of the rows matching a priority, an exact due date (YYYY-MM-DD) and a
+    # (first, last) due-date range, or None when nothing is filtered
+    def mask(self, priority="All", date="", due_range=None):
+        np, count = self.np, self.count
+        mask = None
+        if priority != "All":
+            code = self.priority_codes.get(priority)
+            mask = self.codes[:count] == code if code is not None else np.zeros(count, dtype=bool)
+        if date:
+            mask = self._and(mask, self.due[:count] == np.datetime64(date_ordinal(date) - EPOCH_ORDINAL, "D"))
+        if due_range is not None:
+            first, last = due_range_ordinals(due_range)
+            due = self.due[:count]
+            in_range = (due >= np.datetime64(first - EPOCH_ORDINAL, "D")) & (due <= np.datetime64(last - EPOCH_ORDINAL, "D"))
+            mask = self._and(mask, in_range)
+        return mask
+
+    # Narrow a mask (None for every row) to a set of ids found some other way
+    def restrict(self, mask, ids):
+        rows = self.np.fromiter((self.rows[task_id] for task_id in ids), self.np.int64, len(ids))
+        found = self.np.zeros(self.count, dtype=bool)
+        found[rows] = True
+        return self._and(mask, found)
+
+    # Ids of the live rows in a mask, sorted by a column or tuple of columns (insertion
+    # order on ties, or when key is None)
+    def select(self, mask=None, key=None, reverse=False):
+        if mask is None and not reverse:
+            version, ids = self.orders.get(key, (None, None))
+            if version != self.version:
+                ids = self._select(None, key, False)
+                self.orders[key] = (self.version, ids)
+            return ids
+        return self._select(mask, key, reverse)
+
+    def _select(self, mask, key, reverse):
+        np = self.np
+        live = self.live[:self.count]
+        rows = np.flatnonzero(live if mask is None else mask & live)
+        if key is not None:
+            keys = key if isinstance(key, tuple) else (key,)
+            # lexsort is stable and sorts by its last key first
+            rows = rows[np.lexsort([self._sort_column(column)[rows] for column in reversed(keys)])]
+        if reverse:
+            rows = rows[::-1]
+        return self.ids[rows].tolist()
+
+    def _sort_column(self, key):
+        np = self.np
+        if key == "priority":
+            return np.minimum(self.codes[:self.count], 3)
+        if key == "due_date":
+            return self.due[:self.count]
+        if self.name_ranks is None:
+            # Equal names share a rank, so ties fall through to the next sort column
+            names = np.array([name or "" for name in self.names])  # Fixed-width text sorts in C
+            unique, ranks = np.unique(names, return_inverse=True)
+            self.rank_names = unique.tolist()
+            self.name_rank = {name: float(rank) for rank, name in enumerate(self.rank_names)}
+            self.name_ranks = np.zeros(len(self.ids), dtype=np.float64)
+            self.name_ranks[:self.count] = ranks.reshape(-1)
+        return self.name_ranks[:self.count]
+
+    # Rank for a name, fitted between the ranked names either side of it; None once the
+    # gap is too narrow for a float, and the ranks have to be rebuilt
+    def _rank_name(self, name):
+        rank = self.name_rank.get(name)
+        if rank is not None:
+            return rank
+        names = self.rank_names
+        i = bisect_left(names, name)
+        low = self.name_rank[names[i - 1]] if i > 0 else None
+        high = self.name_rank[names[i]] if i < len(names) else None
+        if low is None or high is None:
+            rank = 0.0 if low is None and high is None else high - 1.0 if low is None else low + 1.0
+        else:
+            rank = (low + high) / 2
+            if not low < rank < high:
+                return None
+        names.insert(i, name)
+        self.name_rank[name] = rank
+        return rank
+
+    # Code of a priority, given one if this store has not had it before
+    def _code(self, priority):
+        code = self.priority_codes.get(priority)
+        if code is None:
+            code = self.priority_codes[priority] = len(self.priority_codes)
+        return code
+
+    def _set(self, row, task):
+        self.version += 1
+        self.codes[row] = self._code(task.priority)
+        self.due[row] = task.due_ordinal - EPOCH_ORDINAL
+        name = task.name.lower()
+        if self.names[row] != name:
+            self.names[row] = name
+            if self.name_ranks is not None:
+                rank = self._rank_name(name)
+                if rank is None:
+                    self.name_ranks = None
+                else:
+                    self.name_ranks[row] = rank
+
+    def _and(self, mask, other):
+        return other if mask is None else mask & other
+
+    def _grow(self):
+        np, size = self.np, max(len(self.ids) * 2, 1024)
+        for column in self._columns():
+            old = getattr(self, column)
+            new = np.zeros(size, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+
+    # Drop the dead rows, keeping the others in order
+    def _compact(self):
+        keep = self.np.flatnonzero(self.live[:self.count])
+        for column in self._columns():
+            setattr(self, column, getattr(self, column)[keep])
+        self.names = [self.names[row] for row in keep.tolist()]
+        self.rows = {task_id: row for row, task_id in enumerate(self.ids.tolist())}
+        self.count, self.dead = len(keep), 0
+
+    # Names of the array attributes, one entry per row
+    def _columns(self):
+        columns = ["ids", "codes", "due", "live"]
+        return columns if self.name_ranks is None else columns + ["name_ranks"]
+
+# -------------------- Aggregates --------------------
+
+SUMMARY_WEEKS = 8  # Weeks of due dates in a summary, starting with this one
+
+# Ordinal of the Monday starting the week of a day ordinal (day 1 was a Monday)
+def week_start(ordinal):
+    return ordinal - (ordinal - 1) % 7
+
+# Running counts of the tasks, changed by each add, update and delete so that a summary
+# never scans the tasks: tasks per priority, per due day and per due week, and how many
+# are overdue as of today. Moving today on adds up only the days in between.
+class TaskAggregates:
+    def __init__(self, today=None):
+        self.by_priority = Counter()  # priority -> tasks
+        self.by_day = Counter()  # due ordinal -> tasks
+        self.by_week = Counter()  # week_start ordinal -> tasks
+        self.entries = {}  # id -> (priority, due ordinal) as counted, used on removal
+        self.today = (today or date.today()).toordinal()
+        self.overdue = 0  # Tasks due before today
+
+    def rebuild(self, tasks):
+        self.__init__()
+        for task in tasks:
+            self.add(task)
+
+    # Count a task, or recount it after its fields changed
+    def add(self, task):
+        self.remove(task.id)
+        entry = self.entries[task.id] = (task.priority, task.due_ordinal)
+        self._count(entry, 1)
+
+    def remove(self, task_id):
+        entry = self.entries.pop(task_id, None)
+        if entry is not None:
+            self._count(entry, -1)
+
+    def update(self, task):
+        self.add(task)
+
+    # Move today to another date, counting the tasks due in between as overdue (or no
+    # longer overdue, going back)
+    def set_today(self, today):
+        ordinal = today.toordinal()
+        if ordinal == self.today:
+            return
+        first, last = sorted((self.today, ordinal))
+        if last - first <= len(self.by_day):
+            moved = sum(self.by_day.get(day, 0) for day in range(first, last))
+        else:
+            moved = sum(count for day, count in self.by_day.items() if first <= day < last)
+        self.overdue += moved if ordinal > self.today else -moved
+        self.today = ordinal
+
+    # Totals as a dictionary: every task, per priority (High, Medium and Low always
+    # listed), overdue, due today, without a readable due date, and due in each of the
+    # next few weeks as (Monday, tasks)
+    def summary(self, today=None, weeks=SUMMARY_WEEKS):
+        self.set_today(today or date.today())
+        monday = week_start(self.today)
+        by_priority = {name: self.by_priority.get(name, 0) for name in PRIORITY_ORDER}
+        by_priority.update(self.by_priority)
         return {
-            "name": self.name,
-            "description": self.description,
-            "priority": self.priority,
-            "due_date": self.due_date
+            "total": len(self.entries),
+            "by_priority": by_priority,
+            "overdue": self.overdue,
+            "due_today": self.by_day.get(self.today, 0),
+            "undated": self.by_day.get(UNKNOWN_DATE, 0),
+            "weeks": [(date_text(monday + 7 * week), self.by_week.get(monday + 7 * week, 0))
+                      for week in range(weeks)],
         }
 
-    # Create a Task object from dictionary 
-    @classmethod
-    def from_dict(cls, task_dict):
-        return cls(
-            task_dict["name"],
-            task_dict["description"],
-            task_dict["priority"],
-            task_dict["due_date"],
-        )
+    def _count(self, entry, step):
+        priority, ordinal = entry
+        self._step(self.by_priority, priority, step)
+        self._step(self.by_day, ordinal, step)
+        if ordinal != UNKNOWN_DATE:
+            self._step(self.by_week, week_start(ordinal), step)
+            if ordinal < self.today:
+                self.overdue += step
+
+    # Change a count, dropping keys that reach zero
+    def _step(self, counts, key, step):
+        count = counts[key] + step
+        if count:
+            counts[key] = count
+        else:
+            del counts[key]
+
+# -------------------- Reminders --------------------
+
+# Upcoming due dates in a min-heap of (due ordinal, sequence, id) entries. A task is
+# reminded when its due day arrives; days already past count as overdue, not upcoming,
+# and are not scheduled. Changing or deleting a task does not search the heap: the old
+# entry is left behind and skipped when it reaches the top (only the entry whose
+# sequence is in pending counts), and the heap is rebuilt once such entries outnumber
+# the live ones. Each change is O(log n).
+class ReminderHeap:
+    def __init__(self, tasks=(), today=None):
+        self.today = (today or date.today()).toordinal()  # Earliest day still scheduled
+        self.heap = []
+        for task in tasks:
+            if self.today <= task.due_ordinal < UNKNOWN_DATE:
+                self.heap.append((task.due_ordinal, len(self.heap), task.id))
+        self.pending = {task_id: seq for _, seq, task_id in self.heap}  # id -> sequence of its live entry
+        self.sequence = len(self.heap)  # Last sequence handed out
+        heapq.heapify(self.heap)
+        self.stale = 0  # Entries in the heap that no longer count
+
+    # Schedule a task at its due date, replacing any earlier reminder for it
+    def schedule(self, task):
+        self.unschedule(task.id)
+        if self.today <= task.due_ordinal < UNKNOWN_DATE:
+            self.sequence += 1
+            self.pending[task.id] = self.sequence
+            heapq.heappush(self.heap, (task.due_ordinal, self.sequence, task.id))
+
+    def unschedule(self, task_id):
+        if self.pending.pop(task_id, None) is not None:
+            self.stale += 1
+            if self.stale > 1024 and self.stale > len(self.pending):
+                self.heap = [entry for entry in self.heap if self.pending.get(entry[2]) == entry[1]]
+                heapq.heapify(self.heap)
+                self.stale = 0
+
+    # Day ordinal of the next reminder, or None when nothing is scheduled
+    def next_due(self):
+        heap = self.heap
+        while heap and self.pending.get(heap[0][2]) != heap[0][1]:
+            heapq.heappop(heap)
+            self.stale -= 1
+        return heap[0][0] if heap else None
+
+    # Ids of the tasks due on or before today, earliest first, taken off the heap
+    def pop_due(self, today=None):
+        self.today = max(self.today, (today or date.today()).toordinal())
+        due = []
+        while True:
+            ordinal = self.next_due()
+            if ordinal is None or ordinal > self.today:
+                return due
+            _, _, task_id = heapq.heappop(self.heap)
+            del self.pending[task_id]
+            due.append(task_id)
+
+# -------------------- Paged Queries --------------------
+
+PAGE_SIZE = 50  # Tasks per page by default
+PAGE_SIZES = [25, 50, 100, 250, 1000]  # Page sizes offered in the GUI
+
+# One page of a query: its tasks, the number of tasks matching in all, and cursors for
+# the pages either side (None at either end)
+Page = namedtuple("Page", ["tasks", "total", "next_cursor", "prev_cursor"])
+
+# Short digest of a query, so a cursor is only used with the query it came from
+def query_fingerprint(filters, sort, reverse):
+    text = json.dumps([filters, sort, reverse], sort_keys=True, default=str)
+    return hashlib.blake2b(text.encode(), digest_size=6).hexdigest()
+
+# Opaque cursor: the query, "after" or "before", and the sort entry (or offset) of the
+# row the page continues from
+def encode_cursor(query, direction, position):
+    data = json.dumps([query, direction, position], separators=(",", ":"))
+    return base64.urlsafe_b64encode(data.encode()).decode()
+
+def decode_cursor(cursor, query):
+    try:
+        cursor_query, direction, position = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid page cursor")
+    if cursor_query != query:
+        raise ValueError("Page cursor belongs to a different query")
+    return direction, position
+
+# A sort entry read back from a cursor, with the lists JSON made of its tuples (the
+# entry, and the key within it when several columns are sorted) turned back into tuples
+def cursor_entry(value):
+    return tuple(cursor_entry(item) for item in value) if isinstance(value, list) else value
+
+# Ids in ascending order of their entries (parallel sorted lists), walked up from just
+# after the entry or down from just before it (from the end when it is None),
+# skipping ids not in matches. Yields (entry, id).
+def walk_sorted(entries, ids, position, ascending, matches=None):
+    if ascending:
+        rows = range(0 if position is None else bisect_right(entries, position), len(ids))
+    else:
+        rows = range(len(ids) - 1 if position is None else bisect_left(entries, position) - 1, -1, -1)
+    for row in rows:
+        if matches is None or ids[row] in matches:
+            yield entries[row], ids[row]
+
+# Ids in insertion order by their (position,) entries, the same way, from a TaskIndex's
+# parallel position lists: the walk starts at the entry's position found by bisection,
+# and skips the ids of deleted tasks (None).
+def walk_positions(index, position, ascending, matches=None):
+    positions, ids = index.position_list, index.position_ids
+    if ascending:
+        rows = range(0 if position is None else bisect_right(positions, position[0]), len(ids))
+    else:
+        rows = range(len(ids) - 1 if position is None else bisect_left(positions, position[0]) - 1, -1, -1)
+    for row in rows:
+        task_id = ids[row]
+        if task_id is not None and (matches is None or task_id in matches):
+            yield (positions[row],), task_id
+
+# -------------------- Filter Expressions --------------------
+
+# A small query language for the filter box, e.g.
+#   priority in (High, Medium) and due < 2026-06-01 and name ~ "eng"
+# Fields are name, description, priority and due (a date, "today" or "today+N"/"today-N");
+# operators are = != < <= > >= in and ~ (contains, ignoring case), combined with and,
+# or, not and parentheses. Names and descriptions compare ignoring case, and priorities
+# by rank (High < Medium < Low). A query is parsed once, compiled into a single Python
+# predicate and cached by its text; each run then picks the smallest index lookup among
+# the and-ed conditions and checks the rest on those candidates in one pass.
+
+QUERY_FIELDS = {"name": "name", "description": "description", "priority": "priority",
+                "due": "due", "due_date": "due"}
+QUERY_CACHE_SIZE = 128  # Compiled queries kept, oldest dropped first
+QUERY_TOKEN = re.compile(r"""\s*(?:("(?:[^"\\]|\\.)*"|'(?:[^'\\]|\\.)*')|(<=|>=|!=|=|<|>|~|\(|\)|,)|([^\s()<>=!~,"']+))""")
+
+class QueryError(ValueError):
+    pass
+
+# (kind, text, offset) tokens; kind is "string", "symbol" or "word"
+def query_tokens(text):
+    tokens, at = [], 0
+    text = text.rstrip()
+    while at < len(text):
+        match = QUERY_TOKEN.match(text, at)
+        if match is None or match.end() == at:
+            raise QueryError(f"Unexpected {text[at:].split()[0]!r} at character {at + 1}")
+        string, symbol, word = match.groups()
+        if string is not None:
+            tokens.append(("string", re.sub(r"\\(.)", r"\1", string[1:-1]), match.start(1)))
+        elif symbol is not None:
+            tokens.append(("symbol", symbol, match.start(2)))
+        else:
+            tokens.append(("word", word, match.start(3)))
+        at = match.end()
+    return tokens
+
+# Recursive descent parser producing ("and", [...]), ("or", [...]), ("not", node) and
+# ("cmp", field, op, values) nodes, with values checked and converted for the field
+class QueryParser:
+    def __init__(self, text, today=None):
+        self.text = text
+        self.tokens = query_tokens(text)
+        self.at = 0
+        self.today = (today or date.today()).toordinal()
+
+    def parse(self):
+        if not self.tokens:
+            raise QueryError("Empty query")
+        node = self.parse_or()
+        if self.at < len(self.tokens):
+            self.fail("Expected and/or")
+        return node
+
+    def parse_or(self):
+        nodes = [self.parse_and()]
+        while self.keyword("or"):
+            nodes.append(self.parse_and())
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def parse_and(self):
+        nodes = [self.parse_not()]
+        while self.keyword("and"):
+            nodes.append(self.parse_not())
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def parse_not(self):
+        if self.keyword("not"):
+            return ("not", self.parse_not())
+        if self.symbol("("):
+            node = self.parse_or()
+            self.expect(")")
+            return node
+        return self.parse_comparison()
+
+    def parse_comparison(self):
+        kind, word, _ = self.next("a field name")
+        field = QUERY_FIELDS.get(word.lower()) if kind == "word" else None
+        if field is None:
+            self.fail(f"Unknown field {word!r} (use name, description, priority or due)", back=1)
+        if self.keyword("in"):
+            self.expect("(")
+            values = [self.value(field)]
+            while self.symbol(","):
+                values.append(self.value(field))
+            self.expect(")")
+            return ("cmp", field, "in", tuple(values))
+        kind, op, _ = self.next("an operator")
+        if kind != "symbol" or op not in ("=", "!=", "<", "<=", ">", ">=", "~"):
+            self.fail(f"Expected an operator after {word}", back=1)
+        if op == "~" and field not in ("name", "description"):
+            self.fail(f"~ only applies to name and description", back=1)
+        return ("cmp", field, op, (self.value(field),))
+
+    # A value converted for its field: lowercased text, a priority name or a day ordinal
+    def value(self, field):
+        kind, value, _ = self.next("a value")
+        if kind == "symbol":
+            self.fail(f"Expected a value, not {value!r}", back=1)
+        if field in ("name", "description"):
+            return value.lower()
+        if field == "priority":
+            return PRIORITY_NAMES.get(value.lower(), value)
+        lowered = value.lower()
+        ordinal = UNKNOWN_DATE
+        if lowered.startswith("today"):
+            try:
+                ordinal = self.today + int(lowered[5:] or 0)
+            except ValueError:
+                pass
+        else:
+            ordinal = date_ordinal(value)
+        if not 1 <= ordinal <= date.max.toordinal():
+            self.fail(f"Invalid date {value!r} (use YYYY-MM-DD or today+N)", back=1)
+        return ordinal
+
+    def next(self, expected):
+        if self.at >= len(self.tokens):
+            raise QueryError(f"Expected {expected} at the end of the query")
+        self.at += 1
+        return self.tokens[self.at - 1]
+
+    def keyword(self, word):
+        if self.at < len(self.tokens) and self.tokens[self.at][0] == "word" \
+                and self.tokens[self.at][1].lower() == word:
+            self.at += 1
+            return True
+        return False
+
+    def symbol(self, symbol):
+        if self.at < len(self.tokens) and self.tokens[self.at][:2] == ("symbol", symbol):
+            self.at += 1
+            return True
+        return False
+
+    def expect(self, symbol):
+        if not self.symbol(symbol):
+            self.fail(f"Expected {symbol!r}")
+
+    def fail(self, message, back=0):
+        at = self.at - back
+        position = self.tokens[at][2] + 1 if at < len(self.tokens) else len(self.text) + 1
+        raise QueryError(f"{message} at character {position}")
+
+# Query text for a parsed node, with dates and priorities written out in full
+def query_text(node):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return "(" + f" {kind} ".join(query_text(child) for child in node[1]) + ")"
+    if kind == "not":
+        return f"not {query_text(node[1])}"
+    _, field, op, values = node
+    values = [date_text(value) if field == "due" else value if field == "priority" else json.dumps(value)
+              for value in values]
+    if op == "in":
+        return f"{field} in ({', '.join(values)})"
+    return f"{field} {op} {values[0]}"
+
+# Python source for a node, reading the precomputed fields of a Task t; constants go
+# into names (_c0, _c1, ...) rather than into the source
+def query_source(node, constants):
+    kind = node[0]
+    if kind in ("and", "or"):
+        return "(" + f" {kind} ".join(query_source(child, constants) for child in node[1]) + ")"
+    if kind == "not":
+        return f"(not {query_source(node[1], constants)})"
+
+    _, field, op, values = node
+    def constant(value):
+        constants.append(value)
+        return f"_c{len(constants) - 1}"
+
+    if field == "priority":
+        if op in ("in", "=", "!="):
+            return f"(t._priority {'not in' if op == '!=' else 'in'} {constant(frozenset(values))})"
+        rank = PRIORITY_ORDER.get(values[0], 3)  # Other names rank after Low
+        return f"({constant(PRIORITY_ORDER)}.get(t._priority, 3) {op} {rank})"
+    if field == "due":
+        if op == "in":
+            return f"(t.due_ordinal in {constant(frozenset(values))})"
+        ordinal = values[0]
+        if op in (">", ">="):  # Unreadable dates sort last but are not "after" anything
+            return f"({ordinal} {'<' if op == '>' else '<='} t.due_ordinal < {UNKNOWN_DATE})"
+        return f"(t.due_ordinal {'==' if op == '=' else op} {ordinal})"
+    text = "t.name.lower()" if field == "name" else "t.description.lower()"
+    if op == "~":
+        return f"({constant(values[0])} in {text})"
+    if op == "in":
+        return f"({text} in {constant(frozenset(values))})"
+    return f"({text} {'==' if op == '=' else op} {constant(values[0])})"
+
+# A parsed and compiled query: its and-ed conditions (one unless the top is an and),
+# the fused predicate for all of them, and predicates for the conditions left over when
+# an index answers some of them (compiled on first use)
+class CompiledQuery:
+    def __init__(self, text, today=None):
+        self.text = text
+        self.tree = QueryParser(text, today).parse()
+        self.conditions = list(self.tree[1]) if self.tree[0] == "and" else [self.tree]
+        self.source, self.predicate, self.constants = self.compile(self.conditions)
+        self.residuals = {}  # Positions of the conditions an index answered -> compile() result
+
+    def residual(self, covered):
+        if covered not in self.residuals:
+            self.residuals[covered] = self.compile(
+                [condition for i, condition in enumerate(self.conditions) if i not in covered])
+        return self.residuals[covered]
+
+    # (source, predicate, constants) for the given conditions and-ed together in a
+    # single function; the predicate is None when there is nothing to check
+    @staticmethod
+    def compile(conditions):
+        if not conditions:
+            return "True", None, []
+        constants = []
+        source = " and ".join(query_source(condition, constants) for condition in conditions)
+        namespace = {f"_c{i}": value for i, value in enumerate(constants)}
+        namespace.update(__builtins__={})
+        return source, eval(f"lambda t: {source}", namespace), constants
+
+# Index lookups a condition can be answered from: (description, exact, lookup), where
+# lookup(index, due_view) returns (estimated size, function returning the ids) and
+# due_view() gives the due-date SortedView (built on first use). exact is
+# False when the ids still need the condition checked (name n-grams only narrow).
+def query_access(condition, due_bounds):
+    kind, field, op, values = condition if condition[0] == "cmp" else (None,) * 4
+    if field == "priority" and op in ("in", "="):
+        def lookup(index, due_view):
+            sets = [index.by_priority.get(value, set()) for value in values]
+            return sum(map(len, sets)), lambda: set().union(*sets)
+        return f"priority index {', '.join(values)}", True, lookup
+    if field == "name" and op in ("~", "=") and len(values[0]) >= NGRAM_SIZE:
+        def lookup(index, due_view):
+            sets = sorted((index.by_ngram.get(gram, set()) for gram in index._ngrams(values[0])), key=len)
+            return len(sets[0]), lambda: set(sets[0]).intersection(*sets[1:])
+        return f"name n-grams of {values[0]!r}", False, lookup
+    if field == "due" and op in ("=", "<", "<=", ">", ">=") and due_bounds is not None:
+        first, last = due_bounds
+        def lookup(index, due_view):
+            view = due_view()
+            start = bisect_left(view.sort_keys, (first,))
+            stop = bisect_left(view.sort_keys, (last + 1,))
+            return max(0, stop - start), lambda: view.ids[start:stop]
+        return f"due-date view {date_text(first)}..{date_text(min(last, date.max.toordinal()))}", True, lookup
+    return None
+
+# How a compiled query will run against the current indexes: every index lookup
+# available, sized, and the chosen one (the smallest) with the predicate left to check
+# on its candidates. Without indexes (index is None) the query scans every task.
+class QueryPlan:
+    def __init__(self, query, index=None, due_view=None):
+        self.query = query
+        self.options = []  # (estimated ids, description, exact, fetch, condition positions)
+        if index is not None:
+            due_bounds = query_due_bounds(query.conditions)
+            due_positions = tuple(i for i, condition in enumerate(query.conditions)
+                                  if condition[0] == "cmp" and condition[1] == "due"
+                                  and condition[2] not in ("in", "!="))
+            for i, condition in enumerate(query.conditions):
+                if i in due_positions[1:]:
+                    continue  # Every due comparison is answered by the one range lookup
+                access = query_access(condition, due_bounds)
+                if access is not None:
+                    description, exact, lookup = access
+                    size, fetch = lookup(index, due_view)
+                    covered = (due_positions if i in due_positions else (i,)) if exact else ()
+                    self.options.append((size, description, exact, fetch, covered))
+        self.chosen = min(self.options, key=lambda option: option[0]) if self.options else None
+        if self.chosen is None:
+            self.source, self.predicate, self.constants = query.source, query.predicate, query.constants
+        else:
+            self.source, self.predicate, self.constants = query.residual(self.chosen[4])
+
+    # Ids of the matching tasks, in one pass over the candidates (or every task)
+    def run(self, task_map):
+        predicate = self.predicate
+        if self.chosen is None:
+            return {task.id for task in task_map.values() if predicate(task)}
+        candidates = self.chosen[3]()
+        if predicate is None:
+            return set(candidates)
+        return {task_id for task_id in candidates if predicate(task_map[task_id])}
+
+    def describe(self):
+        lines = ["Conditions (and-ed):"] + [f"  {query_text(condition)}" for condition in self.query.conditions]
+        if not self.options:
+            lines.append("Index lookups: none usable, scanning every task")
+        else:
+            lines.append("Index lookups:")
+            for option in sorted(self.options, key=lambda option: option[0]):
+                chosen = "  <- chosen" if option is self.chosen else ""
+                exact = "" if option[2] else " (narrows only)"
+                lines.append(f"  {option[1]}: {option[0]:,} ids{exact}{chosen}")
+        lines.append(f"Checked on each {'task' if self.chosen is None else 'candidate'}: lambda t: {self.source}")
+        lines += [f"  _c{i} = {sorted(value) if isinstance(value, frozenset) else value!r}"
+                  for i, value in enumerate(self.constants)]
+        return lines
+
+# Inclusive ordinal bounds from every and-ed due comparison, or None if there are none
+def query_due_bounds(conditions):
+    first, last, found = 1, date.max.toordinal(), False
+    for condition in conditions:
+        if condition[0] != "cmp" or condition[1] != "due" or condition[2] in ("in", "!="):
+            continue
+        found = True
+        op, ordinal = condition[2], condition[3][0]
+        if op in ("=", ">=", ">"):
+            first = max(first, ordinal + (op == ">"))
+        if op in ("=", "<=", "<"):
+            last = min(last, ordinal - (op == "<"))
+    return (first, last) if found else None
 
 # -------------------- Task Manager Class --------------------
 
-# Handles task list management including file operations, filtering, and sorting
+# Handles task list management on top of a storage backend, plus filtering and sorting
 class TaskManager:
-    def __init__(self, json_file='tasks.json'):
-        self.tasks = []
-        self.json_file = json_file
-        self.load_tasks_from_json()
+    def __init__(self, json_file='tasks.json', journal=True, journal_limit=1024 * 1024, storage=None, load=True,
+                 background=False, build_indexes=True, engine="python"):
+        self.storage = storage or JsonStorage(json_file, journal, journal_limit)
+        self.task_map = self.storage.new_task_map()  # id -> Task, kept in insertion order
+        self.lock = threading.RLock()  # Lets filters run on a worker thread while the GUI edits
+        self.sort_order = None  # (key, reverse) of the last sort_tasks call
+        # Backends that answer queries themselves do not need the indexes (nor all names decoded)
+        self.indexed = not self.storage.supports_queries
+        # In-memory filter index and full-text index. Loading leaves them unbuilt: the first
+        # query that needs one builds it, unless build_deferred_indexes() has built them
+        # off the GUI thread by then (it does nothing with build_indexes=False, for bulk jobs)
+        self.build_indexes = build_indexes and self.indexed
+        self.index = None
+        self.text_index = None
+        self.building = None  # Ids changed while build_deferred_indexes runs, else None
+        self.sorted_views = {}  # column -> SortedView, built on the first sort by that column
+        self.aggregates = None  # TaskAggregates, built by the first task_summary
+        self.reminders = None  # ReminderHeap, built by start_reminders
+        self.query_cache = {}  # (filter expression, today) -> CompiledQuery, oldest first
+        # engine="numpy" answers in-memory filters and sorts from a ColumnEngine (built on the
+        # first one); without NumPy it quietly stays with the indexes and sorted views
+        self.numpy = load_numpy() if engine == "numpy" and self.indexed else None
+        self.engine = "python" if self.numpy is None else "numpy"
+        self.columns = None
+        # With background=True changes are written by a writer thread (errors arrive on
+        # writer.errors); otherwise each change is written before the call returns
+        self.writer = BackgroundWriter(self.storage, self.lock) if background else None
+        if load:
+            self.load_tasks()
 
-    # Load tasks from the JSON file
-    def load_tasks_from_json(self):
-        try:
-            with open(self.json_file, "r") as file:
-                task_dicts = json.load(file)
-                self.tasks = [Task.from_dict(task_dict) for task_dict in task_dicts]
-        except (FileNotFoundError, json.JSONDecodeError):
-            self.tasks = []
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to load tasks: {str(e)}")
+    # Load every task from the storage backend
+    @timed
+    def load_tasks(self):
+        for _ in self.iter_load_tasks():
+            pass
+
+    # Load tasks a batch at a time, yielding (tasks loaded, fraction done) after each batch;
+    # the tasks loaded so far can be filtered and sorted between batches
+    def iter_load_tasks(self, batch_size=LOAD_BATCH_SIZE):
+        with self.lock:
+            self.task_map.clear()
+            self.index = None
+            self.sorted_views = {}
+            self.text_index = None
+            self.columns = None
+            self.aggregates = None
+        batches = self.storage.iter_load(self.task_map, batch_size)
+        replayed = False
+        while True:
+            with self.lock:
+                try:
+                    tasks, progress = next(batches)
+                except StopIteration as done:
+                    replayed = done.value
+                    if done.value:  # The journal changed tasks behind the indexes' back
+                        self.columns = None
+                        self.aggregates = None
+                        if self.reminders is not None:
+                            self.reminders = ReminderHeap(self.task_map.values(),
+                                                          date.fromordinal(self.reminders.today))
+                        if self.index is not None:
+                            self.index.rebuild(self.task_map.values())
+                            self.sorted_views = {}
+                    break
+                text_index = self.text_index
+                if self.index is not None:
+                    for task in tasks:
+                        self.index.remove(task.id, keep_position=True)
+                        self.index.add(task)
+                        for view in self.sorted_views.values():
+                            view.update(task)
+                if self.columns is not None:
+                    for task in tasks:
+                        self.columns.update(task)
+                if self.aggregates is not None:  # A summary was shown while still loading
+                    for task in tasks:
+                        self.aggregates.add(task)
+                if self.reminders is not None:
+                    for task in tasks:
+                        self.reminders.schedule(task)
+            # The words are counted outside the lock, so searches and the GUI go on
+            # meanwhile; only adding them to the index holds it
+            if text_index is not None:
+                counted = TextIndex.count_terms(tasks)
+                with self.lock:
+                    if self.text_index is text_index:
+                        text_index.add_counts(counted)
+            yield len(self.task_map), progress
+        if replayed:
+            self._rebuild_text_index()
+        yield len(self.task_map), 1.0
 
-    # Save current tasks to the JSON file
-    def save_tasks_to_json(self):
+    # Build the indexes loading left unbuilt, from a copy of the task list and outside the
+    # lock, so the list can be used and edited meanwhile. Tasks changed during the build
+    # are indexed again before the indexes are swapped in; one a query had to build
+    # in the meantime is kept instead.
+    def build_deferred_indexes(self):
+        with self.lock:
+            if not self.build_indexes or self.building is not None or \
+                    (self.index is not None and self.text_index is not None):
+                return
+            tasks = list(self.task_map.values())
+            self.building = set()
         try:
-            with open(self.json_file, "w") as file:
-                json.dump([task.to_dict() for task in self.tasks], file, indent=4)
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to save tasks: {str(e)}")
+            index = TaskIndex()
+            index.rebuild(tasks)
+            text_index = TextIndex()
+            text_index.rebuild(tasks)
+        finally:
+            with self.lock:
+                changed, self.building = self.building, None
+        with self.lock:
+            for task_id in changed:
+                task = self.task_map.get(task_id)
+                if task is None:
+                    index.remove(task_id)
+                    text_index.remove(task_id)
+                else:
+                    index.update(task)
+                    text_index.update(task)
+            if self.index is None:
+                self.index = index
+            if self.text_index is None:
+                self.text_index = text_index
+
+    # Build the full-text index again from every task outside the lock (searches use
+    # the old one meanwhile), then swap it in
+    def _rebuild_text_index(self):
+        with self.lock:
+            if self.text_index is None:
+                return
+            old, tasks = self.text_index, list(self.task_map.values())
+        text_index = TextIndex()
+        text_index.rebuild(tasks)
+        with self.lock:
+            if self.text_index is old:
+                self.text_index = text_index
+
+    # Write every task to storage in one go
+    @timed
+    def save_tasks(self):
+        with self.lock:
+            self.storage.request_save()
+        self.flush()
+        return True
+
+    # Write every staged change now, waiting for it to finish
+    def flush(self):
+        if self.writer is not None:
+            self.writer.flush()
+        else:
+            self.storage.flush(self.lock)
+
+    # Write the staged changes in the background, or straight away without a writer
+    def _persist(self):
+        if self.writer is not None:
+            self.writer.mark_dirty()
+        else:
+            self.storage.flush(self.lock)
+
+    # Write what is left and release the storage backend, called when the application exits
+    @timed
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+        else:
+            self.flush()
+        with self.lock:
+            self.storage.close()
+
+    # All tasks in insertion order
+    @property
+    def tasks(self):
+        return list(self.task_map.values())
+
+    # Look up a task by id
+    def get_task(self, task_id):
+        return self.task_map.get(task_id)
 
     # Add a new task
+    @timed
     def add_task(self, task_data):
         task = Task(**task_data)
-        self.tasks.append(task)
-        self.save_tasks_to_json()
+        with self.lock:
+            self.task_map[task.id] = task
+            if self.building is not None:
+                self.building.add(task.id)
+            if self.index is not None:
+                self.index.add(task)
+                for view in self.sorted_views.values():
+                    view.add(task)
+            if self.text_index is not None:
+                self.text_index.add(task)
+            if self.columns is not None:
+                self.columns.add(task)
+            if self.aggregates is not None:
+                self.aggregates.add(task)
+            if self.reminders is not None:
+                self.reminders.schedule(task)
+            self.storage.add(task)
+        self._persist()
         return task
 
-    # Update an existing task by index
-    def update_task(self, index, task_data):
-        if 0 <= index < len(self.tasks):
-            task = self.tasks[index]
+    # Add many Task objects and persist them as a single batch
+    @timed
+    def add_tasks(self, tasks):
+        counted = TextIndex.count_terms(tasks) if self.text_index is not None else None  # Outside the lock
+        with self.lock:
+            if self.text_index is not None:
+                self.text_index.add_counts(counted if counted is not None else TextIndex.count_terms(tasks))
+            if self.building is not None:
+                self.building.update(task.id for task in tasks)
+            for task in tasks:
+                self.task_map[task.id] = task
+                if self.index is not None:
+                    self.index.remove(task.id, keep_position=True)
+                    self.index.add(task)
+                    for view in self.sorted_views.values():
+                        view.update(task)
+                if self.columns is not None:
+                    self.columns.update(task)
+                if self.aggregates is not None:
+                    self.aggregates.add(task)
+                if self.reminders is not None:
+                    self.reminders.schedule(task)
+            self.storage.add_many(tasks)
+        self._persist()
+
+    # Update an existing task by id
+    @timed
+    def update_task(self, task_id, task_data):
+        with self.lock:
+            task = self.task_map.get(task_id)
+            if task is None:
+                return False
+            due_ordinal = task.due_ordinal
             for key, value in task_data.items():
                 setattr(task, key, value)
-            self.save_tasks_to_json()
-            return True
-        return False
+            if self.building is not None:
+                self.building.add(task_id)
+            if self.index is not None:
+                self.index.update(task)
+                for view in self.sorted_views.values():
+                    view.update(task)
+            if self.text_index is not None:
+                self.text_index.update(task)
+            if self.columns is not None:
+                self.columns.update(task)
+            if self.aggregates is not None:
+                self.aggregates.update(task)
+            if self.reminders is not None and task.due_ordinal != due_ordinal:
+                self.reminders.schedule(task)
+            self.storage.update(task, task_data)
+        self._persist()
+        return True
 
-    # Delete a task by index
-    def delete_task(self, index):
-        if 0 <= index < len(self.tasks):
-            self.tasks.pop(index)
-            self.save_tasks_to_json()
-            return True
-        return False
+    # Delete a task by id
+    @timed
+    def delete_task(self, task_id):
+        with self.lock:
+            if self.task_map.pop(task_id, None) is None:
+                return False
+            if self.building is not None:
+                self.building.add(task_id)
+            if self.index is not None:
+                for view in self.sorted_views.values():
+                    view.remove(task_id)
+                self.index.remove(task_id)
+            if self.text_index is not None:
+                self.text_index.remove(task_id)
+            if self.columns is not None:
+                self.columns.remove(task_id)
+            if self.aggregates is not None:
+                self.aggregates.remove(task_id)
+            if self.reminders is not None:
+                self.reminders.unschedule(task_id)
+            self.storage.delete(task_id)
+        self._persist()
+        return True
 
-    # Filter tasks by name, priority, and due date
-    def filter_tasks(self, name="", priority="All", date=""):
-        tasks = self.tasks
-        if name:
-            tasks = [t for t in tasks if name.lower() in t.name.lower()]
-        if priority != "All":
-            tasks = [t for t in tasks if t.priority == priority]
-        if date:
-            tasks = [t for t in tasks if t.due_date == date]
-        return tasks
+    # Full-text search over names and descriptions, best match first
+    @timed
+    def search_tasks(self, query, limit=None):
+        with self.lock:
+            return [self.task_map[task_id] for task_id in self._search_ids(query, limit)]
+
+    # Without the indexes built up front the first search builds the text index here
+    def _search_ids(self, query, limit=None, allowed=None):
+        if self.text_index is None:
+            self.text_index = TextIndex()
+            self.text_index.rebuild(self.task_map.values())
+        return self.text_index.search(query, limit, allowed)
+
+    # Filter tasks by name, priority, due date or a (first, last) due-date range, plus an
+    # optional full-text query (text query results come back best match first until a
+    # column is sorted, and only the best text_limit of them when it is given) and
+    # filter expression (see Filter Expressions)
+    @timed
+    def filter_tasks(self, name="", priority="All", date="", text="", due_range=None, expression="",
+                     text_limit=None):
+        with self.lock:
+            if text.strip():
+                allowed = None
+                if name or priority != "All" or date or due_range is not None or expression.strip():
+                    allowed = set(self._allowed_ids(name, priority, date, due_range, expression))
+                ranked = self._search_ids(text, text_limit, allowed)
+                tasks = [self.task_map[task_id] for task_id in ranked]
+                if self.sort_order is not None:
+                    key, reverse = self.sort_order
+                    tasks.sort(key=sort_key(key), reverse=reverse)
+                return tasks
+            if self.storage.supports_queries:
+                ids = self.storage.filter_ids(name, priority, date, self.sort_order, due_range)
+                if expression.strip():
+                    matches = self._expression_ids(expression)
+                    ids = [task_id for task_id in ids if task_id in matches]
+                return [self.task_map[task_id] for task_id in ids]
+            filtered = name or priority != "All" or date or due_range is not None or expression.strip()
+            if filtered and self._uses_columns():
+                ids = self._column_ids(name, priority, date, due_range, expression)
+                return [self.task_map[task_id] for task_id in ids]
+            ids = self._matching_ids(name, priority, date, due_range, expression)
+            if ids is None:
+                return self.sorted_tasks()
+            return [self.task_map[task_id] for task_id in self._ordered(ids)]
+
+    # One page of the tasks matching filters (filter_tasks arguments), sorted by a column
+    # (insertion order when sort is None), with the total count. Pass a page's
+    # next_cursor or prev_cursor to move on. Pages are cut from the sorted view by
+    # walking it from the cursor, so neither the result list nor its Task objects are
+    # built beyond the page; cursors hold the last row's sort entry, so edits elsewhere
+    # do not shift the pages. Full-text queries and backends that answer queries
+    # themselves return complete id lists, and page through them by offset instead.
+    @timed
+    def query_tasks(self, filters=None, sort=None, reverse=False, limit=PAGE_SIZE, cursor=None):
+        filters = filters or {}
+        query = query_fingerprint(filters, sort, reverse)
+        direction, position = decode_cursor(cursor, query) if cursor else ("after", None)
+        with self.lock:
+            if filters.get("text", "").strip() or self.storage.supports_queries:
+                return self._offset_page(filters, sort, reverse, limit, query, direction, position)
+
+            matches = self._matching_ids(filters.get("name", ""), filters.get("priority", "All"),
+                                         filters.get("date", ""), filters.get("due_range"),
+                                         filters.get("expression", ""))
+            if matches is not None:
+                matches = matches if isinstance(matches, set) else set(matches)
+            total = len(self.task_map) if matches is None else len(matches)
+            index = self._task_index()
+            positions = index.positions
+
+            if matches is not None and len(matches) <= len(self.task_map) // 8:
+                # Few matches: sort just them by the same entries as the views
+                if sort is None:
+                    keyed = sorted(((positions[task_id],), task_id) for task_id in matches)
+                else:
+                    keys = self._sorted_view(sort).keys
+                    keyed = sorted((keys[task_id], task_id) for task_id in matches)
+                entries, ids = [entry for entry, _ in keyed], [task_id for _, task_id in keyed]
+                walk = lambda at, ascending: walk_sorted(entries, ids, at, ascending)
+            elif sort is None:
+                walk = lambda at, ascending: walk_positions(index, at, ascending, matches)
+            else:
+                view = self._sorted_view(sort)
+                walk = lambda at, ascending: walk_sorted(view.sort_keys, view.ids, at, ascending, matches)
+
+            # reverse flips which way through the entries counts as "after"
+            position = None if position is None else cursor_entry(position)
+            rows = list(itertools.islice(walk(position, (direction == "after") != reverse), limit + 1))
+            if direction == "after":
+                more_after, rows = len(rows) > limit, rows[:limit]
+                more_before = position is not None and next(
+                    walk(rows[0][0] if rows else position, reverse), None) is not None
+            else:
+                more_before, rows = len(rows) > limit, rows[:limit][::-1]
+                more_after = next(walk(rows[-1][0] if rows else position, not reverse), None) is not None
+            return Page(
+                [self.task_map[task_id] for _, task_id in rows], total,
+                encode_cursor(query, "after", rows[-1][0]) if rows and more_after else None,
+                encode_cursor(query, "before", rows[0][0]) if rows and more_before else None)
+
+    # Page through a complete list of matching ids by offset
+    def _offset_page(self, filters, sort, reverse, limit, query, direction, position):
+        name, priority, date = filters.get("name", ""), filters.get("priority", "All"), filters.get("date", "")
+        due_range, text = filters.get("due_range"), filters.get("text", "")
+        expression = filters.get("expression", "")
+        order = (sort, reverse) if sort else None
+        ids = None
+        if text.strip():
+            allowed = None
+            if name or priority != "All" or date or due_range is not None or expression.strip():
+                allowed = set(self._allowed_ids(name, priority, date, due_range, expression))
+            ids = self._search_ids(text, filters.get("text_limit"), allowed)
+            if order is not None:
+                key = sort_key(sort)
+                ids.sort(key=lambda task_id: key(self.task_map[task_id]), reverse=reverse)
+            elif reverse:
+                ids.reverse()
+            total = len(ids)
+        elif expression.strip():  # Checked here, so the whole ordered list is needed
+            matches = self._expression_ids(expression)
+            ids = [task_id for task_id in self.storage.filter_ids(name, priority, date, order, due_range)
+                   if task_id in matches]
+            if order is None and reverse:
+                ids.reverse()
+            total = len(ids)
+        else:
+            total = self.storage.count_ids(name, priority, date, due_range)
+
+        start = position or 0
+        if direction == "before":
+            start, limit = max(0, start - limit), min(limit, start)
+        end = min(total, start + limit)
+        if ids is not None:
+            ids = ids[start:end]
+        elif order is None and reverse:  # The same rows counted from the other end
+            ids = self.storage.filter_ids(name, priority, date, None, due_range, (total - end, end - start))[::-1]
+        else:
+            ids = self.storage.filter_ids(name, priority, date, order, due_range, (start, end - start))
+        return Page(
+            [self.task_map[task_id] for task_id in ids], total,
+            encode_cursor(query, "after", end) if end < total else None,
+            encode_cursor(query, "before", start) if start > 0 else None)
+
+    # Counts over every task: per priority, overdue, due today, undated and due in each
+    # of the next few weeks (see TaskAggregates.summary). The counts are built on the
+    # first call and then kept up to date by each change, so later calls cost O(weeks).
+    def task_summary(self, today=None, weeks=SUMMARY_WEEKS):
+        with self.lock:
+            if self.aggregates is None:
+                self.aggregates = TaskAggregates()
+                self.aggregates.rebuild(self.task_map.values())
+            return self.aggregates.summary(today, weeks)
+
+    # Start keeping reminders for every task due from today on (one heapify). Later
+    # changes reschedule just the task changed.
+    def start_reminders(self, today=None):
+        with self.lock:
+            self.reminders = ReminderHeap(self.task_map.values(), today)
+
+    # Date of the next reminder, or None
+    def next_reminder(self):
+        with self.lock:
+            ordinal = self.reminders.next_due() if self.reminders is not None else None
+            return None if ordinal is None else date.fromordinal(ordinal)
+
+    # Tasks whose due day has arrived since they were last reminded, earliest first;
+    # each is returned once
+    def due_reminders(self, today=None):
+        with self.lock:
+            if self.reminders is None:
+                return []
+            return [self.task_map[task_id] for task_id in self.reminders.pop_due(today)]
+
+    # Tasks due between two dates (inclusive, either may be None for open), earliest first
+    @timed
+    def tasks_due(self, first=None, last=None):
+        with self.lock:
+            if self.storage.supports_queries:
+                ids = self.storage.filter_ids(order=("due_date", False), due_range=(first, last))
+            else:
+                ids = self._due_ids((first, last))
+            return [self.task_map[task_id] for task_id in ids]
+
+    # Tasks due before today
+    def overdue_tasks(self, today=None):
+        today = today or date.today()
+        return self.tasks_due(last=today - timedelta(days=1))
+
+    # Tasks due from today through the next few days
+    def upcoming_tasks(self, days=7, today=None):
+        today = today or date.today()
+        return self.tasks_due(today, today + timedelta(days=days))
+
+    # Ids matching the in-memory indexes (unordered), or None when nothing is filtered
+    def _matching_ids(self, name, priority, date, due_range, expression=""):
+        ids = self._task_index().query(name, priority, date)
+        if expression.strip():
+            matches = self._expression_ids(expression)
+            ids = matches if ids is None else matches.intersection(ids)
+        if due_range is None:
+            return ids
+        in_range = self._due_ids(due_range)
+        return in_range if ids is None else set(in_range).intersection(ids)
+
+    # Ids matching the filters on any backend (unordered)
+    def _allowed_ids(self, name, priority, date, due_range, expression=""):
+        if not self.storage.supports_queries:
+            ids = self._matching_ids(name, priority, date, due_range, expression)
+            return self.task_map.keys() if ids is None else ids
+        ids = self.storage.filter_ids(name, priority, date, due_range=due_range)
+        if expression.strip():
+            matches = self._expression_ids(expression)
+            ids = [task_id for task_id in ids if task_id in matches]
+        return ids
+
+    # Compiled filter expression, cached by its text, today's date (which "today" refers
+    # to) and the number of priority names with codes (which the predicate compares).
+    # Raises QueryError for a query that does not parse.
+    def compile_query(self, expression):
+        key = self._query_key(expression)
+        query = self.query_cache.pop(key, None)
+        if query is None:
+            query = CompiledQuery(key[0])
+            while len(self.query_cache) >= QUERY_CACHE_SIZE:
+                del self.query_cache[next(iter(self.query_cache))]
+        self.query_cache[key] = query  # Most recently used last
+        return query
+
+    @staticmethod
+    def _query_key(expression):
+        return expression.strip(), date.today().toordinal()
 
-    # Sort tasks by name, due_date, or priority
+    def _query_plan(self, expression):
+        query = self.compile_query(expression)
+        if not self.indexed:
+            return QueryPlan(query)
+        return QueryPlan(query, self._task_index(), lambda: self._sorted_view("due_date"))
+
+    # Ids of the tasks matching a filter expression
+    def _expression_ids(self, expression):
+        return self._query_plan(expression).run(self.task_map)
+
+    # How a filter expression is planned and run, as lines of text: the conditions, the
+    # index lookups considered (the smallest is used), the compiled predicate checked on
+    # its candidates, and the result of running it
+    def explain_query(self, expression):
+        with self.lock:
+            cached = self._query_key(expression) in self.query_cache
+            plan = self._query_plan(expression)
+            start = time.perf_counter()
+            matches = plan.run(self.task_map)
+            elapsed = time.perf_counter() - start
+        lines = [f"Query: {expression.strip()}", f"Parsed: {query_text(plan.query.tree)}",
+                 f"Plan cache: {'hit' if cached else 'miss (parsed and compiled now)'}"]
+        lines += plan.describe()
+        lines.append(f"Result: {len(matches):,} of {len(self.task_map):,} tasks in {elapsed * 1000:.2f} ms")
+        return "\n".join(lines)
+
+    # Ids due within a range, in due-date order, sliced out of the due-date view by binary search
+    def _due_ids(self, due_range):
+        first, last = due_range_ordinals(due_range)
+        view = self._sorted_view("due_date")
+        start = bisect_left(view.sort_keys, (first,))
+        stop = bisect_left(view.sort_keys, (last + 1,))
+        return view.ids[start:stop]
+
+    # Sort tasks by name, due_date, or priority; the stored order is left untouched
+    @timed
     def sort_tasks(self, key, reverse=False):
-        if key == "priority":
-            priority_order = {"High": 0, "Medium": 1, "Low": 2}
-            self.tasks.sort(key=lambda t: priority_order.get(t.priority, 3), reverse=reverse)
-        elif key == "due_date":
-            self.tasks.sort(key=lambda t: datetime.strptime(t.due_date, "%Y-%m-%d"), reverse=reverse)
+        with self.lock:
+            self.sort_order = (key, reverse)
+            if self.storage.supports_queries:
+                return TaskList(self.task_map, self.storage.sorted_ids(key, reverse))
+            if self._uses_columns():
+                return TaskList(self.task_map, self._columns().select(None, key), reverse)
+            return TaskList(self.task_map, self._sorted_view(key).ids, reverse)
+
+    # All tasks in the order of the last sort_tasks call (insertion order before any sort)
+    def sorted_tasks(self):
+        if self.sort_order is None:
+            return self.tasks
+        return self.sort_tasks(*self.sort_order)
+
+    def _sorted_view(self, key):
+        view = self.sorted_views.get(key)
+        if view is None:
+            positions = self._task_index().positions
+            view = self.sorted_views[key] = SortedView(sort_key(key), self.task_map.values(), positions)
+        return view
+
+    # Ids matching the filters in the current sort order, from the column engine. Name
+    # substrings (and due dates that are not plain YYYY-MM-DD text) come from the n-gram
+    # and date indexes, which take the priority too as they intersect from the smallest
+    # set up; expressions come from their plan. Each narrows the column mask.
+    def _column_ids(self, name, priority, date, due_range, expression=""):
+        columns = self._columns()
+        plain_date = bool(date) and date_ordinal(date) != UNKNOWN_DATE and date_text(date_ordinal(date)) == date
+        if name or (date and not plain_date):
+            mask = columns.mask("All", date if plain_date else "", due_range)
+            mask = columns.restrict(mask, self._task_index().query(name, priority, "" if plain_date else date))
         else:
-            self.tasks.sort(key=lambda t: getattr(t, key).lower(), reverse=reverse)
-        return self.tasks
+            mask = columns.mask(priority, date, due_range)
+        if expression.strip():
+            mask = columns.restrict(mask, self._expression_ids(expression))
+        key, reverse = self.sort_order or (None, False)
+        return columns.select(mask, key, reverse)
+
+    # Whether the column engine can answer for the current sort order
+    def _uses_columns(self):
+        if self.numpy is None:
+            return False
+        if self.sort_order is None:
+            return True
+        key = self.sort_order[0]
+        return all(column in COLUMN_SORT_KEYS for column in (key if isinstance(key, tuple) else (key,)))
+
+    def _columns(self):
+        if self.columns is None:
+            self.columns = ColumnEngine(self.numpy, self.task_map.values())
+        return self.columns
+
+    # The in-memory indexes, built now if they were deferred
+    def _task_index(self):
+        if self.index is None:
+            self.index = TaskIndex()
+            self.index.rebuild(self.task_map.values())
+        return self.index
+
+    # Put ids in the current sort order
+    def _ordered(self, ids):
+        if self.sort_order is None:
+            return self._task_index().order(ids)
+        key, reverse = self.sort_order
+        return self._sorted_view(key).order(ids, reverse)
 
 # -------------------- Task Manager GUI Class --------------------
 
+FILTER_DELAY_MS = 150  # Pause in typing before a live filter runs
+RESULT_POLL_MS = 15  # How often the GUI checks for a finished background filter
+SEARCH_LIMIT = 1000  # Best full-text matches listed for a search
+LOAD_POLL_MS = 50  # How often the GUI checks on the background loader
+SAVE_ERROR_POLL_MS = 500  # How often the GUI checks for failed background writes
+STATUS_POLL_MS = 1000  # How often the status bar and diagnostics panel show new timings
+FIRST_PAINT_WAIT_MS = 500  # Longest loading waits for the window to be drawn
+SAVED_FILTERS_FILE = "saved_filters.json"  # Filters saved by name from the filter frame
+SUMMARY_BAR_WIDTH = 48  # Width of a week's column in the summary chart
+SUMMARY_CHART_HEIGHT = 64
+REMINDER_MAX_WAIT_MS = 24 * 60 * 60 * 1000  # Longest reminder timer; a later deadline is re-armed daily
+REMINDER_LIST_LIMIT = 20  # Tasks named in the reminders window, the rest are counted
+ROW_HEIGHT = 20  # Treeview row height in pixels, used to work out how many rows fit
+HEADER_HEIGHT = 24  # Height of the Treeview column headings
+
+# How the Date filter entry is read: "On", "Before" and "After" use the entered date,
+# "Between" takes "YYYY-MM-DD..YYYY-MM-DD" (either side may be left empty), and the
+# rest are ranges relative to today
+DATE_MODES = ["On", "Before", "After", "Between", "Overdue", "Today", "Next 7 days", "Next 30 days"]
+
+# filter_tasks arguments for a Date filter mode and the text in the Date entry
+def date_filter_args(mode, text, today=None):
+    text = text.strip()
+    today = today or date.today()
+    if mode == "On":
+        return {"date": text}
+    if mode == "Between":
+        first, _, last = text.partition("..")
+        return {"due_range": (first.strip(), last.strip())} if text else {}
+    if mode in ("Before", "After"):
+        if not text:
+            return {}
+        ordinal = date_ordinal(text)
+        if ordinal == UNKNOWN_DATE:
+            return {"due_range": (text, text)}  # Unreadable date: matches nothing, as with "On"
+        day = date.fromordinal(ordinal)
+        if mode == "Before":
+            return {"due_range": (None, day - timedelta(days=1))}
+        return {"due_range": (day + timedelta(days=1), None)}
+    if mode == "Overdue":
+        return {"due_range": (None, today - timedelta(days=1))}
+    if mode == "Today":
+        return {"due_range": (today, today)}
+    days = int(mode.split()[1])  # "Next N days"
+    return {"due_range": (today, today + timedelta(days=days))}
+
+# Runs queries on a background thread, as run_query(*request); only the newest request
+# waiting is ever run
+class QueryWorker:
+    def __init__(self, run_query):
+        self.run_query = run_query
+        self.condition = threading.Condition()
+        self.pending = None  # (generation, request) waiting to run
+        self.results = queue.Queue()  # (generation, result or exception), read by the GUI
+        threading.Thread(target=self._run, daemon=True).start()
+
+    # Queue a query, replacing any older one that has not started yet
+    def submit(self, generation, request):
+        with self.condition:
+            self.pending = (generation, request)
+            self.condition.notify()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while self.pending is None:
+                    self.condition.wait()
+                generation, request = self.pending
+                self.pending = None
+            try:
+                result = self.run_query(*request)
+            except Exception as e:
+                result = e
+            self.results.put((generation, result))
+
 # Builds the main application GUI using Tkinter
 class TaskManagerGUI:
-    def __init__(self, root):
+    def __init__(self, root, storage=None, startup_timing=False):
         self.root = root
         self.root.title("Personal Task Manager")
         self.root.geometry("1024x768")
         self.root.configure(bg='#f0f0f0')
 
-        self.manager = TaskManager() # Task manager instance
+        # Task manager instance, loaded in the background and saving on a writer thread.
+        # TASKS_ENGINE=numpy filters and sorts on the NumPy column engine when it is installed.
+        self.manager = TaskManager(storage=storage, load=False, background=True,
+                                   engine=os.environ.get("TASKS_ENGINE", "python"))
         self.current_sort = {"key": "name", "reverse": False}  # Default sort state
+        self.current_filters = {}  # Filters from the last Apply, re-run on every refresh
+        self.query_worker = QueryWorker(self.run_query)  # Every refresh of the list runs on it
+        self.query_generation = 0  # Bumped per query; results from older queries are dropped
+        self.pending_generation = None  # Query the GUI is waiting on, if any
+        self.filter_after_id = None  # Pending debounce timer
+        self.polling = False
+        self.interactive_pending = False  # Loading is done; announce it once its rows show
+        self.startup_timing = startup_timing  # Print the startup timings and exit once usable
 
         self.setup_ui()  # Setup GUI components
-        self.refresh_tasks()  # Load and show tasks
+        self.loading = True
+        self.load_error = None  # Exception that stopped the loader; editing stays off after one
+        for button in self.action_buttons:
+            button.state(["disabled"])  # Editing waits until everything is loaded
+        mark_startup("window_built")
+
+        # Tasks start loading once the empty window has been drawn, so the loader thread
+        # does not hold up the first paint (or after a short wait if it is never drawn)
+        self.painted = False
+        self.paint_binding = self.root.bind("<Expose>", self.on_first_paint, add="+")
+        self.root.after(FIRST_PAINT_WAIT_MS, self.on_first_paint)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+    def on_first_paint(self, event=None):
+        if self.painted:
+            return
+        self.painted = True
+        self.root.unbind("<Expose>", self.paint_binding)
+        self.root.after_idle(self.start_loading)  # After the redraws already queued
+
+    # Flush storage (folds the journal into tasks.json) before the window closes
+    def on_close(self):
+        # A half-loaded manager must not be compacted over the file; nothing was edited yet
+        if not self.loading and self.load_error is None:
+            try:
+                self.manager.close()
+            except Exception as e:
+                messagebox.showerror("Error", f"Failed to save tasks: {str(e)}")
+        self.root.destroy()
+
+    # Report writes that failed on the writer thread (it keeps retrying them)
+    def poll_save_errors(self):
+        writer = self.manager.writer
+        if writer is not None:
+            while not writer.errors.empty():
+                messagebox.showerror("Error", f"Failed to save tasks: {str(writer.errors.get_nowait())}")
+        self.root.after(SAVE_ERROR_POLL_MS, self.poll_save_errors)
+
+    # Load tasks on a background thread; the first rows show as soon as they arrive
+    def start_loading(self):
+        mark_startup("first_paint")
+        self.first_page_shown = False
+        self.load_updates = queue.Queue()  # (tasks loaded, fraction done), then None or an exception
+        threading.Thread(target=self._load_in_background, daemon=True).start()
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+
+    @timed
+    def _load_in_background(self):
+        try:
+            for update in self.manager.iter_load_tasks():
+                self.load_updates.put(update)
+            self.manager.start_reminders()  # Heapify off the GUI thread
+            self.load_updates.put(None)
+        except Exception as e:
+            self.load_updates.put(e)
+            return
+        self.manager.build_deferred_indexes()  # With the list already up and editable
+
+    # Update the progress bar from the loader and show the rows once they arrive
+    def poll_loading(self):
+        latest, finished = None, False
+        while not self.load_updates.empty():
+            update = self.load_updates.get_nowait()
+            if update is None or isinstance(update, Exception):
+                finished = True
+                if isinstance(update, Exception):
+                    self.load_error = update
+            else:
+                latest = update
+
+        if finished and self.load_error is not None:
+            # Keep what was read on show, but read-only: saving it would lose the rest
+            self.loading = False
+            self.progress_label.config(text=f"Loading failed, editing is off: {self.load_error}")
+            self.refresh_tasks()
+            messagebox.showerror("Error", f"Failed to load tasks: {str(self.load_error)}\n\n"
+                                          "The tasks read so far are shown, but cannot be edited.")
+            return
+
+        if finished:
+            self.loading = False
+            self.progress_frame.grid_remove()
+            for button in self.action_buttons:
+                button.state(["!disabled"])
+            self.show_summary()
+            self.interactive_pending = True
+            self.refresh_tasks()
+            self.fire_reminders()
+            return
+
+        if latest is not None:
+            count, fraction = latest
+            self.progress_bar["value"] = fraction * 100
+            self.progress_label.config(text=f"Loading tasks... {count:,}")
+            self.show_summary()
+            if not self.first_page_shown:
+                self.first_page_shown = True
+                self.refresh_tasks()
+        self.root.after(LOAD_POLL_MS, self.poll_loading)
+
+    # Every task is loaded and shown, and the buttons work
+    def on_interactive(self):
+        mark_startup("interactive")
+        if self.startup_timing:
+            print(f"{startup_report()} ({len(self.manager.task_map):,} tasks)", file=sys.stderr)
+            self.on_close()
 
     # Setup all the UI widgets and layout
     def setup_ui(self):
@@ -165,9 +3646,59 @@ class TaskManagerGUI:
         ttk.Label(filter_frame, text="Date (YYYY-MM-DD):").grid(row=0, column=4, padx=5)
         self.date_filter = ttk.Entry(filter_frame)
         self.date_filter.grid(row=0, column=5, padx=5)
+        self.date_mode = ttk.Combobox(filter_frame, values=DATE_MODES, state="readonly", width=12)
+        self.date_mode.current(0)
+        self.date_mode.grid(row=0, column=6, padx=5)
+
+        # Filters also apply live while typing
+        self.name_filter.bind("<KeyRelease>", self.schedule_filter)
+        self.date_filter.bind("<KeyRelease>", self.schedule_filter)
+        self.priority_filter.bind("<<ComboboxSelected>>", self.schedule_filter)
+        self.date_mode.bind("<<ComboboxSelected>>", self.schedule_filter)
 
-        ttk.Button(filter_frame, text="Apply", command=self.apply_filters).grid(row=0, column=6, padx=5)
-        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).grid(row=0, column=7, padx=5)
+        ttk.Button(filter_frame, text="Apply", command=self.apply_filters).grid(row=0, column=7, padx=5)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filters).grid(row=0, column=8, padx=5)
+
+        # Full-text search over names and descriptions ("a b" = both, "a OR b", "pre*")
+        ttk.Label(filter_frame, text="Search:").grid(row=1, column=0, padx=5, pady=(5, 0))
+        self.text_filter = ttk.Entry(filter_frame)
+        self.text_filter.grid(row=1, column=1, columnspan=3, sticky="ew", padx=5, pady=(5, 0))
+        self.text_filter.bind("<KeyRelease>", self.schedule_filter)
+
+        # Paged mode: the list shows one page of the query at a time (query_tasks)
+        self.paged = tk.BooleanVar(value=False)
+        self.page_cursor = None  # Cursor the current page was fetched with (None: first page)
+        self.page = None  # Current Page
+        self.page_start = 0  # Row number of the first task on the page, for the label
+        ttk.Checkbutton(filter_frame, text="Paged", variable=self.paged,
+                        command=self.toggle_paged).grid(row=1, column=4, padx=5, pady=(5, 0))
+        self.page_size = ttk.Combobox(filter_frame, values=PAGE_SIZES, state="readonly", width=6)
+        self.page_size.set(PAGE_SIZE)
+        self.page_size.grid(row=1, column=5, padx=5, pady=(5, 0))
+        self.page_size.bind("<<ComboboxSelected>>", lambda e: self.first_page())
+        self.prev_button = ttk.Button(filter_frame, text="< Prev", command=lambda: self.turn_page(-1))
+        self.prev_button.grid(row=1, column=6, padx=5, pady=(5, 0))
+        self.next_button = ttk.Button(filter_frame, text="Next >", command=lambda: self.turn_page(1))
+        self.next_button.grid(row=1, column=7, padx=5, pady=(5, 0))
+        self.page_label = ttk.Label(filter_frame, text="")
+        self.page_label.grid(row=1, column=8, padx=5, pady=(5, 0))
+        self.show_page_controls()
+
+        # Filter expression ("priority in (High, Medium) and due < today+7"), with Explain
+        # and filters saved by name
+        ttk.Label(filter_frame, text="Query:").grid(row=2, column=0, padx=5, pady=(5, 0))
+        self.query_filter = ttk.Entry(filter_frame)
+        self.query_filter.grid(row=2, column=1, columnspan=3, sticky="ew", padx=5, pady=(5, 0))
+        self.query_filter.bind("<KeyRelease>", self.schedule_filter)
+        ttk.Button(filter_frame, text="Explain", command=self.explain_filter).grid(row=2, column=4, padx=5, pady=(5, 0))
+        self.saved_filters = None  # name -> filter fields, read from SAVED_FILTERS_FILE when first needed
+        self.saved_filter = ttk.Combobox(filter_frame, state="readonly", width=16,
+                                         postcommand=self.list_saved_filters)
+        self.saved_filter.grid(row=2, column=5, columnspan=2, padx=5, pady=(5, 0))
+        self.saved_filter.bind("<<ComboboxSelected>>", self.load_saved_filter)
+        ttk.Button(filter_frame, text="Save Filter", command=self.save_filter).grid(row=2, column=7, padx=5, pady=(5, 0))
+        self.query_error = ttk.Label(filter_frame, text="", foreground="#c00000")
+        self.query_error.grid(row=3, column=1, columnspan=7, sticky="w", padx=5)
 
         # Task List (Treeview)
         tree_frame = ttk.Frame(main_frame)
@@ -176,7 +3707,8 @@ class TaskManagerGUI:
         style.configure("Treeview",
                         background="white",
                         foreground="black",
-                        fieldbackground="white")
+                        fieldbackground="white",
+                        rowheight=ROW_HEIGHT)
         style.map('Treeview', background=[('selected', '#4a90d9')])
         style.configure('TCombobox', fieldbackground='white', background='white')
         style.configure('TCombobox', arrowcolor='black')
@@ -191,55 +3723,385 @@ class TaskManagerGUI:
                             command=lambda c=col: self.sort_by_column(c))
             self.tree.column(col, width=120 if col != "description" else 250)
 
-        # Scrollbar for task list
-        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Virtual list: only the rows that fit are inserted, scrolling pages through self.results
+        self.results = []  # Tasks currently listed (filtered/sorted), any sequence
+        self.first_row = 0  # Index in self.results of the top visible row
+        self.visible_rows = 1
+        self.selected_id = None
+        self.row_values = {}  # iid -> values of every row currently in the Treeview
+
+        # Scrollbar for task list, driven by the position in self.results rather than the Treeview
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.on_scroll)
         self.tree.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+        self.scrollbar.pack(side="right", fill="y")
+
+        self.tree.bind("<Configure>", self.on_tree_resize)
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", lambda e: self.scroll_rows(-3 if e.delta > 0 else 3))
+        self.tree.bind("<Button-4>", lambda e: self.scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self.scroll_rows(3))
+        self.tree.bind("<Up>", lambda e: self.move_selection(-1))
+        self.tree.bind("<Down>", lambda e: self.move_selection(1))
+        self.tree.bind("<Prior>", lambda e: self.scroll_rows(-self.visible_rows))
+        self.tree.bind("<Next>", lambda e: self.scroll_rows(self.visible_rows))
 
         # Action Buttons
         btn_frame = ttk.Frame(main_frame)
         btn_frame.grid(row=3, column=0, columnspan=4, pady=10)
 
-        ttk.Button(btn_frame, text="Add Task", command=self.show_add_dialog).pack(side="top", padx=5)
-        ttk.Button(btn_frame, text="Edit Task", command=self.show_edit_dialog).pack(side="top", padx=5)
-        ttk.Button(btn_frame, text="Delete Task", command=self.delete_task).pack(side="top", padx=5)
+        self.action_buttons = [
+            ttk.Button(btn_frame, text="Add Task", command=self.show_add_dialog),
+            ttk.Button(btn_frame, text="Edit Task", command=self.show_edit_dialog),
+            ttk.Button(btn_frame, text="Delete Task", command=self.delete_task),
+        ]
+        for button in self.action_buttons:
+            button.pack(side="top", padx=5)
+        ttk.Button(btn_frame, text="Diagnostics", command=self.show_diagnostics).pack(side="top", padx=5)
+
+        # Loading progress, hidden once every task is loaded
+        self.progress_frame = ttk.Frame(main_frame)
+        self.progress_frame.grid(row=4, column=0, columnspan=4, sticky="ew")
+        self.progress_label = ttk.Label(self.progress_frame, text="Loading tasks...")
+        self.progress_label.pack(side="left", padx=5)
+        self.progress_bar = ttk.Progressbar(self.progress_frame, mode="determinate", maximum=100)
+        self.progress_bar.pack(side="left", fill="x", expand=True, padx=5)
+
+        # Summary of every task (whatever the filters), redrawn from the manager's running
+        # counts after each change and on the status poll, which also notices a new day
+        summary_frame = ttk.LabelFrame(main_frame, text="Summary", padding=5)
+        summary_frame.grid(row=6, column=0, columnspan=4, sticky="ew", pady=(5, 0))
+        self.summary_label = ttk.Label(summary_frame, text="", anchor="w", justify="left")
+        self.summary_label.pack(side="left", fill="x", expand=True, padx=5)
+        self.summary_chart = tk.Canvas(summary_frame, width=SUMMARY_BAR_WIDTH * SUMMARY_WEEKS,
+                                       height=SUMMARY_CHART_HEIGHT, bg="white", highlightthickness=0)
+        self.summary_chart.pack(side="right", padx=5)
+        self.summary = None  # Summary currently drawn
+
+        # Reminders: one timer, armed for the next due date once loading has finished
+        self.reminder_after_id = None
+        self.reminder_armed = None  # Date the timer is armed for
+        self.reminder_window = None  # Reminders window, built for the first batch
+        self.reminder_lines = []
+
+        # Status bar with the time the latest action took, created once there is a timing
+        # to show; the diagnostics window and the add/edit dialogs are also built when opened
+        self.main_frame = main_frame
+        self.status_label = None
+        self.diagnostics = None
+        self.root.after(STATUS_POLL_MS, self.update_status)
+        self.root.after(SAVE_ERROR_POLL_MS, self.poll_save_errors)
 
         # Allow task list to expand with the window
         main_frame.columnconfigure(0, weight=1)
         main_frame.rowconfigure(2, weight=1)
 
-    # Refresh task list in Treeview
-    def refresh_tasks(self, tasks=None):
-        self.tree.delete(*self.tree.get_children())
-        tasks = tasks if tasks is not None else self.manager.tasks
-        for task in tasks:
-            self.tree.insert("", "end", values=(task.name, task.description, task.priority, task.due_date))
+    # Refresh the task list: the current filters (or page) are run again on the query
+    # worker, with a new sort first if one is given, and poll_filter_results shows the
+    # rows. Any query still running is dropped; its result would be older.
+    def refresh_tasks(self, sort=None):
+        page = (int(self.page_size.get()), self.page_cursor) if self.paged.get() else None
+        self.query_generation += 1
+        self.pending_generation = self.query_generation
+        self.query_worker.submit(self.query_generation, (self.current_filters, sort, page))
+        if not self.polling:
+            self.polling = True
+            self.root.after(RESULT_POLL_MS, self.poll_filter_results)
+
+    # Run on the query worker: sort if asked, then every task matching the filters, or for
+    # page=(limit, cursor) (page, True if the cursor was left behind by a new filter or
+    # sort and the first page was fetched instead)
+    def run_query(self, filters, sort=None, page=None):
+        if sort is not None:
+            self.manager.sort_tasks(*sort)
+        if page is None:
+            return self.manager.filter_tasks(**filters)
+        limit, cursor = page
+        key, reverse = self.manager.sort_order or (None, False)
+        try:
+            return self.manager.query_tasks(filters, key, reverse, limit, cursor), False
+        except ValueError:
+            return self.manager.query_tasks(filters, key, reverse, limit), True
+
+    # Show what run_query returned in the Treeview
+    @timed
+    def show_results(self, result):
+        if isinstance(result, tuple):
+            self.page, restarted = result
+            if restarted:
+                self.page_cursor, self.page_start = None, 0
+            self.show_page_controls()
+            result = self.page.tasks
+        self.results = result
+        self.first_row = max(0, min(self.first_row, len(result) - self.visible_rows))
+        self.render_rows()
+        mark_startup("first_rows")
+
+    # Bring the Treeview in line with the rows that fit from self.first_row,
+    # only deleting, inserting, updating or moving the rows that differ
+    @timed
+    def render_rows(self):
+        window = self.results[self.first_row:self.first_row + self.visible_rows]
+        wanted = {task.id for task in window}
+        stale = [iid for iid in self.tree.get_children() if iid not in wanted]
+        if stale:
+            self.tree.delete(*stale)
+            for iid in stale:
+                del self.row_values[iid]
+
+        rows = list(self.tree.get_children())
+        for i, task in enumerate(window):
+            values = (task.name, task.description, task.priority, task.due_date)
+            if task.id not in self.row_values:
+                self.tree.insert("", i, iid=task.id, values=values)
+                rows.insert(i, task.id)
+            else:
+                if self.row_values[task.id] != values:
+                    self.tree.item(task.id, values=values)
+                if rows[i] != task.id:
+                    self.tree.move(task.id, "", i)
+                    rows.remove(task.id)
+                    rows.insert(i, task.id)
+            self.row_values[task.id] = values
+
+        if self.selected_id is not None and self.tree.exists(self.selected_id):
+            self.tree.selection_set(self.selected_id)
+
+        total = len(self.results)
+        if total:
+            self.scrollbar.set(self.first_row / total, min(1.0, (self.first_row + self.visible_rows) / total))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+
+    # Scrollbar callback: ("moveto", fraction) or ("scroll", count, "units"/"pages")
+    def on_scroll(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to(int(float(amount) * len(self.results)))
+        elif unit == "pages":
+            self.scroll_rows(int(amount) * self.visible_rows)
+        else:
+            self.scroll_rows(int(amount))
+
+    def scroll_rows(self, count):
+        self.scroll_to(self.first_row + count)
+        return "break"
+
+    def scroll_to(self, row):
+        row = max(0, min(row, len(self.results) - self.visible_rows))
+        if row != self.first_row:
+            self.first_row = row
+            self.render_rows()
 
-    # Apply filters and show filtered tasks
+    # Work out how many rows fit whenever the Treeview is resized
+    def on_tree_resize(self, event):
+        rows = max(1, (event.height - HEADER_HEIGHT) // ROW_HEIGHT)
+        if rows != self.visible_rows:
+            self.visible_rows = rows
+            self.first_row = max(0, min(self.first_row, len(self.results) - rows))
+            self.render_rows()
+
+    def on_select(self, event):
+        selection = self.tree.selection()
+        if selection:
+            self.selected_id = selection[0]
+
+    # Arrow keys scroll the list when the selection is on the first or last visible row
+    def move_selection(self, step):
+        rows = self.tree.get_children()
+        selection = self.tree.selection()
+        if not rows or not selection:
+            return None
+        if 0 <= rows.index(selection[0]) + step < len(rows):
+            return None  # Let the Treeview move the selection itself
+        self.scroll_rows(step)
+        rows = self.tree.get_children()
+        target = rows[0] if step < 0 else rows[-1]
+        self.tree.selection_set(target)
+        self.tree.focus(target)
+        return "break"
+
+    def turn_page(self, step):
+        if self.page is None:
+            return
+        cursor = self.page.next_cursor if step > 0 else self.page.prev_cursor
+        if cursor is None:
+            return
+        self.page_start = max(0, self.page_start + (len(self.page.tasks) if step > 0 else -int(self.page_size.get())))
+        self.page_cursor = cursor
+        self.first_row = 0
+        self.refresh_tasks()
+
+    def first_page(self, sort=None):
+        self.page_cursor, self.page_start = None, 0
+        self.first_row = 0
+        self.refresh_tasks(sort)
+
+    def toggle_paged(self):
+        self.page = None
+        self.first_page()
+        self.show_page_controls()
+
+    # Enable Prev/Next where there is a page to go to, and show which rows are listed
+    def show_page_controls(self):
+        page = self.page if self.paged.get() else None
+        self.prev_button.state(["!disabled" if page and page.prev_cursor else "disabled"])
+        self.next_button.state(["!disabled" if page and page.next_cursor else "disabled"])
+        self.page_size.state(["!disabled" if self.paged.get() else "disabled"])
+        if page is None:
+            self.page_label.config(text="")
+        elif page.tasks:
+            self.page_label.config(text=f"{self.page_start + 1:,}-{self.page_start + len(page.tasks):,} "
+                                        f"of {page.total:,}")
+        else:
+            self.page_label.config(text=f"0 of {page.total:,}")
+
+    # Restart the debounce timer on every keystroke in the filter inputs
+    def schedule_filter(self, event=None):
+        if self.filter_after_id is not None:
+            self.root.after_cancel(self.filter_after_id)
+        self.filter_after_id = self.root.after(FILTER_DELAY_MS, self.apply_filters)
+
+    # Apply filters and show filtered tasks; the query runs on the worker thread
     def apply_filters(self):
-        tasks = self.manager.filter_tasks(
-            name=self.name_filter.get(),
-            priority=self.priority_filter.get(),
-            date=self.date_filter.get()
-        )
-        self.refresh_tasks(tasks)
+        self.filter_after_id = None
+        expression = self.query_filter.get()
+        if expression.strip():
+            try:
+                CompiledQuery(expression)  # Report mistakes here rather than from the worker
+            except QueryError as e:
+                self.query_error.config(text=str(e))
+                return
+        self.query_error.config(text="")
+        self.current_filters = {
+            "name": self.name_filter.get(),
+            "priority": self.priority_filter.get(),
+            "text": self.text_filter.get(),
+            "text_limit": SEARCH_LIMIT,
+            "expression": expression,
+            **date_filter_args(self.date_mode.get(), self.date_filter.get())
+        }
+        self.first_page()
+
+    # Show the result of the newest query once the worker delivers it
+    def poll_filter_results(self):
+        latest = None
+        while not self.query_worker.results.empty():
+            generation, result = self.query_worker.results.get_nowait()
+            if generation == self.query_generation:
+                latest = (result,)
+        if self.pending_generation != self.query_generation:
+            self.polling = False  # Dropped by an edit, a refresh or Clear
+            return
+        if latest is None:
+            self.root.after(RESULT_POLL_MS, self.poll_filter_results)
+            return
+
+        self.polling = False
+        self.pending_generation = None
+        result = latest[0]
+        if self.interactive_pending:
+            self.interactive_pending = False
+            self.root.after_idle(self.on_interactive)
+        if isinstance(result, Exception):
+            messagebox.showerror("Error", f"Failed to filter tasks: {str(result)}")
+            return
+        self.show_results(result)
+
+    # Forget the queries still running: their results were worked out from tasks
+    # or filters that have changed since, and poll_filter_results drops them
+    def drop_pending_queries(self):
+        self.query_generation += 1
+        self.pending_generation = None
 
     # Clear all filters and show all tasks
     def clear_filters(self):
         self.name_filter.delete(0, tk.END)
         self.priority_filter.current(0)
         self.date_filter.delete(0, tk.END)
-        self.refresh_tasks()
+        self.date_mode.current(0)
+        self.text_filter.delete(0, tk.END)
+        self.query_filter.delete(0, tk.END)
+        self.query_error.config(text="")
+        self.saved_filter.set("")
+        if self.filter_after_id is not None:
+            self.root.after_cancel(self.filter_after_id)
+            self.filter_after_id = None
+        self.current_filters = {}
+        self.first_page()
+
+    # Show how the filter expression is planned and what running it costs
+    def explain_filter(self):
+        expression = self.query_filter.get()
+        if not expression.strip():
+            messagebox.showinfo("Explain", "Enter a query to explain, e.g. priority = High and due < today+7")
+            return
+        try:
+            plan = self.manager.explain_query(expression)
+        except QueryError as e:
+            self.query_error.config(text=str(e))
+            return
+        window = tk.Toplevel(self.root)
+        window.title("Query Plan")
+        text = tk.Text(window, width=100, height=min(30, plan.count("\n") + 2), font="TkFixedFont", bg="white")
+        text.insert("1.0", plan)
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True, padx=5, pady=5)
+
+    # Values of every filter input, as saved under a name
+    def filter_fields(self):
+        return {"name": self.name_filter.get(), "priority": self.priority_filter.get(),
+                "date": self.date_filter.get(), "date_mode": self.date_mode.get(),
+                "text": self.text_filter.get(), "expression": self.query_filter.get()}
+
+    # Saved filters from the file, read the first time they are asked for
+    def list_saved_filters(self):
+        if self.saved_filters is None:
+            try:
+                with open(SAVED_FILTERS_FILE, "r") as file:
+                    self.saved_filters = json.load(file)
+            except FileNotFoundError:
+                self.saved_filters = {}
+            except (OSError, ValueError) as e:
+                self.saved_filters = {}
+                messagebox.showerror("Error", f"Failed to read saved filters: {str(e)}")
+        self.saved_filter["values"] = sorted(self.saved_filters)
+
+    def save_filter(self):
+        from tkinter import simpledialog
+        name = simpledialog.askstring("Save Filter", "Name for the current filters:", parent=self.root)
+        if not name or not name.strip():
+            return
+        self.list_saved_filters()
+        self.saved_filters[name.strip()] = self.filter_fields()
+        try:
+            with open(SAVED_FILTERS_FILE, "w") as file:
+                json.dump(self.saved_filters, file, indent=4)
+        except OSError as e:
+            messagebox.showerror("Error", f"Failed to save the filter: {str(e)}")
+            return
+        self.list_saved_filters()
+        self.saved_filter.set(name.strip())
+
+    # Fill the filter inputs from a saved filter and apply them
+    def load_saved_filter(self, event=None):
+        fields = self.saved_filters.get(self.saved_filter.get())
+        if fields is None:
+            return
+        for entry, key in ((self.name_filter, "name"), (self.date_filter, "date"),
+                           (self.text_filter, "text"), (self.query_filter, "expression")):
+            entry.delete(0, tk.END)
+            entry.insert(0, fields.get(key, ""))
+        self.priority_filter.set(fields.get("priority", "All"))
+        self.date_mode.set(fields.get("date_mode", DATE_MODES[0]))
+        self.apply_filters()
 
     # Sort tasks by selected column
+    @timed
     def sort_by_column(self, column):
         if self.current_sort["key"] == column:
             self.current_sort["reverse"] = not self.current_sort["reverse"]
         else:
             self.current_sort = {"key": column, "reverse": False}
-        self.manager.sort_tasks(column, self.current_sort["reverse"])
-        self.refresh_tasks()
+        self.first_page((column, self.current_sort["reverse"]))
 
     # Show dialog to add a new task
     def show_add_dialog(self):
@@ -250,12 +4112,14 @@ class TaskManagerGUI:
         if not self.tree.selection():
             messagebox.showinfo("Info", "Please select a task to edit")
             return
-        index = self.tree.index(self.tree.selection()[0])
-        task = self.manager.tasks[index]
-        self.task_dialog("Edit Task", self.update_task, index, task)
+        task = self.manager.get_task(self.tree.selection()[0])
+        if task is None:
+            self.task_gone()
+            return
+        self.task_dialog("Edit Task", self.update_task, task.id, task)
 
     # Common dialog window for both add/edit task
-    def task_dialog(self, title, callback, index=None, task=None):
+    def task_dialog(self, title, callback, task_id=None, task=None):
         dialog = tk.Toplevel(self.root)
         dialog.title(title)
         dialog.transient(self.root)
@@ -288,33 +4152,24 @@ class TaskManagerGUI:
         btn_frame.grid(row=4, column=0, columnspan=2, pady=10)
 
         ttk.Button(btn_frame, text="Save", style='TButton', command=lambda: self.save_task(
-            dialog, fields, callback, index)).pack(side="left", padx=5)
+            dialog, fields, callback, task_id)).pack(side="left", padx=5)
         ttk.Button(btn_frame, text="Cancel", style='TButton', command=dialog.destroy).pack(side="left", padx=5)
 
     # Save task from dialog input
-    def save_task(self, dialog, fields, callback, index=None):
-        data = {
-            "name": fields["name"].get().strip(),
-            "description": fields["description"].get("1.0", tk.END).strip(),
-            "priority": fields["priority"].get(),
-            "due_date": fields["due_date"].get().strip(),
-        }
-
-        if not data["name"]:
-            messagebox.showerror("Error", "Task name is required")
-            return
-
-        try:
-            datetime.strptime(data["due_date"], "%Y-%m-%d")
-        except ValueError:
-            messagebox.showerror("Error", "Invalid date format (use YYYY-MM-DD)")
+    @timed
+    def save_task(self, dialog, fields, callback, task_id=None):
+        data, error = check_task_fields(
+            fields["name"].get(), fields["description"].get("1.0", tk.END).strip(),
+            fields["priority"].get(), fields["due_date"].get())
+        if error is not None:
+            messagebox.showerror("Error", error)
             return
 
         # Call add or update based on the context
-        if index is None:
+        if task_id is None:
             callback(data)
         else:
-            callback(index, data)
+            callback(task_id, data)
 
         dialog.destroy()
         self.refresh_tasks()
@@ -322,10 +4177,12 @@ class TaskManagerGUI:
     # Add task wrapper
     def add_task(self, task_data):
         self.manager.add_task(task_data)
+        self.tasks_changed()
 
     # Update task wrapper
-    def update_task(self, index, task_data):
-        self.manager.update_task(index, task_data)
+    def update_task(self, task_id, task_data):
+        self.manager.update_task(task_id, task_data)
+        self.tasks_changed()
 
     # Delete selected task
     def delete_task(self):
@@ -333,18 +4190,193 @@ class TaskManagerGUI:
             messagebox.showinfo("Info", "Please select a task to delete")
             return
 
-        index = self.tree.index(self.tree.selection()[0])
-        task = self.manager.tasks[index]
+        task = self.manager.get_task(self.tree.selection()[0])
+        if task is None:
+            self.task_gone()
+            return
 
         if messagebox.askyesno("Confirm", f"Delete task '{task.name}'?"):
-            if self.manager.delete_task(index):
+            if self.manager.delete_task(task.id):
+                self.tasks_changed()
                 self.refresh_tasks()
             else:
                 messagebox.showerror("Error", "Failed to delete task")
         
+    # Show the latest timing in the status bar and keep an open diagnostics panel current
+    def update_status(self):
+        status = ""
+        if METRICS.enabled and METRICS.last_action is not None:
+            name, seconds = METRICS.last_action
+            status = f"{name} took {seconds * 1000:.1f} ms ({len(self.results):,} tasks shown)"
+        if METRICS.last_profile is not None:
+            status += f"  Profile saved to {METRICS.last_profile}"
+        if status and self.status_label is None:
+            self.status_label = ttk.Label(self.main_frame, text="", anchor="w")
+            self.status_label.grid(row=5, column=0, columnspan=4, sticky="ew")
+        if self.status_label is not None:
+            self.status_label.config(text=status)
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.fill_diagnostics()
+        self.show_summary()
+        self.root.after(STATUS_POLL_MS, self.update_status)
+
+    # The selected row's task was deleted after the list was drawn: say so and redraw
+    def task_gone(self):
+        messagebox.showinfo("Info", "That task no longer exists")
+        self.selected_id = None
+        self.refresh_tasks()
+
+    # After an edit: drop filter results worked out before it, update the summary, and
+    # bring the reminder timer forward if the edit made a task due sooner
+    def tasks_changed(self):
+        self.drop_pending_queries()
+        self.show_summary()
+        self.arm_reminder()
+
+    # Arm the reminder timer for the start of the next due day (at once for today), unless
+    # it is already armed for that day
+    def arm_reminder(self):
+        due = self.manager.next_reminder()
+        if due == self.reminder_armed:
+            return
+        if self.reminder_after_id is not None:
+            self.root.after_cancel(self.reminder_after_id)
+            self.reminder_after_id = None
+        self.reminder_armed = due
+        if due is not None:
+            wait = (datetime.combine(due, datetime.min.time()) - datetime.now()).total_seconds()
+            wait_ms = min(max(0, int(wait * 1000) + 1), REMINDER_MAX_WAIT_MS)
+            self.reminder_after_id = self.root.after(wait_ms, self.fire_reminders)
+
+    # Show every task that has come due as one batch, then re-arm for the next day
+    def fire_reminders(self):
+        self.reminder_after_id = None
+        self.reminder_armed = None
+        tasks = self.manager.due_reminders()
+        if tasks:
+            self.notify_due(tasks)
+        self.arm_reminder()
+
+    # Add a batch of due tasks to the reminders window, opening it if it is closed
+    def notify_due(self, tasks):
+        lines = [f"{task.due_date}  {task.name} ({task.priority})" for task in tasks[:REMINDER_LIST_LIMIT]]
+        if len(tasks) > REMINDER_LIST_LIMIT:
+            lines.append(f"... and {len(tasks) - REMINDER_LIST_LIMIT:,} more")
+        header = f"{len(tasks):,} task{'s' if len(tasks) != 1 else ''} due ({datetime.now():%H:%M})"
+        if self.reminder_window is None or not self.reminder_window.winfo_exists():
+            self.reminder_lines = []
+            self.reminder_window = window = tk.Toplevel(self.root)
+            window.title("Reminders")
+            self.reminder_label = ttk.Label(window, text="", justify="left", padding=10)
+            self.reminder_label.pack(fill="both", expand=True)
+            ttk.Button(window, text="Dismiss", command=window.destroy).pack(pady=(0, 10))
+        self.reminder_lines = [header] + lines + [""] + self.reminder_lines  # Newest batch first
+        self.reminder_label.config(text="\n".join(self.reminder_lines[:4 * REMINDER_LIST_LIMIT]))
+        self.reminder_window.lift()
+
+    # Show the task counts and a chart of tasks due per week, redrawn only when they
+    # changed. Reading them is O(weeks); skipped while a filter holds the manager.
+    def show_summary(self):
+        if self.pending_generation is not None:
+            return
+        summary = self.manager.task_summary()
+        if summary == self.summary:
+            return
+        self.summary = summary
+        priorities = "   ".join(f"{name}: {count:,}" for name, count in summary["by_priority"].items())
+        self.summary_label.config(text=(
+            f"Tasks: {summary['total']:,}   {priorities}\n"
+            f"Overdue: {summary['overdue']:,}   Due today: {summary['due_today']:,}   "
+            f"No due date: {summary['undated']:,}"))
+
+        chart = self.summary_chart
+        chart.delete("all")
+        peak = max(count for _, count in summary["weeks"]) or 1
+        bar_space = SUMMARY_CHART_HEIGHT - 26  # Room left for the count above and the date below
+        for week, (monday, count) in enumerate(summary["weeks"]):
+            left, right = week * SUMMARY_BAR_WIDTH + 4, (week + 1) * SUMMARY_BAR_WIDTH - 4
+            bottom = SUMMARY_CHART_HEIGHT - 12
+            top = bottom - round(bar_space * count / peak)
+            chart.create_rectangle(left, top, right, bottom, fill="#4a90d9", outline="")
+            chart.create_text((left + right) / 2, top - 6, text=f"{count:,}", font=("Helvetica", 7))
+            chart.create_text((left + right) / 2, bottom + 6, text=monday[5:], font=("Helvetica", 7))
+
+    # Window listing the recorded timings, with controls to record, reset, save and profile
+    def show_diagnostics(self):
+        if self.diagnostics is not None and self.diagnostics.winfo_exists():
+            self.diagnostics.lift()
+            return
+        self.diagnostics = window = tk.Toplevel(self.root)
+        window.title("Diagnostics")
+        window.geometry("720x360")
+
+        controls = ttk.Frame(window, padding=5)
+        controls.pack(fill="x")
+        self.recording = tk.BooleanVar(value=METRICS.enabled)
+        ttk.Checkbutton(controls, text="Record timings", variable=self.recording,
+                        command=lambda: METRICS.enable(self.recording.get())).pack(side="left", padx=5)
+        ttk.Button(controls, text="Reset", command=METRICS.reset).pack(side="left", padx=5)
+        ttk.Button(controls, text="Save to File", command=self.save_diagnostics).pack(side="left", padx=5)
+        ttk.Button(controls, text="Profile Next Action", command=self.profile_next_action).pack(side="left", padx=5)
+
+        columns = ("Calls", "Total ms", "Mean ms", "p95 ms", "Bytes Written")
+        self.diagnostics_tree = ttk.Treeview(window, columns=columns)
+        self.diagnostics_tree.heading("#0", text="Operation")
+        self.diagnostics_tree.column("#0", width=240)
+        for column in columns:
+            self.diagnostics_tree.heading(column, text=column)
+            self.diagnostics_tree.column(column, width=90, anchor="e")
+        self.diagnostics_tree.pack(fill="both", expand=True, padx=5, pady=5)
+        self.fill_diagnostics()
+
+    def fill_diagnostics(self):
+        self.diagnostics_tree.delete(*self.diagnostics_tree.get_children())
+        for name, stat in METRICS.snapshot().items():
+            values = [stat["calls"], stat["total_ms"], stat["mean_ms"], stat["p95_ms"], stat["bytes_written"]]
+            self.diagnostics_tree.insert("", "end", text=name, values=["" if v is None else v for v in values])
+
+    def save_diagnostics(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self.diagnostics, defaultextension=".json",
+                                            initialfile="task_metrics.json")
+        if path:
+            try:
+                METRICS.dump(path)
+            except OSError as e:
+                messagebox.showerror("Error", f"Failed to save timings: {str(e)}", parent=self.diagnostics)
+
+    # Capture the next action (a filter, sort, save, ...) with cProfile
+    def profile_next_action(self):
+        from tkinter import filedialog
+        path = filedialog.asksaveasfilename(parent=self.diagnostics, defaultextension=".prof",
+                                            initialfile="task_action.prof")
+        if path:
+            METRICS.profile_next(path)
+
 # -------------------- Run the Application --------------------
 
 if __name__ == "__main__":
+    mark_startup("imports")
+    # --startup-timing prints how long the window took to appear and to become usable
+    # (from the start of the imports), then closes it
+    startup_timing = "--startup-timing" in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != "--startup-timing"]
+
+    # A .db path runs on SQLite, a .bin path on the binary file format and a .shards
+    # directory on monthly shard files (loaded by a process pool); a new store of any
+    # kind is seeded from tasks.json and tasks.txt
+    storage = None
+    if args and args[0].endswith((".db", ".bin", ".shards")):
+        is_new = not os.path.exists(args[0])
+        if args[0].endswith(".db"):
+            storage = SqliteStorage(args[0])
+        elif args[0].endswith(".shards"):
+            storage = ShardedStorage(args[0], workers=min(4, os.cpu_count() or 1))
+        else:
+            storage = BinaryStorage(args[0])
+        if is_new:
+            import_legacy_tasks(TaskManager(storage=storage))
+
     root = tk.Tk()
-    app = TaskManagerGUI(root)
+    app = TaskManagerGUI(root, storage, startup_timing)
     root.mainloop()
\ No newline at end of file
@@ -0,0 +1,373 @@
+# Stage 04 Benchmarks : Timing Loading, Saving, Editing, Filtering and Sorting Tasks
+#
+# Generates a seeded, realistic task dataset, runs every TaskManager operation against it
+# and prints the timings as JSON, so runs can be compared across versions:
+#
+#   python benchmark.py --sizes 10000 100000 --backend json --output results.json
+#
+# --engine numpy times the filters and sorts on the NumPy column engine instead; run
+# the same sizes with each engine to compare them:
+#
+#   python benchmark.py --sizes 1000000 --engine python --output python.json
+#   python benchmark.py --sizes 1000000 --engine numpy --output numpy.json
+
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from Stage_04 import (BinaryStorage, JsonStorage, ShardedStorage, SqliteStorage, Task, TaskManager,
+                      TaskManagerGUI, load_numpy)
+
+try:
+    import resource  # Peak memory (not available on Windows)
+except ImportError:
+    resource = None
+
+# -------------------- Dataset Generator --------------------
+
+PRIORITY_WEIGHTS = {"High": 15, "Medium": 60, "Low": 25}  # Most tasks are left at Medium
+VERBS = ["Write", "Review", "Fix", "Plan", "Call", "Email", "Update", "Prepare", "Check", "Book",
+         "Send", "Clean", "Finish", "Draft", "Organise", "Pay", "Test", "Read", "Submit", "Order"]
+NOUNS = ["report", "budget", "meeting", "invoice", "slides", "garden", "car", "dentist", "proposal",
+         "newsletter", "backup", "taxes", "groceries", "website", "contract", "notes", "timesheet",
+         "presentation", "ticket", "essay"]
+
+# Word list with a Zipf-like frequency (a few common words, a long tail of rare ones)
+def make_vocabulary(rng, size=5000):
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    words = list(dict.fromkeys(
+        "".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)))
+    weights = [1 / (rank + 1) for rank in range(len(words))]
+    return words, weights
+
+# Seeded tasks: skewed priorities, due dates clustered around a few busy days (some
+# already overdue) and descriptions with a long-tailed length
+def generate_tasks(count, seed=0, today=None):
+    rng = random.Random(seed)
+    today = today or date(2025, 4, 18)
+    words, weights = make_vocabulary(rng)
+    priorities = rng.choices(list(PRIORITY_WEIGHTS), weights=list(PRIORITY_WEIGHTS.values()), k=count)
+    hotspots = [today + timedelta(days=rng.randint(-60, 365)) for _ in range(24)]
+    tasks = []
+    for i in range(count):
+        name = f"{rng.choice(VERBS)} {rng.choice(NOUNS)} {i}"
+        length = min(400, int(rng.lognormvariate(3, 0.8)))
+        description = " ".join(rng.choices(words, weights=weights, k=length))
+        due = rng.choice(hotspots) + timedelta(days=int(rng.gauss(0, 5)))
+        tasks.append(Task(name, description, priorities[i], due.isoformat(),
+                          task_id=f"{rng.getrandbits(128):032x}"))
+    return tasks
+
+# -------------------- Measurement --------------------
+
+# Value at a percentile of an already sorted list (nearest rank)
+def percentile(values, pct):
+    if not values:
+        return None
+    return values[max(0, math.ceil(pct / 100 * len(values)) - 1)]
+
+# Peak resident memory of the process so far, in kilobytes
+def peak_memory_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak  # macOS reports bytes
+
+# Summary of one operation: latencies of each call and how many items it covered
+def summarise(latencies, items=None):
+    latencies = sorted(latencies)
+    total = sum(latencies)
+    items = items if items is not None else len(latencies)
+    return {
+        "calls": len(latencies),
+        "items": items,
+        "total_s": round(total, 6),
+        "throughput_per_s": round(items / total, 1) if total else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(latencies[-1] * 1000, 3),
+        "peak_rss_kb": peak_memory_kb(),
+    }
+
+# Time each call of func over the arguments, returning the latencies in seconds
+def time_calls(func, arguments):
+    latencies = []
+    for args in arguments:
+        start = time.perf_counter()
+        func(*args)
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+# -------------------- Headless GUI --------------------
+
+# Records the calls show_results makes on a ttk.Treeview, for when there is no display
+class HeadlessTree:
+    def __init__(self):
+        self.rows = []
+        self.values = {}
+
+    def get_children(self, item=""):
+        return tuple(self.rows)
+
+    def delete(self, *items):
+        for item in items:
+            self.rows.remove(item)
+            del self.values[item]
+
+    def insert(self, parent, index, iid=None, values=()):
+        self.rows.insert(index, iid)
+        self.values[iid] = values
+        return iid
+
+    def item(self, item, values=None):
+        self.values[item] = values
+
+    def move(self, item, parent, index):
+        self.rows.remove(item)
+        self.rows.insert(index, item)
+
+    def exists(self, item):
+        return item in self.values
+
+    def selection_set(self, *items):
+        pass
+
+class HeadlessScrollbar:
+    def set(self, first, last):
+        pass
+
+class HeadlessVar:
+    def __init__(self, value):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+# A TaskManagerGUI with just the parts run_query and show_results use; a real (withdrawn) Treeview is
+# used when a display is available
+def headless_gui(manager, visible_rows=35):
+    gui = TaskManagerGUI.__new__(TaskManagerGUI)
+    gui.manager = manager
+    gui.root = None
+    try:
+        import tkinter as tk
+        from tkinter import ttk
+        gui.root = tk.Tk()
+        gui.root.withdraw()
+        gui.tree = ttk.Treeview(gui.root, columns=("Name", "Description", "Priority", "Due Date"))
+        gui.scrollbar = ttk.Scrollbar(gui.root)
+    except Exception:  # No display
+        gui.tree = HeadlessTree()
+        gui.scrollbar = HeadlessScrollbar()
+    gui.results = []
+    gui.first_row = 0
+    gui.visible_rows = visible_rows
+    gui.selected_id = None
+    gui.row_values = {}
+    gui.current_filters = {}
+    gui.paged = HeadlessVar(False)
+    gui.query_generation = 0
+    gui.pending_generation = None
+    return gui
+
+# -------------------- Benchmarks --------------------
+
+BACKENDS = {
+    "json": ("tasks.json", lambda path: JsonStorage(path)),
+    "bin": ("tasks.bin", lambda path: BinaryStorage(path)),
+    "db": ("tasks.db", lambda path: SqliteStorage(path)),
+    "shards": ("tasks.shards", lambda path: ShardedStorage(path, workers=min(4, os.cpu_count() or 1))),
+}
+
+# Bytes on disk under a file or directory
+def disk_bytes(path):
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+# Seconds for a fresh interpreter to import Stage_04 and load the store at path
+def cold_start(backend, path):
+    start = time.perf_counter()
+    subprocess.run([sys.executable, os.path.abspath(__file__), "--cold-start", backend, path], check=True)
+    return time.perf_counter() - start
+
+# Run every benchmark against one dataset size, returning {operation: summary}
+def run_size(size, backend, seed, edits, queries, workdir, engine="python"):
+    file_name, make_storage = BACKENDS[backend]
+    path = os.path.join(workdir, f"{size}-{file_name}")
+    results = {}
+
+    start = time.perf_counter()
+    tasks = generate_tasks(size, seed)
+    results["generate"] = summarise([time.perf_counter() - start], size)
+
+    # Save: write the whole dataset as one snapshot
+    manager = TaskManager(storage=make_storage(path))
+    manager.add_tasks(tasks)
+    results["save"] = summarise(time_calls(manager.save_tasks, [()]), size)
+    manager.close()
+    del manager, tasks
+    gc.collect()
+
+    # Cold start: a new process loading the store, with the JSON snapshot cache (when the
+    # backend has one) and again without it
+    results["cold_start"] = summarise([cold_start(backend, path)], size)
+    if os.path.exists(path + ".cache"):
+        os.rename(path + ".cache", path + ".cache.off")
+        results["cold_start_uncached"] = summarise([cold_start(backend, path)], size)
+        os.replace(path + ".cache.off", path + ".cache")
+
+    # Load: the saved file read in this process
+    start = time.perf_counter()
+    manager = TaskManager(storage=make_storage(path), engine=engine)
+    results["load"] = summarise([time.perf_counter() - start], size)
+
+    rng = random.Random(seed + 1)
+    ids = [task.id for task in manager.tasks]
+    sample = [manager.get_task(task_id) for task_id in rng.sample(ids, min(edits, len(ids)))]
+    new_tasks = generate_tasks(edits, seed + 2)
+
+    # Add, update and delete, one call per task (journaled like GUI edits)
+    results["add"] = summarise(time_calls(manager.add_task, [(
+        {"name": t.name, "description": t.description, "priority": t.priority, "due_date": t.due_date},)
+        for t in new_tasks]))
+    results["update"] = summarise(time_calls(manager.update_task, [(task.id, {
+        "name": task.name + " (edited)", "description": task.description,
+        "priority": rng.choice(list(PRIORITY_WEIGHTS)), "due_date": task.due_date}) for task in sample]))
+    results["delete"] = summarise(time_calls(manager.delete_task, [(task.id,) for task in sample]))
+
+    # Filters: each kind of query, repeated over a spread of values
+    tasks = manager.tasks
+    picks = [rng.choice(tasks) for _ in range(queries)]
+    filter_cases = {
+        "filter_name": [{"name": task.name.split()[1][:4]} for task in picks],
+        "filter_priority": [{"priority": task.priority} for task in picks],
+        "filter_date": [{"date": task.due_date} for task in picks],
+        "filter_due_range": [{"due_range": (task.due_date, date.fromisoformat(task.due_date) + timedelta(days=7))}
+                             for task in picks],
+        "filter_combined": [{"name": task.name.split()[0][:3], "priority": task.priority,
+                             "due_range": (None, task.due_date)} for task in picks],
+        "filter_text": [{"text": task.description.split()[0] if task.description else task.name.split()[1]}
+                        for task in picks],
+    }
+    for operation, cases in filter_cases.items():
+        results[operation] = summarise(time_calls(lambda case: manager.filter_tasks(**case), [(c,) for c in cases]))
+
+    # Sorts: the first sort by a column builds its view (or the engine's columns), later
+    # ones reuse it; then a filter sorted by two columns at once
+    for key in ("name", "priority", "due_date"):
+        results[f"sort_{key}_first"] = summarise(time_calls(manager.sort_tasks, [(key, False)]))
+        results[f"sort_{key}"] = summarise(time_calls(
+            manager.sort_tasks, [(key, bool(i % 2)) for i in range(queries)]))
+    manager.sort_tasks(("priority", "due_date"))
+    results["filter_sorted_multi"] = summarise(time_calls(
+        lambda case: manager.filter_tasks(**case), [(c,) for c in filter_cases["filter_due_range"]]))
+    manager.sort_order = None
+
+    # Summary: the first call counts every task, later ones read the running counts
+    results["summary_first"] = summarise(time_calls(manager.task_summary, [()]))
+    results["summary"] = summarise(time_calls(manager.task_summary, [()] * queries))
+
+    # Pages: the first page of each filter and every sort, then paging on with the cursor
+    page_cases = [({}, None), ({}, "name"), ({}, "due_date")]
+    page_cases += [(case, "name") for case in filter_cases["filter_combined"]]
+    results["page_first"] = summarise(time_calls(
+        lambda filters, key: manager.query_tasks(filters, key, limit=50), page_cases))
+    latencies, page = [], manager.query_tasks({}, "name", limit=50)
+    while page.next_cursor and len(latencies) < queries:
+        start = time.perf_counter()
+        page = manager.query_tasks({}, "name", limit=50, cursor=page.next_cursor)
+        latencies.append(time.perf_counter() - start)
+    results["page_next"] = summarise(latencies)
+
+    # Headless refresh: re-run the current filters and reconcile the visible rows (what the
+    # query worker and then the GUI do, run back to back here)
+    gui = headless_gui(manager)
+    refresh = lambda: gui.show_results(gui.run_query(gui.current_filters))
+    refresh()
+    results["refresh_all"] = summarise(time_calls(refresh, [()] * queries))
+    latencies = []
+    for case in filter_cases["filter_combined"]:
+        gui.current_filters = case
+        latencies += time_calls(refresh, [()])
+    results["refresh_filtered"] = summarise(latencies)
+    if gui.root is not None:
+        gui.root.destroy()
+
+    start = time.perf_counter()
+    manager.close()
+    results["close"] = summarise([time.perf_counter() - start])
+    results["file_bytes"] = sum(disk_bytes(os.path.join(workdir, name))
+                                for name in os.listdir(workdir) if name.startswith(f"{size}-"))
+    return results
+
+# Details of the run, so results from different versions and machines can be told apart
+def run_info(args):
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "backend": args.backend,
+        "engine": args.engine,
+        "numpy": getattr(load_numpy(), "__version__", None) if args.engine == "numpy" else None,
+        "seed": args.seed,
+        "edits": args.edits,
+        "queries": args.queries,
+        "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the Stage 04 task manager.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000],
+                        help="dataset sizes to run (10k to 5M tasks)")
+    parser.add_argument("--backend", choices=sorted(BACKENDS), default="json")
+    parser.add_argument("--engine", choices=["python", "numpy"], default="python",
+                        help="filter and sort engine for in-memory backends")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--edits", type=int, default=500, help="adds, updates and deletes per size")
+    parser.add_argument("--queries", type=int, default=50, help="filter, sort and refresh calls per kind")
+    parser.add_argument("--output", help="write the JSON here instead of printing it")
+    parser.add_argument("--cold-start", nargs=2, metavar=("BACKEND", "PATH"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    if args.engine == "numpy" and load_numpy() is None:
+        parser.error("--engine numpy needs NumPy installed")
+    if args.cold_start:
+        backend, path = args.cold_start
+        TaskManager(storage=BACKENDS[backend][1](path))
+        return  # Not closed: exit as soon as the tasks are loaded
+
+    report = {"run": run_info(args), "sizes": {}}
+    workdir = tempfile.mkdtemp(prefix="task-benchmark-")
+    try:
+        for size in args.sizes:
+            print(f"Benchmarking {size} tasks...", file=sys.stderr)
+            report["sizes"][str(size)] = run_size(size, args.backend, args.seed, args.edits, args.queries, workdir,
+                                                  args.engine)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    text = json.dumps(report, indent=4)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(text + "\n")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
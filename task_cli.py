@@ -0,0 +1,179 @@
+# Stage 04 Command Line : Bulk Import and Export of Tasks Without the GUI
+#
+# Streams tasks between a task store (tasks.json, a .db, .bin or .shards store, as used by
+# Stage_04.py) and JSON, JSON Lines, CSV or Stage 02 tasks.txt files:
+#
+#   python task_cli.py import new_tasks.csv
+#   python task_cli.py import big.jsonl --store tasks.db --batch-size 50000
+#   python task_cli.py export backup.txt --store tasks.bin
+#
+# Input is read and validated a batch at a time, and each batch of valid tasks is
+# written to the store as one commit (one journal append or one SQLite transaction).
+
+import argparse
+import csv
+import json
+import sys
+import time
+
+from Stage_04 import (BinaryStorage, JsonStorage, ShardedStorage, SqliteStorage, Task, TaskManager,
+                      check_task_fields, iter_json_array, iter_tasks_txt, new_task_ids)
+
+IMPORT_BATCH_SIZE = 10_000
+FORMATS = {".json": "json", ".jsonl": "jsonl", ".ndjson": "jsonl", ".csv": "csv", ".txt": "txt"}
+CSV_FIELDS = ["id", "name", "description", "priority", "due_date"]
+
+# -------------------- Task Stores --------------------
+
+# TaskManager over the store at path, picked by extension. Indexes are left until a
+# query needs one, and the JSON journal is only folded into the file on close.
+def open_store(path):
+    if path.endswith(".db"):
+        storage = SqliteStorage(path)
+    elif path.endswith(".bin"):
+        storage = BinaryStorage(path, journal_limit=sys.maxsize)
+    elif path.endswith(".shards"):
+        storage = ShardedStorage(path)
+    else:
+        storage = JsonStorage(path, journal_limit=sys.maxsize)
+    return TaskManager(storage=storage, build_indexes=False)
+
+# File format from --format or the file extension
+def file_format(path, name=None):
+    if name:
+        return name
+    for extension, fmt in FORMATS.items():
+        if path.lower().endswith(extension):
+            return fmt
+    raise SystemExit(f"Cannot tell the format of {path}; pass --format")
+
+# -------------------- Reading --------------------
+
+# Yield (record number, task dict) from a file, or (record number, error) for records
+# that cannot be parsed
+def iter_records(file, fmt):
+    if fmt == "json":
+        yield from enumerate(iter_json_array(file), 1)
+    elif fmt == "jsonl":
+        for number, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    yield number, json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield number, f"invalid JSON ({e.msg})"
+    elif fmt == "csv":
+        yield from enumerate(csv.DictReader(file), 1)
+    else:
+        yield from enumerate(iter_tasks_txt(file), 1)
+
+# Task for a record, or the reason it cannot be imported: the same checks the GUI's
+# edit dialog makes (check_task_fields in Stage_04). Records without an id take the
+# next one from fresh_ids.
+def validate(record, fresh_ids):
+    if not isinstance(record, dict):
+        return None, record if isinstance(record, str) else "not an object"
+    fields, error = check_task_fields(*(str(record.get(key) or "") for key in
+                                        ("name", "description", "priority", "due_date")))
+    if error is not None:
+        return None, error
+    return Task(**fields, task_id=record.get("id") or next(fresh_ids)), None
+
+def import_tasks(args):
+    fmt = file_format(args.file, args.format)
+    manager = open_store(args.store)
+    imported = skipped = 0
+    start = time.perf_counter()
+    try:
+        with open(args.file, "r", newline="" if fmt == "csv" else None, encoding="utf-8") as file:
+            batch, errors = [], []
+            records = iter_records(file, fmt)
+            while True:
+                fresh_ids = iter(new_task_ids(args.batch_size))
+                for number, record in records:
+                    task, error = validate(record, fresh_ids)
+                    if error is None:
+                        batch.append(task)
+                    else:
+                        errors.append((number, error))
+                    if len(batch) + len(errors) >= args.batch_size:
+                        break
+                else:
+                    records = None  # Input finished
+
+                for number, error in errors:
+                    print(f"{args.file}: record {number}: {error}", file=sys.stderr)
+                if errors and args.strict:
+                    raise SystemExit(f"Stopped at an invalid batch; {imported} tasks were imported before it")
+                if batch:
+                    manager.add_tasks(batch)  # One commit per batch
+                imported += len(batch)
+                skipped += len(errors)
+                batch, errors = [], []
+                if records is None:
+                    break
+    finally:
+        manager.close()
+    elapsed = time.perf_counter() - start
+    print(f"Imported {imported:,} tasks ({skipped:,} skipped) into {args.store} in {elapsed:.2f}s "
+          f"({imported / elapsed if elapsed else 0:,.0f} tasks/s)", file=sys.stderr)
+    return 0
+
+# -------------------- Writing --------------------
+
+def write_json(file, tasks):
+    file.write("[")
+    for i, task in enumerate(tasks):
+        file.write(",\n    " if i else "\n    ")
+        file.write(json.dumps(task.to_dict()))
+    file.write("\n]\n")
+
+def write_jsonl(file, tasks):
+    for task in tasks:
+        file.write(json.dumps(task.to_dict()) + "\n")
+
+def write_csv(file, tasks):
+    writer = csv.writer(file)
+    writer.writerow(CSV_FIELDS)
+    for task in tasks:
+        writer.writerow([task.id, task.name, task.description, task.priority, task.due_date])
+
+# Stage 02 tasks.txt layout (it has no ids)
+def write_txt(file, tasks):
+    for task in tasks:
+        file.write(f"Name: {task.name}\nDescription: {task.description}\n"
+                   f"Priority: {task.priority}\nDue Date: {task.due_date}\n-----\n")
+
+WRITERS = {"json": write_json, "jsonl": write_jsonl, "csv": write_csv, "txt": write_txt}
+
+def export_tasks(args):
+    fmt = file_format(args.file, args.format)
+    start = time.perf_counter()
+    manager = open_store(args.store)
+    try:
+        tasks = manager.task_map.values()
+        with open(args.file, "w", newline="" if fmt == "csv" else None, encoding="utf-8") as file:
+            WRITERS[fmt](file, tasks)
+        count = len(tasks)
+    finally:
+        manager.close()
+    elapsed = time.perf_counter() - start
+    print(f"Exported {count:,} tasks from {args.store} in {elapsed:.2f}s", file=sys.stderr)
+    return 0
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import and export tasks without the GUI.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("import", "add the tasks in FILE to the store"),
+                            ("export", "write every task in the store to FILE")):
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument("file")
+        command.add_argument("--store", default="tasks.json", help="tasks.json, a .db or .bin file or a .shards directory")
+        command.add_argument("--format", choices=sorted(WRITERS), help="defaults to the file extension")
+    commands.choices["import"].add_argument("--batch-size", type=int, default=IMPORT_BATCH_SIZE)
+    commands.choices["import"].add_argument("--strict", action="store_true",
+                                            help="stop at the first batch with an invalid record")
+    args = parser.parse_args(argv)
+    return import_tasks(args) if args.command == "import" else export_tasks(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
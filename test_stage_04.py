@@ -0,0 +1,814 @@
+# Stage 04 Tests : Storage, Journaling and Queries of the Task Manager
+#
+#   python -m pytest -q test_stage_04.py
+
+import json
+import os
+import random
+import threading
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+from types import SimpleNamespace
+
+import pytest
+
+import Stage_04
+from Stage_04 import (BackgroundWriter, BinaryStorage, CompiledQuery, JsonStorage, QueryError,
+                      ShardedStorage, SqliteStorage, Task, TaskManager, TaskManagerGUI, TextIndex,
+                      check_task_fields, date_filter_args, due_range_ordinals)
+
+# -------------------- Helpers --------------------
+
+def task_data(name, priority="Medium", due_date="2025-06-01", description=""):
+    return {"name": name, "description": description, "priority": priority, "due_date": due_date}
+
+# Manager over tasks.json in a temporary directory, with the journal kept until close
+def open_json(path, **kwargs):
+    return TaskManager(storage=JsonStorage(str(path), **kwargs))
+
+def names(manager):
+    return sorted(task.name for task in manager.tasks)
+
+# -------------------- Journal Replay --------------------
+
+# Changes written to the journal and never folded into the snapshot (no close, as
+# after a crash) come back on the next load, over either snapshot format
+@pytest.mark.parametrize("storage, file_name", [(JsonStorage, "tasks.json"), (BinaryStorage, "tasks.bin")])
+def test_journal_replays_after_crash(tmp_path, storage, file_name):
+    path = str(tmp_path / file_name)
+    manager = TaskManager(storage=storage(path))
+    first = manager.add_task(task_data("first"))
+    manager.add_task(task_data("second"))
+    manager.update_task(first.id, {"name": "renamed"})
+    manager.delete_task(manager.add_task(task_data("gone")).id)
+    assert os.path.getsize(path + ".journal") > 0
+
+    assert names(TaskManager(storage=storage(path))) == ["renamed", "second"]
+
+# A torn last record is dropped, and appends after it survive the following load
+def test_torn_journal_tail_is_truncated(tmp_path):
+    path = tmp_path / "tasks.json"
+    open_json(path).add_task(task_data("before"))
+    journal = str(path) + ".journal"
+    with open(journal, "ab") as file:
+        file.write(b'{"op":"add","task":{"id":"torn","na')
+
+    second = open_json(path)
+    assert names(second) == ["before"]
+    second.add_task(task_data("after"))
+
+    assert names(open_json(path)) == ["after", "before"]
+    with open(journal, "rb") as file:
+        assert b"torn" not in file.read()
+
+# A damaged record with whole records after it is not a torn tail: the load fails and
+# neither the journal nor tasks.json is touched, so the later records are not lost
+def test_damaged_journal_record_in_the_middle_is_kept(tmp_path):
+    path = tmp_path / "tasks.json"
+    manager = open_json(path)
+    manager.add_task(task_data("saved"))
+    manager.close()
+    journal = str(path) + ".journal"
+    records = [{"op": "add", "task": dict(task_data(f"t{i}"), id=f"t{i}")} for i in (1, 2)]
+    with open(journal, "wb") as file:
+        file.write(b'{"op":"add","task":{"id"\n' + b"".join(json.dumps(r).encode() + b"\n" for r in records))
+    before = (path.read_bytes(), open(journal, "rb").read())
+
+    with pytest.raises(ValueError, match="record 1"):
+        open_json(path)
+    assert (path.read_bytes(), open(journal, "rb").read()) == before
+
+# A last record that lost only its newline is kept, and the next record starts on a new line
+def test_journal_record_without_newline_is_kept(tmp_path):
+    path = tmp_path / "tasks.json"
+    open_json(path).add_task(task_data("before"))
+    journal = str(path) + ".journal"
+    with open(journal, "rb") as file:
+        data = file.read()
+    with open(journal, "wb") as file:
+        file.write(data.rstrip(b"\n"))
+
+    second = open_json(path)
+    assert names(second) == ["before"]
+    second.add_task(task_data("after"))
+    assert names(open_json(path)) == ["after", "before"]
+
+# Closing folds the journal into tasks.json and removes it
+def test_close_compacts_journal(tmp_path):
+    path = tmp_path / "tasks.json"
+    manager = open_json(path)
+    manager.add_task(task_data("kept"))
+    manager.close()
+    assert not os.path.exists(str(path) + ".journal")
+    assert names(open_json(path)) == ["kept"]
+
+# Replaying a journal over a snapshot that already holds its records changes nothing
+def test_replay_is_idempotent(tmp_path):
+    path = tmp_path / "tasks.json"
+    manager = open_json(path)
+    task = manager.add_task(task_data("once"))
+    with open(str(path) + ".journal", "rb") as file:
+        journal = file.read()
+    manager.close()
+    with open(str(path) + ".journal", "wb") as file:
+        file.write(journal)
+
+    reloaded = open_json(path)
+    assert [t.id for t in reloaded.tasks] == [task.id]
+
+# A load that fails part way leaves tasks.json and its journal alone on close
+def test_failed_load_does_not_overwrite_snapshot(tmp_path):
+    path = tmp_path / "tasks.json"
+    records = [dict(task_data(f"task {i}"), id=f"id{i}") for i in range(10)]
+    del records[4]["name"]  # Task.from_dict fails on the fifth record
+    path.write_text(json.dumps(records))
+    journal = str(path) + ".journal"
+    with open(journal, "w") as file:
+        file.write(json.dumps({"op": "delete", "id": "id0"}) + "\n")
+    before = path.read_bytes()
+
+    manager = TaskManager(storage=JsonStorage(str(path), cache=False), load=False)
+    with pytest.raises(KeyError):
+        for _ in manager.iter_load_tasks(batch_size=3):
+            pass
+    with pytest.raises(RuntimeError):
+        manager.storage.save()
+    manager.close()
+
+    assert path.read_bytes() == before
+    assert os.path.exists(journal)
+
+# A damaged tasks.json (here an old file without ids, cut short) is reported and left
+# as it is, rather than saved back with the tasks that could be read
+def test_damaged_snapshot_raises_and_is_not_saved(tmp_path):
+    path = tmp_path / "tasks.json"
+    text = json.dumps([task_data(f"task {i}") for i in range(10)])
+    path.write_text(text[:len(text) // 2])
+    before = path.read_bytes()
+
+    with pytest.raises(ValueError, match="damaged"):
+        open_json(path)
+    assert path.read_bytes() == before
+
+# A whole file written before tasks had ids is saved once with new ids
+def test_snapshot_without_ids_gets_ids_saved(tmp_path):
+    path = tmp_path / "tasks.json"
+    path.write_text(json.dumps([task_data("old one"), task_data("old two")]))
+
+    ids = [task.id for task in open_json(path).tasks]
+    assert [record["id"] for record in json.loads(path.read_text())] == ids
+
+# An empty tasks.json is a new list, not a damaged one
+def test_empty_snapshot_is_no_tasks(tmp_path):
+    path = tmp_path / "tasks.json"
+    path.write_text("")
+    assert open_json(path).tasks == []
+
+# -------------------- Filter Expressions --------------------
+
+def matching(manager, expression):
+    return sorted(task.name for task in manager.filter_tasks(expression=expression))
+
+# A priority no task has matches nothing, and a cached query sees tasks that take that
+# priority later
+def test_unknown_priority_in_query_matches_nothing(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    manager.add_task(task_data("a", "High"))
+    manager.add_task(task_data("b", "Low"))
+    for i in range(300):
+        assert matching(manager, f"priority = Never{i}") == []
+
+    assert matching(manager, "priority != Never0") == ["a", "b"]
+    assert matching(manager, "priority in (High, Never0)") == ["a"]
+    manager.add_task(task_data("c", "Never0"))
+    assert matching(manager, "priority = Never0") == ["c"]
+    assert matching(manager, "priority != Never0") == ["a", "b"]
+
+# Ranges rank other priorities after Low, whether or not any task has them
+def test_priority_range_ranks_other_names_last(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    manager.add_task(task_data("high", "High"))
+    manager.add_task(task_data("low", "Low"))
+    manager.add_task(task_data("odd", "Someday"))
+    assert matching(manager, "priority > Low") == ["odd"]
+    assert matching(manager, "priority < Whenever") == ["high", "low"]
+    assert matching(manager, "priority <= medium") == ["high"]
+
+# and binds tighter than or; not applies to the condition after it
+def test_query_precedence(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    manager.add_task(task_data("alpha", "High", "2025-01-01"))
+    manager.add_task(task_data("beta", "Low", "2025-01-01"))
+    manager.add_task(task_data("gamma", "Low", "2025-02-01"))
+    assert matching(manager, "name = alpha or priority = Low and due = 2025-02-01") == ["alpha", "gamma"]
+    assert matching(manager, "(name = alpha or priority = Low) and due = 2025-01-01") == ["alpha", "beta"]
+    assert matching(manager, "not priority = Low and due < 2025-02-01") == ["alpha"]
+
+# Unreadable due dates sort last but are neither after nor before a date
+def test_unreadable_due_date_is_not_after_anything(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    manager.add_task(task_data("dated", due_date="2025-03-01"))
+    manager.add_task(task_data("undated", due_date="soon"))
+    assert matching(manager, "due > 2025-01-01") == ["dated"]
+    assert matching(manager, "due >= 2025-03-01") == ["dated"]
+
+@pytest.mark.parametrize("text, message", [
+    ("", "Empty query"),
+    ("colour = red", "Unknown field"),
+    ("name", "end of the query"),
+    ("priority ~ High", "~ only applies"),
+    ("due = 2025-13-01", "Invalid date"),
+    ("name = a name = b", "Expected and/or"),
+    ("(name = a", r"Expected '\)'"),
+])
+def test_query_errors(text, message):
+    with pytest.raises(QueryError, match=message):
+        CompiledQuery(text)
+
+# -------------------- Paged Queries --------------------
+
+# Every page of a query in order, then back again through the previous-page cursors
+def all_pages(manager, filters, sort, reverse, limit):
+    pages = [manager.query_tasks(filters, sort, reverse, limit)]
+    while pages[-1].next_cursor:
+        pages.append(manager.query_tasks(filters, sort, reverse, limit, pages[-1].next_cursor))
+    back = [pages[-1]]
+    while back[-1].prev_cursor:
+        back.append(manager.query_tasks(filters, sort, reverse, limit, back[-1].prev_cursor))
+    forward = [[task.id for task in page.tasks] for page in pages]
+    assert [[task.id for task in page.tasks] for page in reversed(back)] == forward
+    return [task_id for ids in forward for task_id in ids]
+
+# Cursors from a sort by several columns (whose entries nest a tuple in a tuple) page
+# through the whole result both ways, from the sorted view and from a few matches
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+@pytest.mark.parametrize("reverse", [False, True])
+@pytest.mark.parametrize("filters", [{}, {"name": "pick"}])
+def test_paging_by_several_columns(tmp_path, engine, reverse, filters):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    manager = TaskManager(storage=JsonStorage(str(tmp_path / "tasks.json")), engine=engine)
+    for i in range(80):
+        name = f"pick {i}" if i % 10 == 0 else f"task {i}"
+        manager.add_task(task_data(name, ["High", "Medium", "Low"][i % 3], f"2025-06-0{1 + i % 4}"))
+
+    order = {task.id: i for i, task in enumerate(manager.tasks)}
+    matching = [task for task in manager.tasks if task.name.startswith(filters.get("name", ""))]
+    matching.sort(key=lambda t: (t.priority_rank, t.due_ordinal, order[t.id]), reverse=reverse)
+    assert all_pages(manager, filters, ("priority", "due_date"), reverse, 3) == [t.id for t in matching]
+
+# Unsorted pages follow insertion order through deletes, and a cursor taken before the
+# deleted positions are squeezed out still continues from the same task
+@pytest.mark.parametrize("reverse", [False, True])
+def test_unsorted_paging_across_deletes(tmp_path, reverse):
+    manager = open_json(tmp_path / "tasks.json")
+    tasks = [Task(f"task {i}", "", "Low", "2025-06-01") for i in range(3000)]
+    manager.add_tasks(tasks)
+    page = manager.query_tasks({}, None, reverse, 50)
+    for _ in range(20):
+        page = manager.query_tasks({}, None, reverse, 50, page.next_cursor)
+    last = page.tasks[-1]
+    for task in tasks[::3] + tasks[1::3][:700]:
+        if task is not last:
+            manager.delete_task(task.id)
+    assert manager._task_index()._deleted < 1024  # The lists were compacted
+
+    remaining = [task.id for task in tasks if task.id in manager.task_map]
+    order = remaining[::-1] if reverse else remaining
+    assert all_pages(manager, {}, None, reverse, 50) == order
+    after = order[order.index(last.id) + 1:][:50]
+    assert [task.id for task in manager.query_tasks({}, None, reverse, 50, page.next_cursor).tasks] == after
+
+# A cursor only continues the query it came from
+def test_cursor_checks_its_query(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    for i in range(5):
+        manager.add_task(task_data(f"task {i}"))
+    page = manager.query_tasks({}, "name", limit=2)
+    with pytest.raises(ValueError, match="different query"):
+        manager.query_tasks({}, "due_date", limit=2, cursor=page.next_cursor)
+    with pytest.raises(ValueError, match="Invalid page cursor"):
+        manager.query_tasks({}, "name", limit=2, cursor="not a cursor")
+
+# The GUI's query worker sorts before fetching the page, and a cursor left behind by
+# that sort starts over from the first page instead of failing
+def test_worker_query_restarts_stale_cursor(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    for i in range(5):
+        manager.add_task(task_data(f"task {i}", due_date=f"2025-06-0{5 - i}"))
+    manager.sort_tasks("name", False)
+    cursor = manager.query_tasks({}, "name", limit=2).next_cursor
+    gui = SimpleNamespace(manager=manager)
+
+    page, restarted = TaskManagerGUI.run_query(gui, {}, ("name", False), (2, cursor))
+    assert not restarted and [task.name for task in page.tasks] == ["task 2", "task 3"]
+    page, restarted = TaskManagerGUI.run_query(gui, {}, ("due_date", False), (2, cursor))
+    assert restarted and [task.name for task in page.tasks] == ["task 4", "task 3"]
+
+# -------------------- Query Backends --------------------
+
+# The same tasks in tasks.json and in another backend, reopened so its tasks come from
+# its file, then edited (in a binary file, some are then held in memory on top of it)
+def json_and(tmp_path, storage, file_name):
+    managers = [open_json(tmp_path / "tasks.json"), TaskManager(storage=storage(str(tmp_path / file_name)))]
+    tasks = [Task(f"{name} {i}", f"note {i % 7}", ["High", "Medium", "Low", "Urgent"][i % 4],
+                  "someday" if i % 9 == 0 else f"2025-06-{1 + i % 20:02d}")
+             for i, name in enumerate(["Report", "Émile report", "straße", "REPORT draft", "call"] * 12)]
+    for manager in managers:
+        manager.add_tasks([Task(t.name, t.description, t.priority, t.due_date, t.id) for t in tasks])
+    managers[1].close()
+    managers[1] = TaskManager(storage=storage(str(tmp_path / file_name)))
+    for manager in managers:
+        manager.update_task(tasks[1].id, {"priority": "Low", "name": "Renamed"})
+        manager.update_task(tasks[8].id, {"due_date": "2025-06-05"})
+        manager.delete_task(tasks[3].id)
+        manager.add_tasks([Task("late report", "", "Urgent", "2025-06-05", f"added{i}") for i in range(3)])
+    return managers
+
+# Filters and sorts answered by SQLite, or from the binary file's columns with edits held
+# on top, page through the same tasks as over tasks.json (names with non-ASCII letters
+# and custom priorities included)
+@pytest.mark.parametrize("storage, file_name", [(BinaryStorage, "tasks.bin"), (SqliteStorage, "tasks.db")])
+@pytest.mark.parametrize("filters", [{}, {"name": "report"}, {"name": "é"}, {"name": "STRASSE"}, {"priority": "Urgent"},
+                                     {"priority": "Low", "name": "re"}, {"date": "2025-06-05"}, {"date": "someday"},
+                                     {"due_range": ("2025-06-03", "2025-06-08")}])
+@pytest.mark.parametrize("sort, reverse", [(None, False), (None, True), ("name", False), ("priority", True),
+                                           (("priority", "due_date"), False), ("description", False)])
+def test_backend_queries_match_json(tmp_path, storage, file_name, filters, sort, reverse):
+    json_manager, manager = json_and(tmp_path, storage, file_name)
+    expected = all_pages(json_manager, filters, sort, reverse, 4)
+    assert all_pages(manager, filters, sort, reverse, 4) == expected
+    assert manager.storage.count_ids(**filters) == len(expected)
+    if sort is not None and not filters:
+        assert [task.id for task in manager.sort_tasks(sort, reverse)] == expected
+
+# A filter on one priority that is not High, Medium or Low matches just that priority,
+# in SQLite too (where they all share one sort rank)
+def test_sqlite_filters_each_custom_priority(tmp_path):
+    path = str(tmp_path / "tasks.db")
+    manager = TaskManager(storage=SqliteStorage(path))
+    for name, priority in [("a", "Urgent"), ("b", "Someday"), ("c", "Urgent"), ("d", "Low")]:
+        manager.add_task(task_data(name, priority))
+    manager.close()
+
+    manager = TaskManager(storage=SqliteStorage(path))
+    assert [task.name for task in manager.filter_tasks(priority="Urgent")] == ["a", "c"]
+    assert [task.name for task in manager.filter_tasks(priority="Someday")] == ["b"]
+    assert manager.query_tasks({"priority": "Urgent"}, "priority").total == 2
+    assert [task.name for task in manager.sort_tasks("priority")] == ["d", "a", "b", "c"]
+
+# -------------------- Binary Task File --------------------
+
+# Opening a binary file reads its ids and no rows; a page turns just its own rows into tasks
+def test_binary_file_is_read_lazily(tmp_path):
+    path = str(tmp_path / "tasks.bin")
+    manager = TaskManager(storage=BinaryStorage(path))
+    manager.add_tasks([Task(f"task {i}", "", "Low", "2025-06-01") for i in range(100)])
+    manager.close()
+
+    manager = TaskManager(storage=BinaryStorage(path))
+    assert len(manager.task_map) == 100 and manager.task_map.looked_up == {}
+    page = manager.query_tasks({"name": "task 1"}, "name", limit=5)
+    assert [task.name for task in page.tasks] == ["task 1", "task 10", "task 11", "task 12", "task 13"]
+    assert len(manager.task_map.looked_up) == 5
+
+# A binary file lists just the priorities of its own tasks, whatever other stores in
+# the process have used
+def test_binary_file_lists_its_own_priorities(tmp_path):
+    other = open_json(tmp_path / "tasks.json")
+    other.add_tasks([Task("other", "", f"Priority {i}", "2025-06-01") for i in range(300)])
+    path = str(tmp_path / "tasks.bin")
+    manager = TaskManager(storage=BinaryStorage(path))
+    manager.add_tasks([Task("a", "", "Urgent", "2025-06-01"), Task("b", "", "High", "2025-06-01")])
+    manager.close()
+
+    manager = TaskManager(storage=BinaryStorage(path))
+    assert manager.task_map.task_file.priorities == ["Urgent", "High"]
+    assert [task.name for task in manager.sort_tasks("priority")] == ["b", "a"]
+    assert [task.name for task in manager.filter_tasks(priority="Urgent")] == ["a"]
+
+# Edits made while a snapshot of the binary file is being written are kept on top of the
+# new file, and saved by the next write
+def test_binary_snapshot_keeps_edits_made_meanwhile(tmp_path, monkeypatch):
+    path = str(tmp_path / "tasks.bin")
+    manager = TaskManager(storage=BinaryStorage(path), background=True)
+    kept, deleted = manager.add_task(task_data("kept", "Low")), manager.add_task(task_data("deleted", "Low"))
+    manager.flush()
+
+    write_snapshot = BinaryStorage.write_snapshot
+    def edit_then_write(storage, path, tasks):
+        manager.update_task(kept.id, {"priority": "High"})
+        manager.delete_task(deleted.id)
+        manager.add_task(task_data("added", "Low"))
+        write_snapshot(storage, path, tasks)
+    monkeypatch.setattr(BinaryStorage, "write_snapshot", edit_then_write)
+    manager.storage.request_save()
+    manager.flush()
+    monkeypatch.undo()
+
+    def check(manager):
+        assert names(manager) == ["added", "kept"]
+        assert [task.name for task in manager.filter_tasks(priority="High")] == ["kept"]
+        assert [task.name for task in manager.filter_tasks(priority="Low")] == ["added"]
+    check(manager)
+    manager.close()
+    check(TaskManager(storage=BinaryStorage(path)))
+
+# -------------------- Sharded Storage --------------------
+
+def open_shards(path, **kwargs):
+    return TaskManager(storage=ShardedStorage(str(path), **kwargs))
+
+def shard_files(path):
+    with open(os.path.join(path, "manifest.json")) as file:
+        return {key: shard["file"] for key, shard in json.load(file)["shards"].items()}
+
+# A save rewrites just the months whose tasks changed; the rest keep their files
+def test_shards_rewrite_only_changed_months(tmp_path):
+    path = tmp_path / "tasks.shards"
+    manager = open_shards(path)
+    for month in [4, 5, 6]:
+        manager.add_task(task_data(f"task {month}", due_date=f"2025-{month:02d}-10"))
+    manager.add_task(task_data("someday", due_date="someday"))
+    manager.close()
+    before = shard_files(path)
+    assert set(before) == {"2025-04", "2025-05", "2025-06", "undated"}
+
+    manager = open_shards(path)
+    june = next(task for task in manager.tasks if task.name == "task 6")
+    manager.update_task(june.id, {"name": "renamed"})
+    manager.close()
+    after = shard_files(path)
+    assert {key for key in after if after[key] != before[key]} == {"2025-06"}
+    assert sorted(os.listdir(path)) == sorted(list(after.values()) + ["manifest.json"])
+    assert names(open_shards(path)) == ["renamed", "someday", "task 4", "task 5"]
+
+# Loading a window of months reads just those shards; edits made then (a task moved out
+# of the window, one moved in, one deleted) are merged into the months left on disk
+def test_shard_window_merges_into_unloaded_months(tmp_path):
+    path = tmp_path / "tasks.shards"
+    manager = open_shards(path)
+    for month in [4, 5, 6, 7]:
+        for i in range(3):
+            manager.add_task(task_data(f"{month}-{i}", due_date=f"2025-{month:02d}-{10 + i}"))
+    manager.add_task(task_data("someday", due_date="someday"))
+    manager.close()
+
+    manager = open_shards(path, due_range=("2025-05-20", "2025-06-05"))
+    assert names(manager) == ["5-0", "5-1", "5-2", "6-0", "6-1", "6-2"]
+    moved_out, moved_within, deleted = (next(t for t in manager.tasks if t.name == name) for name in ["5-0", "6-1", "5-2"])
+    manager.update_task(moved_out.id, {"due_date": "2025-07-01"})
+    manager.update_task(moved_within.id, {"due_date": "2025-05-01"})
+    manager.delete_task(deleted.id)
+    manager.add_task(task_data("new in april", due_date="2025-04-30"))
+    manager.close()
+
+    manager = open_shards(path)
+    assert names(manager) == ["4-0", "4-1", "4-2", "5-0", "5-1", "6-0", "6-1", "6-2",
+                              "7-0", "7-1", "7-2", "new in april", "someday"]
+    assert sorted(t.name for t in manager.filter_tasks(due_range=("2025-07-01", "2025-07-31"))) == [
+        "5-0", "7-0", "7-1", "7-2"]
+    assert sorted(t.name for t in manager.filter_tasks(due_range=("2025-05-01", "2025-05-31"))) == ["5-1", "6-1"]
+
+# A process pool reads the same tasks, in the same order, as a plain load
+def test_shards_load_in_parallel(tmp_path):
+    path = tmp_path / "tasks.shards"
+    manager = open_shards(path)
+    manager.add_tasks([Task(f"task {i}", "", "Low", f"2025-{1 + i % 12:02d}-01") for i in range(60)])
+    manager.close()
+    expected = [task.id for task in open_shards(path).tasks]
+    assert [task.id for task in open_shards(path, workers=2).tasks] == expected
+
+# -------------------- Background Writer --------------------
+
+# A storage that counts its flushes, failing the first few when asked
+class CountingStorage:
+    def __init__(self, failures=0):
+        self.flushes = 0
+        self.failures = failures
+
+    def flush(self, lock):
+        with lock:
+            if self.failures:
+                self.failures -= 1
+                raise OSError("disk full")
+            self.flushes += 1
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+# A burst of changes is written once, after the interval; close writes what is left
+def test_writer_coalesces_a_burst():
+    storage = CountingStorage()
+    writer = BackgroundWriter(storage, threading.Lock(), interval=0.2)
+    for _ in range(100):
+        writer.mark_dirty()
+    assert storage.flushes == 0
+    assert wait_for(lambda: storage.flushes == 1)
+    time.sleep(0.3)
+    assert storage.flushes == 1
+    writer.close()
+    assert storage.flushes == 2 and writer.errors.empty()
+
+# A failed write is reported once, and retried until it goes through
+def test_writer_reports_and_retries_failures(monkeypatch):
+    monkeypatch.setattr(Stage_04, "WRITE_RETRY", 0.05)
+    storage = CountingStorage(failures=3)
+    writer = BackgroundWriter(storage, threading.Lock(), interval=0.01)
+    writer.mark_dirty()
+    assert wait_for(lambda: storage.flushes == 1)
+    assert isinstance(writer.errors.get_nowait(), OSError) and writer.errors.empty()
+    writer.close()
+
+# A manager's burst of edits is saved by the writer thread in one or two writes (the
+# last at close) and reads back the same, with no temporary file left over
+def test_manager_writes_in_the_background(tmp_path):
+    path = tmp_path / "tasks.json"
+    manager = TaskManager(storage=JsonStorage(str(path)), background=True)
+    flushes, flush = [], manager.storage.flush
+    manager.storage.flush = lambda lock: (flushes.append(lock), flush(lock))
+    tasks = [manager.add_task(task_data(f"task {i}")) for i in range(50)]
+    for task in tasks[:10]:
+        manager.update_task(task.id, {"priority": "High"})
+    for task in tasks[10:20]:
+        manager.delete_task(task.id)
+    manager.close()
+    assert 1 <= len(flushes) <= 2
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+    reopened = open_json(path)
+    assert len(reopened.tasks) == 40 and len(reopened.filter_tasks(priority="High")) == 10
+
+# -------------------- Full-Text Search --------------------
+
+def search(manager, text, limit=None, **filters):
+    return [task.name for task in manager.filter_tasks(text=text, text_limit=limit, **filters)]
+
+# Loading leaves the indexes to build_deferred_indexes, and edits keep them up to date
+# after that, so no search has to build them
+def test_text_index_follows_load_and_edits(tmp_path):
+    path = tmp_path / "tasks.json"
+    first = open_json(path)
+    kept = first.add_task(task_data("water plants", description="garden"))
+    first.add_task(task_data("mow lawn", description="garden shed"))
+    first.close()
+
+    manager = open_json(path)
+    assert manager.index is None and manager.text_index is None
+    manager.build_deferred_indexes()
+    assert len(manager.text_index.doc_terms) == 2
+    assert sorted(search(manager, "garden")) == ["mow lawn", "water plants"]
+    manager.update_task(kept.id, {"description": "balcony"})
+    manager.add_tasks([Task("paint shed", "garden", "Low", "2025-06-01")])
+    assert sorted(search(manager, "garden")) == ["mow lawn", "paint shed"]
+    assert search(manager, "balc*") == ["water plants"]
+    manager.delete_task(kept.id)
+    assert search(manager, "balcony") == []
+
+# Tasks edited while build_deferred_indexes works from its copy of the list are indexed
+# again before the indexes are swapped in
+def test_deferred_indexes_take_edits_made_meanwhile(tmp_path, monkeypatch):
+    path = tmp_path / "tasks.json"
+    first = open_json(path)
+    changed = first.add_task(task_data("water plants", "Low", description="garden"))
+    deleted = first.add_task(task_data("mow lawn", "Low", description="garden shed"))
+    first.close()
+
+    manager = open_json(path)
+    rebuild = TextIndex.rebuild
+    def edit_then_rebuild(text_index, tasks):
+        manager.update_task(changed.id, {"priority": "High", "description": "balcony"})
+        manager.delete_task(deleted.id)
+        manager.add_task(task_data("paint shed", "Low", description="garden"))
+        rebuild(text_index, tasks)
+    monkeypatch.setattr(TextIndex, "rebuild", edit_then_rebuild)
+    manager.build_deferred_indexes()
+    monkeypatch.undo()
+
+    assert manager.building is None and manager.text_index is not None
+    assert search(manager, "garden") == ["paint shed"]
+    assert search(manager, "balcony") == ["water plants"]
+    assert [task.name for task in manager.filter_tasks(priority="Low")] == ["paint shed"]
+    assert [task.name for task in manager.filter_tasks(priority="High")] == ["water plants"]
+
+# A limited search keeps the best matches of the full ranking, for single words, words
+# ANDed, alternatives, prefixes and with another filter narrowing it (counts differ per
+# task, so no two scores tie)
+def test_search_limit_keeps_best_matches(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    for i in range(60):
+        words = ["report"] * (i + 1) + (["budget"] if i % 3 == 0 else []) + ["draft"] * (i // 4 + 1 if i % 4 == 0 else 0)
+        manager.add_task(task_data(f"task {i}", "High" if i % 2 else "Low", description=" ".join(words)))
+
+    for text in ["report", "report budget", "report or draft", "rep* budget"]:
+        for filters in [{}, {"priority": "High"}]:
+            ranked = search(manager, text, **filters)
+            assert search(manager, text, 7, **filters) == ranked[:7]
+    assert search(manager, "report", 3) == ["task 59", "task 58", "task 57"]
+
+# -------------------- Benchmark --------------------
+
+# The benchmark runs end to end on every backend at a small size, so changes to the GUI
+# or the managers it drives cannot break it unnoticed
+@pytest.mark.parametrize("backend", ["json", "bin", "db", "shards"])
+def test_benchmark_runs(tmp_path, backend):
+    benchmark = pytest.importorskip("benchmark")
+    output = tmp_path / "report.json"
+    benchmark.main(["--sizes", "300", "--backend", backend, "--edits", "10", "--queries", "2",
+                    "--output", str(output)])
+    report = json.loads(output.read_text())
+    assert set(report["sizes"]["300"]) >= {"load", "add", "update", "delete"}
+
+# -------------------- Due Dates --------------------
+
+# A date without zero padding, which the edit dialog accepts, keeps its text but sorts,
+# filters and counts as the day it names
+def test_unpadded_due_date_is_a_real_date(tmp_path):
+    manager = open_json(tmp_path / "tasks.json")
+    manager.add_task(task_data("later", due_date="2025-07-01"))
+    loose = manager.add_task(task_data("loose", due_date="2025-6-1"))
+    manager.add_task(task_data("earlier", due_date="2025-05-01"))
+
+    assert loose.due_date == "2025-6-1"
+    assert [task.name for task in manager.sort_tasks("due_date")] == ["earlier", "loose", "later"]
+    assert matching(manager, "due < 2025-06-15") == ["earlier", "loose"]
+    summary = manager.task_summary(today=date(2025, 6, 10))
+    assert summary["overdue"] == 2 and summary["undated"] == 0
+
+# Due-date windows, with open or unreadable ends and after edits, match the tasks found
+# by checking every due date
+@pytest.mark.parametrize("engine", ["python", "numpy"])
+def test_due_range_matches_a_scan(tmp_path, engine):
+    if engine == "numpy":
+        pytest.importorskip("numpy")
+    rng = random.Random(13)
+    manager = TaskManager(storage=JsonStorage(str(tmp_path / "tasks.json")), engine=engine)
+    start = date(2025, 6, 1)
+
+    def random_due():
+        if rng.random() < 0.05:
+            return "someday"
+        day = start + timedelta(days=rng.randint(0, 90))
+        return f"{day.year}-{day.month}-{day.day}" if rng.random() < 0.1 else day.isoformat()
+
+    for i in range(300):
+        manager.add_task(task_data(f"task {i}", due_date=random_due()))
+    manager.filter_tasks(due_range=(start, None))  # The index is built here, then kept up by the edits
+    for task in rng.sample(manager.tasks, 60):
+        manager.update_task(task.id, {"due_date": random_due()})
+    for task in rng.sample(manager.tasks, 30):
+        manager.delete_task(task.id)
+
+    def scan(first, last):
+        return sorted(task.id for task in manager.tasks if task.due_date != "someday" and
+                      first <= datetime.strptime(task.due_date, "%Y-%m-%d").date() <= last)
+
+    for _ in range(100):
+        first, last = sorted(start + timedelta(days=rng.randint(-10, 100)) for _ in range(2))
+        ends = [(first, last), (first.isoformat(), last.isoformat()), (None, last), (first, ""), (None, None)]
+        for due_range in ends:
+            expected = scan(first if due_range[0] else date.min, last if due_range[1] else date.max)
+            assert sorted(task.id for task in manager.filter_tasks(due_range=due_range)) == expected
+    assert manager.filter_tasks(due_range=("soon", None)) == []
+
+# The Date modes in the filter bar turn into the windows they name
+def test_date_filter_modes():
+    today = date(2025, 6, 10)
+    assert date_filter_args("On", " 2025-06-01 ", today) == {"date": "2025-06-01"}
+    assert date_filter_args("Before", "2025-06-01", today) == {"due_range": (None, date(2025, 5, 31))}
+    assert date_filter_args("After", "2025-6-1", today) == {"due_range": (date(2025, 6, 2), None)}
+    assert date_filter_args("Between", "2025-06-01 .. 2025-06-30", today) == {"due_range": ("2025-06-01", "2025-06-30")}
+    assert date_filter_args("Before", "", today) == {} and date_filter_args("Between", "", today) == {}
+    assert date_filter_args("Overdue", "", today) == {"due_range": (None, date(2025, 6, 9))}
+    assert date_filter_args("Today", "ignored", today) == {"due_range": (today, today)}
+    assert date_filter_args("Next 7 days", "", today) == {"due_range": (today, date(2025, 6, 17))}
+    assert due_range_ordinals(date_filter_args("After", "soon", today)["due_range"]) == (1, 0)
+
+# -------------------- Import and Export --------------------
+
+# Everything the GUI can store survives export and import again in every file format:
+# custom priorities, and dates saved without zero padding by older versions
+@pytest.mark.parametrize("extension", [".json", ".jsonl", ".csv", ".txt"])
+def test_export_import_round_trip(tmp_path, extension):
+    task_cli = pytest.importorskip("task_cli")
+    store = tmp_path / "tasks.json"
+    manager = open_json(store)
+    manager.add_task(task_data("urgent one", "Urgent", "2025-06-01", "needs, commas"))
+    manager.add_task(task_data("loose date", "Low", "2025-6-1"))
+    manager.add_task(task_data("plain", "High", "2025-12-31"))
+    manager.close()
+
+    exported = tmp_path / f"export{extension}"
+    copy = tmp_path / "copy.json"
+    assert task_cli.main(["export", str(exported), "--store", str(store)]) == 0
+    assert task_cli.main(["import", str(exported), "--store", str(copy), "--strict"]) == 0
+
+    def rows(path):
+        return sorted((t.name, t.description, t.priority, t.due_ordinal) for t in open_json(path).tasks)
+    assert rows(copy) == rows(store)
+
+# The dialog and the import command share their checks
+def test_check_task_fields():
+    fields, error = check_task_fields(" name ", "text", " high ", "2025-6-1")
+    assert error is None
+    assert fields == {"name": "name", "description": "text", "priority": "High", "due_date": "2025-06-01"}
+    assert check_task_fields("x", "", "", "2025-01-02")[0]["priority"] == "Medium"
+    assert check_task_fields("x", "", "Someday", "2025-01-02")[0]["priority"] == "Someday"
+    assert check_task_fields("  ", "", "Low", "2025-01-02")[1] == "Task name is required"
+    assert check_task_fields("x", "", "Low", "2025-02-30")[1].startswith("Invalid due date")
+    assert check_task_fields("x", "", "Low", "soon")[1].startswith("Invalid due date")
+
+# -------------------- Summary Counts --------------------
+
+# The summary worked out from scratch, by scanning every task
+def summary_by_scan(tasks, today, weeks):
+    by_priority = Counter(task.priority for task in tasks)
+    dated = [date.fromisoformat(task.due_date) for task in tasks if task.due_date != "someday"]
+    monday = today - timedelta(days=today.weekday())
+    return {
+        "total": len(tasks),
+        "by_priority": {name: by_priority[name] for name in ["High", "Medium", "Low", "Urgent"]
+                        if name != "Urgent" or by_priority[name]},
+        "overdue": sum(due < today for due in dated),
+        "due_today": sum(due == today for due in dated),
+        "undated": len(tasks) - len(dated),
+        "weeks": [((monday + timedelta(weeks=week)).isoformat(),
+                   sum(0 <= (due - monday).days - 7 * week < 7 for due in dated)) for week in range(weeks)],
+    }
+
+# The counts kept up by each add, update and delete, and by today moving either way,
+# always equal a full scan
+def test_summary_matches_a_scan(tmp_path):
+    rng = random.Random(24)
+    manager = open_json(tmp_path / "tasks.json")
+    today = date(2025, 6, 1)
+
+    def random_fields():
+        due = "someday" if rng.random() < 0.05 else (today + timedelta(days=rng.randint(-40, 70))).isoformat()
+        return task_data(f"task {rng.randrange(1000)}", rng.choice(["High", "Medium", "Low", "Urgent"]), due)
+
+    for _ in range(200):
+        manager.add_task(random_fields())
+    for step in range(1500):
+        ids = [task.id for task in manager.tasks]
+        action = rng.random()
+        if action < 0.35:
+            manager.add_task(random_fields())
+        elif action < 0.65 and ids:
+            manager.update_task(rng.choice(ids), random_fields())
+        elif action < 0.85 and ids:
+            manager.delete_task(rng.choice(ids))
+        else:
+            today += timedelta(days=rng.randint(-10, 10))
+        if step % 50 == 0:
+            weeks = rng.randint(1, 12)
+            assert manager.task_summary(today, weeks) == summary_by_scan(manager.tasks, today, weeks)
+    assert manager.task_summary(today) == summary_by_scan(manager.tasks, today, 8)
+
+# -------------------- Reminders --------------------
+
+# Reminders through adds, edits, deletes and days passing match a plain dict of the
+# tasks still to be reminded: each comes once, on its day, earliest first
+def test_reminders_match_a_model(tmp_path):
+    rng = random.Random(25)
+    manager = open_json(tmp_path / "tasks.json")
+    today = date(2025, 6, 1)
+    manager.start_reminders(today)
+    model = {}  # id -> due date still to be reminded
+
+    def random_due():
+        return "someday" if rng.random() < 0.05 else (today + timedelta(days=rng.randint(-5, 40))).isoformat()
+
+    for step in range(3000):
+        ids = [task.id for task in manager.tasks]
+        action = rng.random()
+        if action < 0.4 or not ids:
+            task = manager.add_task(task_data(f"task {step}", due_date=random_due()))
+        elif action < 0.65:
+            task = manager.get_task(rng.choice(ids))
+            due_date = task.due_date
+            manager.update_task(task.id, {"due_date": random_due()} if action < 0.6 else {"name": f"renamed {step}"})
+            if task.due_date == due_date:
+                continue  # Same day: a reminder already given is not given again
+        elif action < 0.8:
+            task_id = rng.choice(ids)
+            manager.delete_task(task_id)
+            model.pop(task_id, None)
+            continue
+        else:
+            today += timedelta(days=rng.randint(0, 3))
+            due = manager.due_reminders(today)
+            expected = sorted((day, task_id) for task_id, day in model.items() if day <= today)
+            assert sorted((task.due_date, task.id) for task in due) == [(d.isoformat(), i) for d, i in expected]
+            assert [task.due_date for task in due] == sorted(task.due_date for task in due)
+            for _, task_id in expected:
+                del model[task_id]
+            assert manager.next_reminder() == min(model.values(), default=None)
+            continue
+        model.pop(task.id, None)
+        if task.due_date != "someday" and date.fromisoformat(task.due_date) >= today:
+            model[task.id] = date.fromisoformat(task.due_date)